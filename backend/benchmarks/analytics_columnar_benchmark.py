@@ -0,0 +1,148 @@
+"""
+Агрегация аналитики по истории транзакций: прежний цикл по транзакциям
+(разбор даты, словари, сложение сумм на каждую строку) против колоночного
+представления TransactionColumns (маски и bincount по массивам NumPy).
+
+Запуск из backend/:
+    python -m benchmarks.analytics_columnar_benchmark [--sizes 10000 100000 1000000]
+"""
+import argparse
+import heapq
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from src.constants.constants import TransactionCategory
+from src.services.columnar import CATEGORIES, TransactionColumns, epoch_us
+
+TOP = 5
+
+CODES = {category.value: code for code, category in enumerate(CATEGORIES)}
+
+def make_rows(count: int, now: datetime):
+    categories = [category.value for category in TransactionCategory]
+    rows = []
+    for i in range(count):
+        ts = now - timedelta(seconds=random.randint(0, 3 * 365 * 86400))
+        rows.append((
+            i + 1,
+            ts.isoformat(),
+            random.randint(100, 2_000_000),
+            random.choice(categories),
+            "debit" if random.random() > 0.2 else "credit"
+        ))
+    return rows
+
+def legacy(transactions, now: datetime, start: datetime, end: datetime):
+    """
+    Прежний проход: каждая транзакция - словарь с датой-строкой и суммой в рублях
+    """
+    current_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    previous_start = (current_start - timedelta(days=1)).replace(day=1)
+
+    totals = {"current": {}, "previous": {}}
+    weekdays = [[0.0, 0] for _ in range(7)]
+    period = {}
+
+    for txn in transactions:
+        ts = datetime.fromisoformat(txn["date"])
+        amount = abs(txn["amount"])
+        is_expense = txn.get("type", "debit") == "debit"
+        key = (txn["category"], "debit" if is_expense else "credit")
+
+        bucket = "current" if ts >= current_start else "previous" if ts >= previous_start else None
+        if bucket:
+            totals[bucket][key] = totals[bucket].get(key, 0) + amount
+            if bucket == "current" and is_expense:
+                weekdays[ts.weekday()][0] += amount
+                weekdays[ts.weekday()][1] += 1
+
+        if not is_expense or ts < start or ts > end:
+            continue
+        data = period.setdefault(txn["category"], [0.0, 0, []])
+        data[0] += amount
+        data[1] += 1
+        entry = (amount, txn["row"])
+        if len(data[2]) < TOP:
+            heapq.heappush(data[2], entry)
+        elif entry > data[2][0]:
+            heapq.heapreplace(data[2], entry)
+
+    return (
+        {bucket: {key: round(value, 2) for key, value in values.items()} for bucket, values in totals.items()},
+        [[round(amount, 2), count] for amount, count in weekdays],
+        {category: (round(amount, 2), count, sorted(row for _, row in top)) for category, (amount, count, top) in period.items()}
+    )
+
+def columnar(columns: TransactionColumns, now: datetime, start: datetime, end: datetime):
+    current_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    previous_start = (current_start - timedelta(days=1)).replace(day=1)
+
+    current = columns.between(current_start)
+    previous = columns.between(previous_start, current_start)
+    totals = {
+        bucket: {key: float(amount) for key, (amount, _) in columns.totals(mask).items()}
+        for bucket, mask in (("current", current), ("previous", previous))
+    }
+
+    weekdays = [[0.0, 0] for _ in range(7)]
+    for day, amount, count in columns.daily(current & columns.debit):
+        weekdays[day.weekday()][0] += float(amount)
+        weekdays[day.weekday()][1] += count
+
+    mask = columns.between(start, end + timedelta(microseconds=1)) & columns.debit
+    top = columns.top_ids(mask, TOP)
+    top_by_category = {}
+    for row_id in top:
+        top_by_category.setdefault(int(columns.categories[row_id - 1]), []).append(row_id)
+
+    period = {}
+    for (category, direction), (amount, count) in columns.totals(mask).items():
+        period[category] = (float(amount), count, sorted(top_by_category.get(CODES[category], [])))
+
+    return (
+        totals,
+        [[round(amount, 2), count] for amount, count in weekdays],
+        period
+    )
+
+def measure(run):
+    started = time.perf_counter()
+    result = run()
+    return time.perf_counter() - started, result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    random.seed(42)
+    now = datetime.now(timezone.utc)
+    start, end = now - timedelta(days=400), now - timedelta(days=30)
+
+    print(f"{'строк':>10}{'цикл, с':>10}{'колонки, с':>12}{'из строк БД, с':>16}{'ускорение':>11}")
+    for size in args.sizes:
+        rows = make_rows(size, now)
+        # Так транзакции приходят из кеша: словари с датой-строкой и суммой в рублях
+        transactions = [
+            {"row": row_id, "date": date, "amount": -kopecks / 100, "category": category, "type": txn_type}
+            for row_id, date, kopecks, category, txn_type in rows
+        ]
+        # Так колонки приходят из БД: время, копейки, коды категорий и направление уже посчитаны в SQL
+        db_rows = [
+            (row_id, epoch_us(datetime.fromisoformat(date)), kopecks, CODES[category], int(txn_type == "debit"), 1)
+            for row_id, date, kopecks, category, txn_type in rows
+        ]
+
+        legacy_time, expected = measure(lambda: legacy(transactions, now, start, end))
+        build_time, columns = measure(lambda: TransactionColumns.from_rows(db_rows))
+        columnar_time, result = measure(lambda: columnar(columns, now, start, end))
+
+        assert result == expected, "результаты разошлись"
+        print(
+            f"{size:>10}{legacy_time:>10.3f}{columnar_time:>12.4f}{build_time:>16.3f}"
+            f"{legacy_time / (columnar_time + build_time):>10.1f}x"
+        )
+
+if __name__ == "__main__":
+    main()
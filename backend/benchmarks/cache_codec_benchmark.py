@@ -0,0 +1,73 @@
+"""
+Сравнение форматов значений кеша transactions:* - размер и время декодирования.
+
+Запуск из backend/:
+    python -m benchmarks.cache_codec_benchmark [--transactions 500] [--repeat 200]
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from src import cache_codec
+
+DESCRIPTIONS = [
+    "Покупка в магазине Пятёрочка",
+    "Оплата ресторана",
+    "Перевод по номеру телефона",
+    "Снятие наличных",
+    "Яндекс Такси",
+    "Оплата мобильной связи"
+]
+
+def make_transactions(count: int):
+    now = datetime.utcnow()
+    return [
+        {
+            "id": f"txn-{100000 + i}",
+            "date": (now - timedelta(minutes=37 * i)).isoformat(),
+            "description": random.choice(DESCRIPTIONS),
+            "amount": round(random.uniform(50, 15000), 2),
+            "currency": "RUB",
+            "type": "debit" if random.random() > 0.2 else "credit",
+            "mccCode": random.choice(["5411", "5812", "4121", "6011", ""]),
+            "category": random.choice(["groceries", "restaurants", "transport", "other"])
+        }
+        for i in range(count)
+    ]
+
+def measure(name: str, encoded, decode, repeat: int):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        decode(encoded)
+    elapsed = (time.perf_counter() - started) / repeat
+    return name, len(encoded), elapsed * 1e6
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transactions", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    random.seed(42)
+    transactions = make_transactions(args.transactions)
+
+    results = [measure("json (текущий)", json.dumps(transactions).encode("utf-8"), json.loads, args.repeat)]
+
+    for codec in cache_codec._codecs_by_id.values():
+        payload, _ = codec.encode(transactions)
+        encoded = cache_codec.MAGIC + bytes([codec.codec_id]) + payload
+        assert cache_codec.loads(encoded) == transactions
+        results.append(measure(codec.name, encoded, cache_codec.loads, args.repeat))
+
+    baseline_size = results[0][1]
+    baseline_time = results[0][2]
+
+    print(f"{args.transactions} транзакций, {args.repeat} повторов декодирования\n")
+    print(f"{'формат':<16}{'байт':>10}{'от json':>10}{'декод, мкс':>14}{'от json':>10}")
+    for name, size, micros in results:
+        print(f"{name:<16}{size:>10}{size / baseline_size:>9.0%}{micros:>14.1f}{micros / baseline_time:>9.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Скорость категоризации транзакций: прежняя реализация (подстроки по спискам
+ключевых слов на каждый вызов) против скомпилированного выражения с кешем.
+
+Запуск из backend/:
+    python -m benchmarks.categorizer_benchmark [--transactions 200000] [--unique 5000]
+"""
+import argparse
+import random
+import time
+
+from src.constants.constants import TransactionCategory
+from src.constants import mcc_mapping
+from src.constants.mcc_mapping import MCC_TO_CATEGORY, categorize_transaction, categorize_transactions
+
+MERCHANTS = [
+    "Покупка в магазине Пятёрочка",
+    "ПЕРЕКРЁСТОК Москва",
+    "Кафе Шоколадница",
+    "Яндекс.Такси поездка",
+    "АЗС Лукойл",
+    "Оплата мобильной связи",
+    "Перевод по номеру телефона",
+    "Snyat nalichnye ATM",
+    "Аптека Ригла",
+    "OZON.RU заказ",
+]
+
+def legacy_categorize(mcc_code: str, description: str = "") -> TransactionCategory:
+    if mcc_code and mcc_code in MCC_TO_CATEGORY:
+        return MCC_TO_CATEGORY[mcc_code]
+
+    description_lower = description.lower()
+
+    keywords_map = {
+        TransactionCategory.GROCERIES: ["магазин", "магнит", "пятёрочка", "перекрёсток", "ашан", "лента", "дикси"],
+        TransactionCategory.RESTAURANTS: ["ресторан", "кафе", "макдональдс", "kfc", "бургер", "пицца", "суши", "якитория", "starbucks"],
+        TransactionCategory.TRANSPORT: ["метро", "такси", "uber", "яндекс.такси", "бензин", "азс", "парковка", "транспорт"],
+        TransactionCategory.UTILITIES: ["жкх", "электричество", "газ", "вода", "интернет", "мобильная связь", "связь"],
+        TransactionCategory.TRANSFERS: ["перевод", "transfer", "п2п", "p2p"],
+    }
+
+    for category, keywords in keywords_map.items():
+        if any(keyword in description_lower for keyword in keywords):
+            return category
+
+    return TransactionCategory.OTHER
+
+def make_items(count: int, unique: int):
+    # Банковские описания повторяются: unique различных строк на весь поток
+    descriptions = [f"{random.choice(MERCHANTS)} #{i}" for i in range(unique)]
+    return [
+        (random.choice(["", "", "", "5411", "5812", "6011"]), random.choice(descriptions))
+        for _ in range(count)
+    ]
+
+def measure(name: str, run, count: int):
+    started = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - started
+    return name, elapsed / count * 1_000_000, result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transactions", type=int, default=200000)
+    parser.add_argument("--unique", type=int, default=5000)
+    args = parser.parse_args()
+
+    random.seed(42)
+    items = make_items(args.transactions, args.unique)
+
+    results = [measure("прежняя", lambda: [legacy_categorize(m, d) for m, d in items], len(items))]
+
+    mcc_mapping._categorize_description.cache_clear()
+    results.append(measure(
+        "по одной, холодный кеш",
+        lambda: [categorize_transaction(m, d) for m, d in items],
+        len(items)
+    ))
+    results.append(measure(
+        "по одной, тёплый кеш",
+        lambda: [categorize_transaction(m, d) for m, d in items],
+        len(items)
+    ))
+    results.append(measure("пачкой, тёплый кеш", lambda: categorize_transactions(items), len(items)))
+
+    expected = results[0][2]
+    for _, _, result in results[1:]:
+        assert result == expected
+
+    baseline = results[0][1]
+    print(f"{args.transactions} транзакций, {args.unique} различных описаний\n")
+    print(f"{'вариант':<26}{'с / 1 млн':>12}{'от прежней':>12}")
+    for name, seconds_per_million, _ in results:
+        print(f"{name:<26}{seconds_per_million:>12.2f}{seconds_per_million / baseline:>11.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Суммы в горячих путях: прежние float(...) при нормализации, накопление во float
+и Decimal(str(abs(...))) на каждую транзакцию кешбэка против целых копеек
+(to_minor / Money). Нормализация и агрегация по категориям меряются отдельно.
+
+Запуск из backend/:
+    python -m benchmarks.money_benchmark [--transactions 500000]
+"""
+import argparse
+import random
+import time
+from decimal import Decimal
+
+from src.utils.money import Money, to_minor
+
+CATEGORIES = ["groceries", "restaurants", "transport", "utilities", "other"]
+CASHBACK_RATES = {"groceries": Decimal("5"), "restaurants": Decimal("3"), "transport": Decimal("1")}
+
+def make_rows(count: int):
+    # Суммы приходят из Bank API строками с двумя знаками после точки
+    return [
+        (random.choice(CATEGORIES), f"{random.choice(['-', ''])}{random.randint(1, 5_000_000) / 100:.2f}")
+        for _ in range(count)
+    ]
+
+def legacy_aggregate(rows):
+    """Суммы по категориям во float, кешбэк - Decimal(str()) на каждую транзакцию"""
+    totals = {}
+    cashback = Decimal("0")
+    for category, amount in rows:
+        totals[category] = totals.get(category, 0.0) + abs(amount)
+        rate = CASHBACK_RATES.get(category)
+        if rate:
+            cashback += Decimal(str(abs(amount))) * rate / Decimal("100")
+    return totals, cashback.quantize(Decimal("0.01"))
+
+def minor_aggregate(rows):
+    """Суммы по категориям в копейках, кешбэк - один раз от итога категории"""
+    totals = {}
+    for category, amount in rows:
+        totals[category] = totals.get(category, 0) + abs(amount)
+    cashback = sum(
+        (Money(total).percent(CASHBACK_RATES[category]) for category, total in totals.items() if category in CASHBACK_RATES),
+        Money(0)
+    )
+    return {category: Money(total) for category, total in totals.items()}, cashback
+
+def measure(run, count: int):
+    started = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - started
+    return elapsed / count * 1_000_000, result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transactions", type=int, default=500000)
+    args = parser.parse_args()
+
+    random.seed(42)
+    rows = make_rows(args.transactions)
+    exact = sum(abs(Decimal(amount)) for _, amount in rows)
+
+    float_parse, float_rows = measure(lambda: [(c, float(a)) for c, a in rows], len(rows))
+    minor_parse, minor_rows = measure(lambda: [(c, to_minor(a)) for c, a in rows], len(rows))
+    float_agg, (float_totals, float_cashback) = measure(lambda: legacy_aggregate(float_rows), len(rows))
+    minor_agg, (minor_totals, minor_cashback) = measure(lambda: minor_aggregate(minor_rows), len(rows))
+
+    float_error = abs(Decimal(sum(float_totals.values())) - exact).quantize(Decimal("1e-6"))
+    minor_error = abs(sum(minor_totals.values(), Money(0)).to_decimal() - exact)
+
+    print(f"{args.transactions} транзакций, точный итог {exact}\n")
+    print(f"{'этап':<14}{'float, с/млн':>14}{'копейки, с/млн':>16}{'от прежней':>12}")
+    for name, old, new in (
+        ("нормализация", float_parse, minor_parse),
+        ("агрегация", float_agg, minor_agg),
+        ("всего", float_parse + float_agg, minor_parse + minor_agg),
+    ):
+        print(f"{name:<14}{old:>14.2f}{new:>16.2f}{new / old:>11.0%}")
+
+    print(f"\nошибка итога: float {float_error}, копейки {minor_error}")
+    print(f"кешбэк: по транзакциям {float_cashback}, от итогов {minor_cashback}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Пропускная способность переводов по кешу: прежний путь PaymentService (новый
+redis.Redis на проверку баланса и на обновление кеша, затем отдельные GET /
+SETEX / PUBLISH / DELETE на каждый ключ) против общего пула из src.redis_client
+и одного скрипта BalanceCache.adjust. Меряется только работа с Redis: проверка
+баланса и обновление кеша внутреннего перевода, БД не участвует.
+
+Затем те же переводы идут из --threads потоков: прежнее чтение-изменение-запись
+баланса в Python теряет часть списаний, скрипт - нет.
+
+С --fake используется fakeredis, сетевая задержка имитируется --rtt-ms на
+каждое обращение к серверу и на установку соединения.
+
+Запуск из backend/:
+    python -m benchmarks.payment_throughput_benchmark [--fake] [--payments 2000] [--rtt-ms 0.2] [--threads 8]
+"""
+import argparse
+import threading
+import time
+
+import redis
+
+from src import cache_codec
+from src.config import settings
+from src.local_cache import invalidate
+from src.redis_client import binary_client_for
+from src.services.balance_cache import BalanceShift, to_hash
+from src.services.data_version import DataVersionService
+from src.services.payment_service import PaymentService
+from src.utils.money import Money
+
+AMOUNT = Money(12345)
+
+stats = {"connections": 0, "round_trips": 0}
+
+def counting_connection(base, rtt: float):
+    """Соединение, считающее подключения и обращения к серверу"""
+    class CountingConnection(base):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            stats["connections"] += 1
+            if rtt:
+                time.sleep(rtt)
+
+        def send_packed_command(self, command, check_health=True):
+            stats["round_trips"] += 1
+            if rtt:
+                time.sleep(rtt)
+            return super().send_packed_command(command, check_health)
+
+    return CountingConnection
+
+def client_factory(fake: bool, rtt: float):
+    if fake:
+        import fakeredis
+
+        server = fakeredis.FakeServer()
+        pool = fakeredis.FakeRedis(server=server, decode_responses=True).connection_pool
+        base, kwargs = pool.connection_class, dict(pool.connection_kwargs)
+    else:
+        base = redis.Connection
+        kwargs = {
+            "host": settings.REDIS_HOST,
+            "port": settings.REDIS_PORT,
+            "db": settings.REDIS_DB,
+            "password": settings.REDIS_PASSWORD or None,
+            "decode_responses": True
+        }
+    connection_class = counting_connection(base, rtt)
+
+    def make_client() -> redis.Redis:
+        return redis.Redis(connection_pool=redis.ConnectionPool(connection_class=connection_class, **kwargs))
+
+    return make_client
+
+def seed(client: redis.Redis, payments: int, legacy: bool):
+    """Балансы обоих счетов с запасом на все переводы: прежний формат - строка cache_codec, новый - хеш"""
+    binary = binary_client_for(client)
+    pipe = binary.pipeline(transaction=False)
+    for user_id in (1, 2):
+        key = f"balance:{user_id}:acc-{user_id}"
+        minor = payments * AMOUNT.minor * 2
+        balance = {"amount": minor / 100, "amountMinor": minor, "currency": "RUB"}
+        pipe.delete(key)
+        if legacy:
+            pipe.setex(key, settings.BANK_DATA_CACHE_TTL, cache_codec.dumps("view:", balance))
+        else:
+            pipe.hset(key, mapping=to_hash(balance)[0])
+            pipe.expire(key, settings.BANK_DATA_CACHE_TTL)
+    pipe.execute()
+
+def read_balance(client: redis.Redis, legacy: bool) -> Money:
+    binary = binary_client_for(client)
+    if legacy:
+        return Money.from_fields(cache_codec.loads(binary.get("balance:1:acc-1")))
+    return Money(int(binary.hget("balance:1:acc-1", "amountMinor")))
+
+def legacy_transfer(make_client, binary: redis.Redis):
+    """Прежний create_internal_transfer: два новых клиента и по обращению на каждый ключ"""
+    sender_key, recipient_key = "balance:1:acc-1", "balance:2:acc-2"
+
+    # Проверка баланса: AccountService с новым клиентом читает кеш своим бинарным клиентом
+    binary_client_for(make_client()).get(sender_key)
+
+    redis_client = make_client()
+    for key, delta, floor in ((sender_key, -AMOUNT, True), (recipient_key, AMOUNT, False)):
+        balance_data = cache_codec.loads(binary.get(key))
+        minor = Money.from_fields(balance_data).minor + delta.minor
+        balance_data["amountMinor"] = max(0, minor) if floor else minor
+        balance_data["amount"] = balance_data["amountMinor"] / 100
+        binary.setex(key, settings.BANK_DATA_CACHE_TTL, cache_codec.dumps("view:", balance_data))
+        invalidate(redis_client, [key])
+
+    for key in ("transactions:2:acc-2", "transactions:1:acc-1"):
+        redis_client.delete(key)
+        invalidate(redis_client, [key])
+    DataVersionService(redis_client).bump_users([1, 2])
+
+def pooled_transfer(service: PaymentService, binary: redis.Redis):
+    """Общий клиент: проверка баланса, затем один скрипт на оба счёта"""
+    binary.hgetall("balance:1:acc-1")
+    service._adjust_balances(
+        [BalanceShift("balance:1:acc-1", -AMOUNT), BalanceShift("balance:2:acc-2", AMOUNT)],
+        ["transactions:1:acc-1", "transactions:2:acc-2"],
+        [1, 2]
+    )
+
+def measure(run, payments: int):
+    stats.update(connections=0, round_trips=0)
+    started = time.perf_counter()
+    for _ in range(payments):
+        run()
+    elapsed = time.perf_counter() - started
+    return payments / elapsed, stats["round_trips"] / payments, stats["connections"] / payments
+
+def lost_debits(run, threads: int, payments: int, client: redis.Redis, legacy: bool) -> int:
+    """Сколько списаний из threads * payments не дошло до кешированного баланса"""
+    seed(client, threads * payments, legacy)
+    before = read_balance(client, legacy)
+
+    def worker():
+        for _ in range(payments):
+            run()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    debited = (before - read_balance(client, legacy)).minor
+    return threads * payments - debited // AMOUNT.minor
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fake", action="store_true", help="fakeredis вместо Redis из настроек")
+    parser.add_argument("--payments", type=int, default=2000)
+    parser.add_argument("--rtt-ms", type=float, default=0.2, help="имитация задержки сети (только с --fake)")
+    parser.add_argument("--threads", type=int, default=8, help="потоков в проверке потерянных списаний")
+    args = parser.parse_args()
+
+    make_client = client_factory(args.fake, args.rtt_ms / 1000 if args.fake else 0)
+
+    legacy_shared = make_client()
+    legacy_binary = binary_client_for(legacy_shared)
+    seed(legacy_shared, args.payments, legacy=True)
+    legacy = measure(lambda: legacy_transfer(make_client, legacy_binary), args.payments)
+
+    shared = make_client()
+    service = PaymentService(None, shared)
+    pooled_binary = binary_client_for(shared)
+    seed(shared, args.payments, legacy=False)
+    pooled = measure(lambda: pooled_transfer(service, pooled_binary), args.payments)
+
+    print(f"{args.payments} переводов, {'fakeredis, RTT ' + str(args.rtt_ms) + ' мс' if args.fake else 'Redis ' + settings.REDIS_HOST}\n")
+    print(f"{'вариант':<22}{'переводов/с':>14}{'обращений':>12}{'соединений':>12}")
+    for name, (rate, trips, connections) in (("новый клиент", legacy), ("общий пул", pooled)):
+        print(f"{name:<22}{rate:>14.0f}{trips:>12.1f}{connections:>12.2f}")
+    print(f"\nускорение: x{pooled[0] / legacy[0]:.1f}")
+
+    per_thread = max(1, args.payments // args.threads)
+    legacy_lost = lost_debits(
+        lambda: legacy_transfer(make_client, legacy_binary), args.threads, per_thread, legacy_shared, True
+    )
+    pooled_lost = lost_debits(
+        lambda: pooled_transfer(service, pooled_binary), args.threads, per_thread, shared, False
+    )
+    print(f"\nпотеряно списаний из {args.threads * per_thread} ({args.threads} потоков): "
+          f"новый клиент {legacy_lost}, общий пул {pooled_lost}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Память на транзакцию: прежний словарь из BankClient._parse_transaction с полями
+счёта, скопированными в каждую строку, против TransactionRecord со ссылкой на
+общий AccountRef. Меряются только объекты, созданные при разборе: исходные
+ответы банка уже в памяти у обоих вариантов.
+
+Запуск из backend/:
+    python -m benchmarks.transaction_memory_benchmark [--transactions 200000] [--accounts 5]
+"""
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+from src.services.transaction_record import AccountRef, TransactionRecord
+from src.utils.money import Money
+
+def make_bank_items(count: int):
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "transactionId": f"txn-{i:08d}",
+            "bookingDateTime": (start + timedelta(minutes=17 * i)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "transactionInformation": random.choice(["Пятёрочка", "Яндекс.Такси", "Перевод", "Кафе"]),
+            "amount": {"amount": f"{random.randint(1, 500_000) / 100:.2f}", "currency": "RUB"},
+            "creditDebitIndicator": random.choice(["Debit", "Credit"]),
+            "mccCode": random.choice(["5411", "4121", "5812", ""])
+        }
+        for i in range(count)
+    ]
+
+def make_accounts(count: int):
+    return [
+        {"accountId": f"acc-{i}", "accountName": f"Счёт {i}", "clientId": i % 3 + 1, "clientName": "vbank"}
+        for i in range(count)
+    ]
+
+def legacy_rows(items, accounts):
+    """Прежний путь: словарь на транзакцию, затем поля счёта дописываются в каждую строку"""
+    rows = []
+    for index, txn in enumerate(items):
+        money = Money.parse(txn["amount"]["amount"], txn["amount"]["currency"])
+        row = {
+            "id": txn.get("transactionId", ""),
+            "date": txn.get("bookingDateTime"),
+            "description": txn.get("transactionInformation", "Транзакция"),
+            "amount": money.to_float(),
+            "amountMinor": money.minor,
+            "currency": money.currency,
+            "type": txn.get("creditDebitIndicator", "debit").lower(),
+            "mccCode": str(txn.get("mccCode") or "")
+        }
+        account = accounts[index % len(accounts)]
+        row["accountId"] = account["accountId"]
+        row["accountName"] = account["accountName"]
+        row["clientId"] = account["clientId"]
+        row["clientName"] = account["clientName"]
+        rows.append(row)
+    return rows
+
+def record_rows(items, accounts):
+    """Запись создаётся один раз со ссылкой на общий AccountRef счёта"""
+    refs = [AccountRef.from_account(account) for account in accounts]
+    return [
+        TransactionRecord.from_bank(txn, refs[index % len(refs)])
+        for index, txn in enumerate(items)
+    ]
+
+def measure(build, items, accounts):
+    # Время - без tracemalloc, он замедляет каждое выделение памяти
+    gc.collect()
+    started = time.perf_counter()
+    build(items, accounts)
+    elapsed = time.perf_counter() - started
+
+    gc.collect()
+    tracemalloc.start()
+    rows = build(items, accounts)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, size, elapsed
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transactions", type=int, default=200000)
+    parser.add_argument("--accounts", type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed(42)
+    items = make_bank_items(args.transactions)
+    accounts = make_accounts(args.accounts)
+
+    legacy, legacy_size, legacy_time = measure(legacy_rows, items, accounts)
+    del legacy
+    records, records_size, records_time = measure(record_rows, items, accounts)
+    del records
+
+    print(f"{args.transactions} транзакций, {args.accounts} счетов\n")
+    print(f"{'вариант':<22}{'байт / транзакцию':>20}{'всего, МБ':>12}{'разбор, с':>12}")
+    for name, size, elapsed in (
+        ("словари", legacy_size, legacy_time),
+        ("TransactionRecord", records_size, records_time),
+    ):
+        print(f"{name:<22}{size / args.transactions:>20.0f}{size / 2 ** 20:>12.1f}{elapsed:>12.2f}")
+    print(f"\nэкономия памяти: {1 - records_size / legacy_size:.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from src.database import Base, engine
+from src.migrations import run_migrations
 from src.models import User, BankAccount, Group, GroupMember, Invitation, OTPCode
 
 def init_database():
@@ -6,6 +7,7 @@ def init_database():
 
     try:
         Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
         print("✅ Таблицы успешно созданы!")
 
         print("\n📋 Созданные таблицы:")
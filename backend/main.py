@@ -6,6 +6,9 @@ from contextlib import asynccontextmanager
 from src.config import settings
 from src.database import create_tables
 from src.redis_client import redis_client
+from src.http_client import init_bank_http_clients, close_bank_http_clients
+from src.local_cache import start_local_cache_listener, stop_local_cache_listener
+from src.utils.etag import etag_middleware
 
 from src.routers import auth, accounts, groups, analytics, loyalty_cards, payments, premium, savings, family_budget, verification, referrals, cashback, subscriptions, partners, mock_bank
 
@@ -23,12 +26,23 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"❌ Redis connection failed: {e}")
 
+    await init_bank_http_clients()
+    print(f"🔌 Bank HTTP pools ready (http2={settings.BANK_HTTP2})")
+
+    try:
+        start_local_cache_listener(redis_client)
+    except Exception as e:
+        print(f"❌ Local cache invalidation listener failed: {e}")
+
     print("✨ Application started successfully!")
 
     yield
 
     print("👋 Shutting down Bank Aggregator API...")
 
+    stop_local_cache_listener()
+    await close_bank_http_clients()
+
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
@@ -36,6 +50,9 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Регистрируется до CORS, чтобы ответы 304 тоже получали CORS-заголовки
+app.middleware("http")(etag_middleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.allowed_origins_list,
@@ -119,6 +136,34 @@ async def health():
         }
     }
 
+@app.get("/health/banks", tags=["Health"])
+async def banks_health():
+    from src.constants.bank_config import BANK_NAMES
+    from src.services.circuit_breaker import BankCircuitBreaker
+
+    breaker = BankCircuitBreaker(redis_client)
+    banks = {}
+
+    for bank_id, bank_name in BANK_NAMES.items():
+        try:
+            banks[bank_name] = {"bankId": bank_id, **breaker.snapshot(bank_id)}
+        except Exception as e:
+            banks[bank_name] = {"bankId": bank_id, "error": str(e)}
+
+    return {
+        "success": True,
+        "data": banks
+    }
+
+@app.get("/health/cache", tags=["Health"])
+async def cache_health():
+    from src.services.swr_cache import cache_stats
+
+    return {
+        "success": True,
+        "data": cache_stats()
+    }
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -0,0 +1,167 @@
+import json
+import logging
+import zlib
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+    logger.warning("⚠️  Пакет msgpack не установлен - кеш кодируется в JSON + zlib")
+
+# Заголовок закодированного значения: MAGIC + id кодека. 0xC1 не встречается ни в
+# msgpack, ни в начале JSON/UTF-8, поэтому старые JSON-записи читаются без заголовка
+MAGIC = b"\xc1"
+
+class CacheCodec:
+    """
+    Кодек значений кеша. codec_id записывается в заголовок и не должен меняться,
+    новый формат - новый кодек с новым id.
+    """
+
+    codec_id: int = 0
+    name: str = ""
+
+    def encode(self, value: Any) -> Tuple[bytes, int]:
+        """
+        Вернуть (payload, размер несжатых данных в байтах)
+        """
+        raise NotImplementedError
+
+    def decode(self, payload: bytes) -> Tuple[Any, int]:
+        """
+        Вернуть (значение, размер несжатых данных в байтах)
+        """
+        raise NotImplementedError
+
+class JsonZlibCodec(CacheCodec):
+    codec_id = 1
+    name = "json-zlib"
+
+    def encode(self, value: Any) -> Tuple[bytes, int]:
+        raw = json.dumps(value, separators=(",", ":")).encode("utf-8")
+        return zlib.compress(raw, settings.CACHE_CODEC_ZLIB_LEVEL), len(raw)
+
+    def decode(self, payload: bytes) -> Tuple[Any, int]:
+        raw = zlib.decompress(payload)
+        return json.loads(raw), len(raw)
+
+class MsgpackCodec(CacheCodec):
+    """
+    msgpack без сжатия - для маленьких значений вроде баланса
+    """
+
+    codec_id = 2
+    name = "msgpack"
+
+    def encode(self, value: Any) -> Tuple[bytes, int]:
+        packed = msgpack.packb(value, use_bin_type=True)
+        return packed, len(packed)
+
+    def decode(self, payload: bytes) -> Tuple[Any, int]:
+        return msgpack.unpackb(payload, raw=False), len(payload)
+
+class ColumnarCodec(CacheCodec):
+    """
+    Список однородных словарей (транзакции) хранится по колонкам: имена полей
+    записываются один раз, одинаковые значения в колонке хорошо сжимаются zlib.
+    Неоднородные списки и прочие значения кодируются как есть.
+    """
+
+    codec_id = 3
+    name = "columnar"
+
+    def encode(self, value: Any) -> Tuple[bytes, int]:
+        columns = self._to_columns(value)
+        packed = msgpack.packb(
+            {"k": columns[0], "c": columns[1]} if columns else {"v": value},
+            use_bin_type=True
+        )
+        return zlib.compress(packed, settings.CACHE_CODEC_ZLIB_LEVEL), len(packed)
+
+    def decode(self, payload: bytes) -> Tuple[Any, int]:
+        packed = zlib.decompress(payload)
+        data = msgpack.unpackb(packed, raw=False)
+
+        if "v" in data:
+            return data["v"], len(packed)
+
+        keys = data["k"]
+        return [dict(zip(keys, row)) for row in zip(*data["c"])], len(packed)
+
+    def _to_columns(self, value: Any) -> Optional[Tuple[List[str], List[List[Any]]]]:
+        if not isinstance(value, list) or not value or not all(isinstance(item, dict) for item in value):
+            return None
+
+        keys = list(value[0].keys())
+        key_set = set(keys)
+        if any(item.keys() != key_set for item in value):
+            return None
+
+        return keys, [[item[key] for item in value] for key in keys]
+
+_codecs_by_id: Dict[int, CacheCodec] = {}
+_codecs_by_name: Dict[str, CacheCodec] = {}
+
+def register_codec(codec: CacheCodec) -> None:
+    _codecs_by_id[codec.codec_id] = codec
+    _codecs_by_name[codec.name] = codec
+
+register_codec(JsonZlibCodec())
+if msgpack is not None:
+    register_codec(MsgpackCodec())
+    register_codec(ColumnarCodec())
+
+def codec_for_key(key: str) -> Optional[CacheCodec]:
+    """
+    Кодек для записи по пространству ключа (CACHE_CODECS); None - писать обычный JSON
+    """
+    name = settings.CACHE_CODECS.get(key.split(":", 1)[0])
+    if not name or name == "json":
+        return None
+
+    codec = _codecs_by_name.get(name)
+    if codec is None:
+        # Например msgpack недоступен - сжатый JSON лучше несжатого
+        codec = _codecs_by_name["json-zlib"]
+    return codec
+
+def dumps_with_size(key: str, value: Any) -> Tuple[bytes, int]:
+    """
+    Закодировать значение кодеком пространства ключа.
+    Возвращает (байты для Redis, размер несжатых данных).
+    """
+    codec = codec_for_key(key)
+    if codec is None:
+        raw = json.dumps(value).encode("utf-8")
+        return raw, len(raw)
+
+    payload, size = codec.encode(value)
+    return MAGIC + bytes([codec.codec_id]) + payload, size
+
+def dumps(key: str, value: Any) -> bytes:
+    return dumps_with_size(key, value)[0]
+
+def loads_with_size(raw: Union[bytes, str]) -> Tuple[Any, int]:
+    """
+    Декодировать значение любого поддерживаемого формата, включая старый JSON.
+    Возвращает (значение, размер несжатых данных) - для учёта в локальном кеше.
+    """
+    if isinstance(raw, str):
+        return json.loads(raw), len(raw)
+
+    if raw[:1] != MAGIC:
+        return json.loads(raw), len(raw)
+
+    codec = _codecs_by_id.get(raw[1])
+    if codec is None:
+        raise ValueError(f"Неизвестный кодек кеша: {raw[1]}")
+
+    return codec.decode(raw[2:])
+
+def loads(raw: Union[bytes, str]) -> Any:
+    return loads_with_size(raw)[0]
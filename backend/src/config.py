@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 
 class Settings(BaseSettings):
     APP_NAME: str = "Bank Aggregator API"
@@ -47,8 +47,86 @@ class Settings(BaseSettings):
     SBANK_BASE_URL: str = "https://sbank.open.bankingapi.ru"
 
     BANK_TOKEN_TTL: int = 82800
+    BANK_TOKEN_REFRESH_AHEAD: int = 1800
+    BANK_TOKEN_LOCK_TIMEOUT: int = 30
+    BANK_TOKEN_LOCK_WAIT: float = 5.0
     CONSENT_REQUEST_TTL: int = 14400
     BANK_DATA_CACHE_TTL: int = 14400
+    BANK_DATA_SOFT_TTL: int = 900
+    BANK_CACHE_EARLY_BETA: float = 1.0
+    BANK_CACHE_EARLY_DELTA: float = 10.0
+    BANK_CACHE_LOCK_TIMEOUT: int = 30
+    BANK_CACHE_LOCK_WAIT: float = 5.0
+    # Сколько последних транзакций счёта хранится в кеше transactions:* (полная история - в bank_transactions)
+    BANK_TXN_CACHE_LIMIT: int = 200
+    # Блокировка списываемого баланса на время проверки остатка и сохранения платежа
+    PAYMENT_LOCK_TIMEOUT: int = 30
+    PAYMENT_LOCK_WAIT: float = 5.0
+
+    LOCAL_CACHE_ENABLED: bool = True
+    LOCAL_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    LOCAL_CACHE_TTL: float = 30.0
+    LOCAL_CACHE_CHANNEL: str = "cache_invalidation"
+
+    # Кодек значений кеша по пространству ключей: json, json-zlib, msgpack, columnar
+    # (балансы хранятся Redis-хешем, см. src/services/balance_cache.py)
+    CACHE_CODECS: Dict[str, str] = {"transactions": "columnar", "view": "json-zlib"}
+    CACHE_CODEC_ZLIB_LEVEL: int = 6
+
+    # Производные представления (аналитика, кешбек) под версией данных пользователя
+    DATA_VIEW_CACHE_TTL: int = 3600
+
+    # Часовой пояс гистограмм по дням недели и часам; окно поиска дней зарплаты
+    ANALYTICS_TIMEZONE: str = "Europe/Moscow"
+    PAYDAY_LOOKBACK_MONTHS: int = 6
+
+    # Кешбек месяца фиксируется в cashback_data через столько дней после его конца
+    # (банки проводят операции с задержкой); до этого пересчитывается по агрегатам
+    CASHBACK_MONTH_CLOSE_DAYS: int = 3
+
+    BANK_HTTP_TIMEOUT: float = 30.0
+    BANK_HTTP_CONNECT_TIMEOUT: float = 10.0
+    BANK_HTTP_MAX_CONNECTIONS: int = 100
+    BANK_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    BANK_HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    BANK_HTTP2: bool = False
+
+    BANK_CB_WINDOW_SECONDS: int = 60
+    BANK_CB_MIN_CALLS: int = 10
+    BANK_CB_ERROR_RATE: float = 0.5
+    BANK_CB_SLOW_CALL_SECONDS: float = 5.0
+    BANK_CB_SLOW_CALL_RATE: float = 0.8
+    BANK_CB_OPEN_SECONDS: int = 30
+    BANK_CB_LATENCY_SAMPLES: int = 200
+    BANK_TIMEOUT_PERCENTILE: float = 0.99
+    BANK_TIMEOUT_MULTIPLIER: float = 3.0
+    BANK_TIMEOUT_MIN: float = 2.0
+
+    BANK_RATE_LIMIT_ENABLED: bool = True
+    BANK_RATE_LIMIT_USER_RATE: float = 5.0
+    BANK_RATE_LIMIT_USER_BURST: int = 10
+    BANK_RATE_LIMIT_BACKGROUND_RESERVE: float = 0.5
+    BANK_RATE_LIMIT_INTERACTIVE_WAIT: float = 5.0
+    BANK_RATE_LIMIT_BACKGROUND_WAIT: float = 60.0
+
+    BANK_FANOUT_PER_BANK_LIMIT: int = 4
+    BANK_FANOUT_DEADLINE: float = 20.0
+
+    BANK_TXN_PAGE_SIZE: int = 100
+    BANK_TXN_MAX_PAGES: int = 50
+    BANK_TXN_HISTORY_TTL: int = 2592000
+
+    # Фоновая синхронизация (worker.py)
+    SYNC_WORKER_CONCURRENCY: int = 4
+    SYNC_POLL_INTERVAL: float = 1.0
+    SYNC_JOB_LEASE: int = 60
+    SYNC_JOB_MAX_ATTEMPTS: int = 3
+    SYNC_JOB_RESULT_TTL: int = 3600
+    SYNC_SCHEDULE_INTERVAL: int = 60
+    SYNC_SCHEDULE_BATCH: int = 500
+    SYNC_ACTIVE_WINDOW: int = 86400
+    SYNC_STALE_AFTER: int = 900
+    SYNC_FAILURE_BACKOFF: int = 900
 
     class Config:
         env_file = ".env"
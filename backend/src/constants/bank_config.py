@@ -18,6 +18,17 @@ BANK_NAME_TO_ID = {
     "abank": 3
 }
 
+# Лимиты исходящих запросов к Bank API по классам эндпоинтов:
+# класс -> (запросов в секунду, размер burst)
+BANK_RATE_LIMITS = {
+    "auth": (1, 5),
+    "consents": (5, 10),
+    "accounts": (20, 40),
+    "transactions": (10, 20),
+    "products": (5, 10),
+    "agreements": (2, 5),
+}
+
 def get_bank_url(bank_id: int) -> str:
     return BANK_URLS.get(bank_id, BANK_URLS[1])
 
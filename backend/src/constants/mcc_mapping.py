@@ -1,4 +1,6 @@
-from typing import Dict
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
 from src.constants.constants import TransactionCategory
 
 MCC_TO_CATEGORY: Dict[str, TransactionCategory] = {
@@ -121,6 +123,44 @@ MCC_TO_CATEGORY: Dict[str, TransactionCategory] = {
     "8299": TransactionCategory.EDUCATION,
 }
 
+# Ключевые слова описания для транзакций без известного MCC; при совпадении
+# нескольких категорий побеждает первая в этом списке
+KEYWORD_CATEGORIES: List[Tuple[TransactionCategory, List[str]]] = [
+    (TransactionCategory.GROCERIES, ["магазин", "магнит", "пятёрочка", "перекрёсток", "ашан", "лента", "дикси"]),
+    (TransactionCategory.RESTAURANTS, ["ресторан", "кафе", "макдональдс", "kfc", "бургер", "пицца", "суши", "якитория", "starbucks"]),
+    (TransactionCategory.TRANSPORT, ["метро", "такси", "uber", "яндекс.такси", "бензин", "азс", "парковка", "транспорт"]),
+    (TransactionCategory.UTILITIES, ["жкх", "электричество", "газ", "вода", "интернет", "мобильная связь", "связь"]),
+    (TransactionCategory.TRANSFERS, ["перевод", "transfer", "п2п", "p2p"]),
+]
+
+# Описаний, результат категоризации которых держим в памяти процесса
+CATEGORIZE_CACHE_SIZE = 65536
+
+_KEYWORD_PRIORITY: Dict[str, int] = {}
+for _priority, (_, _keywords) in enumerate(KEYWORD_CATEGORIES):
+    for _keyword in _keywords:
+        _KEYWORD_PRIORITY.setdefault(_keyword, _priority)
+
+# Все ключевые слова одним выражением. Просмотр вперёд находит совпадения с каждой
+# позиции, в том числе перекрывающиеся ("газ" внутри "магазин"); на одной позиции
+# альтернативы упорядочены по приоритету категории.
+_KEYWORDS_RE = re.compile(
+    "(?=(" + "|".join(re.escape(keyword) for keyword in sorted(_KEYWORD_PRIORITY, key=_KEYWORD_PRIORITY.get)) + "))"
+)
+
+@lru_cache(maxsize=CATEGORIZE_CACHE_SIZE)
+def _categorize_description(description: str) -> TransactionCategory:
+    # Кеш по исходной строке: на попадании не тратимся даже на нормализацию
+    best = len(KEYWORD_CATEGORIES)
+    for match in _KEYWORDS_RE.finditer(" ".join(description.lower().split())):
+        priority = _KEYWORD_PRIORITY[match.group(1)]
+        if priority < best:
+            best = priority
+            if best == 0:
+                break
+
+    return KEYWORD_CATEGORIES[best][0] if best < len(KEYWORD_CATEGORIES) else TransactionCategory.OTHER
+
 def categorize_transaction(mcc_code: str, description: str = "") -> TransactionCategory:
     """
     Категоризация транзакции на основе MCC кода.
@@ -128,22 +168,28 @@ def categorize_transaction(mcc_code: str, description: str = "") -> TransactionC
     """
     if mcc_code and mcc_code in MCC_TO_CATEGORY:
         return MCC_TO_CATEGORY[mcc_code]
-    
-    description_lower = description.lower()
-    
-    keywords_map = {
-        TransactionCategory.GROCERIES: ["магазин", "магнит", "пятёрочка", "перекрёсток", "ашан", "лента", "дикси"],
-        TransactionCategory.RESTAURANTS: ["ресторан", "кафе", "макдональдс", "kfc", "бургер", "пицца", "суши", "якитория", "starbucks"],
-        TransactionCategory.TRANSPORT: ["метро", "такси", "uber", "яндекс.такси", "бензин", "азс", "парковка", "транспорт"],
-        TransactionCategory.UTILITIES: ["жкх", "электричество", "газ", "вода", "интернет", "мобильная связь", "связь"],
-        TransactionCategory.TRANSFERS: ["перевод", "transfer", "п2п", "p2p"],
-    }
-    
-    for category, keywords in keywords_map.items():
-        if any(keyword in description_lower for keyword in keywords):
-            return category
-    
-    return TransactionCategory.OTHER
+
+    if not description:
+        return TransactionCategory.OTHER
+
+    return _categorize_description(description)
+
+def categorize_transactions(items: Iterable[Tuple[str, str]]) -> List[TransactionCategory]:
+    """
+    Категоризация пачки транзакций: items - пары (mcc_code, description)
+    """
+    mcc_categories = MCC_TO_CATEGORY
+    by_description = _categorize_description
+    other = TransactionCategory.OTHER
+
+    result = []
+    for mcc_code, description in items:
+        category = mcc_categories.get(mcc_code) if mcc_code else None
+        if category is None:
+            category = by_description(description) if description else other
+        result.append(category)
+
+    return result
 
 CATEGORY_NAMES_RU = {
     TransactionCategory.GROCERIES: "Продукты и супермаркеты",
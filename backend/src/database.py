@@ -24,4 +24,10 @@ def get_db():
         db.close()
 
 def create_tables():
+    """
+    Создать отсутствующие таблицы и применить изменения схемы существующих (src/migrations.py)
+    """
+    from src.migrations import run_migrations
+
     Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
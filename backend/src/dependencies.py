@@ -5,6 +5,8 @@ from typing import Optional
 from src.database import get_db
 from src.redis_client import get_redis
 from src.models.user import User
+from src.services.session_service import SessionService
+from src.services.sync_queue import mark_user_active
 import redis
 
 async def get_current_user(
@@ -15,7 +17,7 @@ async def get_current_user(
     if not session_id:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
-    user_id = redis_client.get(f"session:{session_id}")
+    user_id = SessionService.get_user_id(redis_client, session_id)
     if not user_id:
         raise HTTPException(status_code=401, detail="Session expired or invalid")
 
@@ -23,6 +25,8 @@ async def get_current_user(
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
 
+    mark_user_active(redis_client, user.id)
+
     return user
 
 async def get_current_verified_user(
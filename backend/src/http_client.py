@@ -0,0 +1,58 @@
+import logging
+import httpx
+from typing import Dict
+
+from src.config import settings
+from src.constants.bank_config import BANK_URLS
+
+logger = logging.getLogger(__name__)
+
+# Один долгоживущий AsyncClient на банк: keep-alive соединения переиспользуются
+# между запросами, вместо нового TCP+TLS рукопожатия на каждый вызов Bank API
+_bank_clients: Dict[int, httpx.AsyncClient] = {}
+
+def _http2_enabled() -> bool:
+    if not settings.BANK_HTTP2:
+        return False
+
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("⚠️  BANK_HTTP2 включен, но пакет h2 не установлен - используем HTTP/1.1")
+        return False
+
+    return True
+
+def _create_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(settings.BANK_HTTP_TIMEOUT, connect=settings.BANK_HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=settings.BANK_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.BANK_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.BANK_HTTP_KEEPALIVE_EXPIRY
+        ),
+        http2=_http2_enabled()
+    )
+
+def get_bank_http_client(bank_id: int) -> httpx.AsyncClient:
+    client = _bank_clients.get(bank_id)
+
+    if client is None or client.is_closed:
+        client = _create_client()
+        _bank_clients[bank_id] = client
+
+    return client
+
+async def init_bank_http_clients() -> None:
+    for bank_id in BANK_URLS:
+        get_bank_http_client(bank_id)
+
+async def close_bank_http_clients() -> None:
+    clients = list(_bank_clients.values())
+    _bank_clients.clear()
+
+    for client in clients:
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning(f"⚠️  Ошибка закрытия HTTP клиента банка: {e}")
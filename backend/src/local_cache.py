@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+import redis
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Идентификатор процесса: свои же сообщения об инвалидации слушатель пропускает
+_origin = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+class LocalCache:
+    """
+    Первый уровень кеша в памяти процесса перед Redis: LRU + TTL,
+    ограниченный суммарным размером записей в байтах (по длине JSON).
+
+    Значения хранятся уже разобранными и отдаются без копирования -
+    вызывающий код не должен их изменять.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # key -> (value, size, expires_at, cached_at)
+        self._entries: "OrderedDict[str, Tuple[Any, int, float, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """
+        Вернуть (значение, время записи в Redis-кеш по часам time.time()) или None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+
+            value, size, expires_at, cached_at = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return value, cached_at
+
+    def set(self, key: str, value: Any, size: int, cached_at: Optional[float] = None) -> None:
+        if size > self.max_bytes:
+            self.delete([key])
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (value, size, time.monotonic() + self.ttl, cached_at or time.time())
+            self._bytes += size
+
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.stats["evictions"] += 1
+
+    def delete(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._remove(key)
+                    self.stats["invalidations"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "hitRate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "maxBytes": self.max_bytes
+            }
+
+    def _remove(self, key: str) -> None:
+        _, size, _, _ = self._entries.pop(key)
+        self._bytes -= size
+
+local_cache = LocalCache(settings.LOCAL_CACHE_MAX_BYTES, settings.LOCAL_CACHE_TTL)
+
+_listener: Optional[Tuple[Any, Any]] = None
+
+def invalidation_message(keys: Iterable[str]) -> str:
+    return json.dumps({"origin": _origin, "keys": list(keys)})
+
+def invalidate(redis_client: redis.Redis, keys: Iterable[str]) -> None:
+    """
+    Удалить ключи из локального кеша этого процесса и оповестить остальные воркеры.
+    Вызывается после любой записи или удаления ключа в Redis.
+    """
+    keys = list(keys)
+    if not keys:
+        return
+
+    local_cache.delete(keys)
+
+    try:
+        redis_client.publish(settings.LOCAL_CACHE_CHANNEL, invalidation_message(keys))
+    except Exception as e:
+        logger.warning(f"⚠️  Не удалось разослать инвалидацию кеша: {e}")
+
+def _handle_message(message: Dict[str, Any]) -> None:
+    try:
+        data = json.loads(message["data"])
+    except (TypeError, ValueError):
+        return
+
+    if data.get("origin") == _origin:
+        return
+
+    local_cache.delete(data.get("keys", []))
+
+def _handle_listener_error(error: Exception, pubsub, thread) -> None:
+    # Пока соединения нет, инвалидации теряются - локальный кеш больше не согласован
+    logger.warning(f"⚠️  Ошибка подписки на инвалидации кеша: {error}")
+    local_cache.clear()
+    time.sleep(1)
+
+def start_local_cache_listener(redis_client: redis.Redis) -> None:
+    global _listener
+
+    if not settings.LOCAL_CACHE_ENABLED or _listener is not None:
+        return
+
+    pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(**{settings.LOCAL_CACHE_CHANNEL: _handle_message})
+    thread = pubsub.run_in_thread(sleep_time=1.0, daemon=True, exception_handler=_handle_listener_error)
+    _listener = (pubsub, thread)
+
+def stop_local_cache_listener() -> None:
+    global _listener
+
+    if _listener is None:
+        return
+
+    pubsub, thread = _listener
+    _listener = None
+
+    try:
+        thread.stop()
+        pubsub.close()
+    except Exception as e:
+        logger.warning(f"⚠️  Ошибка остановки подписки на инвалидации кеша: {e}")
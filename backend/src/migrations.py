@@ -0,0 +1,131 @@
+"""
+Изменения схемы уже развёрнутой базы. create_all создаёт только отсутствующие
+таблицы: новые колонки, индексы и типы колонок существующих таблиц добавляют
+шаги отсюда. Шаг выполняется один раз - его имя записывается в schema_migrations,
+а SQL шагов идемпотентен, так что повторный запуск после сбоя безопасен.
+Новый шаг добавляется в конец MIGRATIONS, имена шагов не меняются.
+"""
+import logging
+from typing import Callable, NamedTuple, Tuple, Union
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from src.models.daily_rollup import DailySpendingRollup, HourlySpendingRollup
+
+logger = logging.getLogger(__name__)
+
+# Ключ pg_advisory_lock: миграции одновременно запущенных процессов выполняются по очереди
+_LOCK_ID = 7_240_118
+
+Statement = Union[str, Callable[[Connection], None]]
+
+def create_index_concurrently(name: str, table: str, columns: Tuple[str, ...]) -> Callable[[Connection], None]:
+    """
+    CREATE INDEX CONCURRENTLY без блокировки записи в таблицу. Прерванная сборка
+    оставляет индекс INVALID, который IF NOT EXISTS пропустил бы, - такой удаляется и строится заново.
+    """
+    def create(conn: Connection) -> None:
+        valid = conn.execute(text(
+            "SELECT i.indisvalid FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid WHERE c.relname = :name"
+        ), {"name": name}).scalar()
+        if valid is False:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"))
+
+    return create
+
+def alter_to_numeric(table: str, columns: Tuple[str, ...], precision: int = 14, scale: int = 2) -> str:
+    """
+    Перевести колонки double precision в NUMERIC одним ALTER TABLE (таблица
+    переписывается один раз). Значения округляются до копеек, а не усекаются.
+    """
+    return f"ALTER TABLE {table} " + ", ".join(
+        f"ALTER COLUMN {column} TYPE NUMERIC({precision}, {scale}) USING round({column}::numeric, {scale})"
+        for column in columns
+    )
+
+class Migration(NamedTuple):
+    name: str
+    statements: Tuple[Statement, ...]
+    # CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции
+    autocommit: bool = False
+
+MIGRATIONS: Tuple[Migration, ...] = (
+    Migration("0001_bank_accounts_last_synced_at", (
+        "ALTER TABLE bank_accounts ADD COLUMN IF NOT EXISTS last_synced_at TIMESTAMP WITH TIME ZONE",
+    )),
+    # Пока колонки нет, падает любой запрос, загружающий User (get_current_user)
+    Migration("0002_daily_spending_rollups", (
+        lambda conn: DailySpendingRollup.__table__.create(conn, checkfirst=True),
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS spending_rollups_built_at TIMESTAMP WITH TIME ZONE",
+    )),
+    # Индексы для агрегации платежей отправителя и получателя в SQL (AnalyticsEngine)
+    Migration("0003_payments_status_completed_indexes", (
+        create_index_concurrently("ix_payments_user_status_completed", "payments", ("user_id", "status", "completed_at")),
+        create_index_concurrently("ix_payments_to_user_status_completed", "payments", ("to_user_id", "status", "completed_at")),
+    ), autocommit=True),
+    # Агрегаты, построенные до часовых, перестраиваются при следующем обращении
+    # (rebuild удаляет прежние строки, поэтому дневные суммы не удваиваются)
+    Migration("0004_hourly_spending_rollups", (
+        lambda conn: HourlySpendingRollup.__table__.create(conn, checkfirst=True),
+        "UPDATE users SET spending_rollups_built_at = NULL WHERE spending_rollups_built_at IS NOT NULL",
+    )),
+    # Денежные колонки Float -> Numeric(14, 2): модели читают Decimal и считают в Money
+    Migration("0005_money_columns_numeric", (
+        alter_to_numeric("payments", ("amount",)),
+        alter_to_numeric("payment_templates", ("amount",)),
+        alter_to_numeric("savings_goals", ("target_amount", "current_amount")),
+        alter_to_numeric("goal_contribution_rules", ("fixed_amount",)),
+        alter_to_numeric("family_budget_limits", (
+            "monthly_limit", "daily_limit", "current_month_spent", "current_day_spent"
+        )),
+    )),
+    # Курсор незавершённой выгрузки транзакций (AccountService.sync_account_transactions)
+    Migration("0006_bank_accounts_sync_cursor", (
+        "ALTER TABLE bank_accounts ADD COLUMN IF NOT EXISTS sync_next_page INTEGER",
+        "ALTER TABLE bank_accounts ADD COLUMN IF NOT EXISTS sync_since TIMESTAMP WITH TIME ZONE",
+    )),
+)
+
+def run_migrations(engine: Engine) -> None:
+    """
+    Выполнить ещё не применённые шаги (только PostgreSQL)
+    """
+    if engine.dialect.name != "postgresql":
+        return
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_conn:
+        lock_conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": _LOCK_ID})
+        try:
+            lock_conn.execute(text(
+                "CREATE TABLE IF NOT EXISTS schema_migrations ("
+                "name VARCHAR(255) PRIMARY KEY, applied_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now())"
+            ))
+            applied = set(lock_conn.execute(text("SELECT name FROM schema_migrations")).scalars())
+
+            for migration in MIGRATIONS:
+                if migration.name in applied:
+                    continue
+
+                logger.info(f"🔧 Миграция схемы {migration.name}")
+                if migration.autocommit:
+                    _execute(lock_conn, migration.statements)
+                    _record(lock_conn, migration.name)
+                else:
+                    with engine.begin() as conn:
+                        _execute(conn, migration.statements)
+                        _record(conn, migration.name)
+                logger.info(f"✅ Миграция {migration.name} применена")
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": _LOCK_ID})
+
+def _execute(conn: Connection, statements: Tuple[Statement, ...]) -> None:
+    for statement in statements:
+        if callable(statement):
+            statement(conn)
+        else:
+            conn.execute(text(statement))
+
+def _record(conn: Connection, name: str) -> None:
+    conn.execute(text("INSERT INTO schema_migrations (name) VALUES (:name) ON CONFLICT DO NOTHING"), {"name": name})
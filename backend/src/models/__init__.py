@@ -1,5 +1,7 @@
 from src.models.user import User
 from src.models.account import BankAccount
+from src.models.bank_transaction import BankTransaction
+from src.models.daily_rollup import DailySpendingRollup, HourlySpendingRollup
 from src.models.group import Group, GroupMember
 from src.models.invitation import Invitation
 from src.models.otp_code import OTPCode
@@ -8,4 +10,4 @@ from src.models.cashback import CashbackData, CashbackConsent
 from src.models.bank_subscription import BankSubscription, SubscriptionStatus, ServiceType
 from src.models.partner import Partner, PartnerTransaction, PartnerStatus
 
-__all__ = ["User", "BankAccount", "Group", "GroupMember", "Invitation", "OTPCode", "Referral", "ReferralStatus", "CashbackData", "CashbackConsent", "BankSubscription", "SubscriptionStatus", "ServiceType", "Partner", "PartnerTransaction", "PartnerStatus"]
+__all__ = ["User", "BankAccount", "BankTransaction", "DailySpendingRollup", "HourlySpendingRollup", "Group", "GroupMember", "Invitation", "OTPCode", "Referral", "ReferralStatus", "CashbackData", "CashbackConsent", "BankSubscription", "SubscriptionStatus", "ServiceType", "Partner", "PartnerTransaction", "PartnerStatus"]
@@ -23,6 +23,12 @@ class BankAccount(Base):
     
     is_hidden = Column(Boolean, default=False, nullable=False)  # Скрыть баланс счета
 
+    last_synced_at = Column(DateTime(timezone=True), nullable=True)  # Последняя синхронизация транзакций с банком
+
+    # Курсор незавершённой выгрузки транзакций: страница, с которой продолжить, и её водяной знак
+    sync_next_page = Column(Integer, nullable=True)
+    sync_since = Column(DateTime(timezone=True), nullable=True)
+
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Numeric, Text, UniqueConstraint, Index
+from sqlalchemy.sql import func
+from src.database import Base
+
+class BankTransaction(Base):
+    __tablename__ = "bank_transactions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    bank_account_id = Column(Integer, ForeignKey("bank_accounts.id", ondelete="CASCADE"), nullable=True, index=True)
+
+    bank_id = Column(Integer, nullable=False)
+    account_id = Column(String(255), nullable=False)
+    transaction_id = Column(String(255), nullable=False)  # transactionId из Bank API
+
+    booking_ts = Column(DateTime(timezone=True), nullable=False)
+    amount = Column(Numeric(14, 2), nullable=False)
+    currency = Column(String(3), default="RUB", nullable=False)
+    type = Column(String(10), nullable=False)  # debit / credit
+    mcc_code = Column(String(4), nullable=True)
+    category = Column(String(50), nullable=False, index=True)
+    description = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('bank_id', 'account_id', 'transaction_id', name='uq_bank_transaction'),
+        Index('ix_bank_transactions_user_booking', 'user_id', 'booking_ts'),
+        Index('ix_bank_transactions_account_booking', 'bank_id', 'account_id', 'booking_ts'),
+    )
+
+    def __repr__(self):
+        return f"<BankTransaction(id={self.id}, account_id={self.account_id}, transaction_id={self.transaction_id})>"
@@ -0,0 +1,58 @@
+from sqlalchemy import Column, Integer, SmallInteger, String, ForeignKey, Date, Numeric, UniqueConstraint, Index
+from src.database import Base
+
+class DailySpendingRollup(Base):
+    """
+    Суммы операций пользователя за день по категории и направлению (debit / credit).
+    cum_amount / cum_count - накопленные итоги ряда (user_id, category, direction)
+    по этот день включительно: сумма за любой период - разность двух строк.
+    """
+
+    __tablename__ = "daily_spending_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+
+    day = Column(Date, nullable=False)
+    category = Column(String(50), nullable=False)
+    direction = Column(String(10), nullable=False)  # debit / credit
+
+    amount = Column(Numeric(14, 2), default=0, nullable=False)
+    count = Column(Integer, default=0, nullable=False)
+    cum_amount = Column(Numeric(16, 2), default=0, nullable=False)
+    cum_count = Column(Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'category', 'direction', 'day', name='uq_daily_rollup'),
+        Index('ix_daily_rollups_user_day', 'user_id', 'day'),
+    )
+
+    def __repr__(self):
+        return f"<DailySpendingRollup(user_id={self.user_id}, day={self.day}, category={self.category}, direction={self.direction})>"
+
+class HourlySpendingRollup(Base):
+    """
+    Гистограмма операций пользователя за месяц по дню недели и часу
+    (местное время ANALYTICS_TIMEZONE) и направлению (debit / credit).
+    Обновляется вместе с DailySpendingRollup.
+    """
+
+    __tablename__ = "hourly_spending_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+
+    month = Column(Date, nullable=False)  # первое число месяца
+    weekday = Column(SmallInteger, nullable=False)  # 0 - понедельник
+    hour = Column(SmallInteger, nullable=False)
+    direction = Column(String(10), nullable=False)  # debit / credit
+
+    amount = Column(Numeric(14, 2), default=0, nullable=False)
+    count = Column(Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'month', 'direction', 'weekday', 'hour', name='uq_hourly_rollup'),
+    )
+
+    def __repr__(self):
+        return f"<HourlySpendingRollup(user_id={self.user_id}, month={self.month}, weekday={self.weekday}, hour={self.hour})>"
@@ -2,7 +2,7 @@
 Модели для платежей и переводов
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum as SQLEnum, Text
+from sqlalchemy import Column, Integer, String, Numeric, DateTime, ForeignKey, Enum as SQLEnum, Text, Index
 from sqlalchemy.orm import relationship
 from src.database import Base
 import enum
@@ -42,7 +42,7 @@ class Payment(Base):
     payment_type = Column(SQLEnum(PaymentType), nullable=False, index=True)
     
     # Сумма
-    amount = Column(Float, nullable=False)
+    amount = Column(Numeric(14, 2), nullable=False)
     currency = Column(String(3), default="RUB")
     
     # Отправитель
@@ -73,6 +73,12 @@ class Payment(Base):
     user = relationship("User", foreign_keys=[user_id], back_populates="payments")
     recipient = relationship("User", foreign_keys=[to_user_id])
 
+    # Аналитика агрегирует проведённые платежи отправителя и получателя по completed_at
+    __table_args__ = (
+        Index('ix_payments_user_status_completed', 'user_id', 'status', 'completed_at'),
+        Index('ix_payments_to_user_status_completed', 'to_user_id', 'status', 'completed_at'),
+    )
+
     def __repr__(self):
         return f"<Payment(id={self.id}, type={self.payment_type}, amount={self.amount}, status={self.status})>"
 
@@ -96,7 +102,7 @@ class PaymentTemplate(Base):
     to_name = Column(String(255), nullable=True)
     
     # Сумма (опционально, может быть переменной)
-    amount = Column(Float, nullable=True)
+    amount = Column(Numeric(14, 2), nullable=True)
     
     # Описание
     description = Column(Text, nullable=True)
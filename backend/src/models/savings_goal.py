@@ -2,7 +2,7 @@
 Модели для целей накопления
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, Enum as SQLEnum, Text
+from sqlalchemy import Column, Integer, String, Float, Numeric, DateTime, ForeignKey, Boolean, Enum as SQLEnum, Text
 from sqlalchemy.orm import relationship
 from src.database import Base
 import enum
@@ -35,8 +35,8 @@ class SavingsGoal(Base):
     # Основная информация
     name = Column(String(255), nullable=False)
     description = Column(Text, nullable=True)
-    target_amount = Column(Float, nullable=False)
-    current_amount = Column(Float, default=0.0, nullable=False)
+    target_amount = Column(Numeric(14, 2), nullable=False)
+    current_amount = Column(Numeric(14, 2), default=0, nullable=False)
     
     # Счет-цель (где накапливаются деньги)
     target_account_id = Column(Integer, nullable=True)  # ID счета в нашей БД
@@ -77,7 +77,7 @@ class GoalContributionRule(Base):
     rule_type = Column(SQLEnum(ContributionRule), nullable=False)
     
     # Параметры правила
-    fixed_amount = Column(Float, nullable=True)  # Для FIXED_AMOUNT
+    fixed_amount = Column(Numeric(14, 2), nullable=True)  # Для FIXED_AMOUNT
     percentage = Column(Float, nullable=True)  # Для процентных правил (0-100)
     
     # Активность
@@ -103,12 +103,12 @@ class FamilyBudgetLimit(Base):
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     
     # Лимиты
-    monthly_limit = Column(Float, default=0.0, nullable=False)  # Месячный лимит
-    daily_limit = Column(Float, default=0.0, nullable=False)  # Дневной лимит
+    monthly_limit = Column(Numeric(14, 2), default=0, nullable=False)  # Месячный лимит
+    daily_limit = Column(Numeric(14, 2), default=0, nullable=False)  # Дневной лимит
     
     # Текущие траты
-    current_month_spent = Column(Float, default=0.0, nullable=False)
-    current_day_spent = Column(Float, default=0.0, nullable=False)
+    current_month_spent = Column(Numeric(14, 2), default=0, nullable=False)
+    current_day_spent = Column(Numeric(14, 2), default=0, nullable=False)
     
     # Уведомления
     notify_at_percentage = Column(Float, default=80.0, nullable=False)  # Уведомить при % лимита
@@ -24,6 +24,8 @@ class User(Base):
     referral_code = Column(String(50), unique=True, index=True, nullable=True)
     referred_by_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
     referral_rewards = Column(Numeric(10, 2), default=0, nullable=False)
+    # Когда построены дневные агрегаты расходов (daily_spending_rollups); NULL - ещё не построены
+    spending_rollups_built_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -1,5 +1,5 @@
 import redis
-from typing import Optional
+from typing import Dict, Optional
 from src.config import settings
 
 redis_client = redis.Redis(
@@ -10,9 +10,40 @@ redis_client = redis.Redis(
     decode_responses=True
 )
 
+# Тот же сервер без декодирования ответов - для бинарных значений кеша (src.cache_codec)
+redis_binary_client = redis.Redis(
+    host=settings.REDIS_HOST,
+    port=settings.REDIS_PORT,
+    db=settings.REDIS_DB,
+    password=settings.REDIS_PASSWORD if settings.REDIS_PASSWORD else None,
+    decode_responses=False
+)
+
+_binary_clients: Dict[int, redis.Redis] = {}
+
 def get_redis() -> redis.Redis:
     return redis_client
 
+def get_redis_binary() -> redis.Redis:
+    return redis_binary_client
+
+def binary_client_for(client: redis.Redis) -> redis.Redis:
+    """
+    Бинарный клиент к тому же серверу, что и client
+    """
+    if client is redis_client:
+        return redis_binary_client
+
+    pool = client.connection_pool
+    binary = _binary_clients.get(id(pool))
+    if binary is None:
+        binary = redis.Redis(connection_pool=pool.__class__(
+            connection_class=pool.connection_class,
+            **{**pool.connection_kwargs, "decode_responses": False}
+        ))
+        _binary_clients[id(pool)] = binary
+    return binary
+
 def set_with_expiry(key: str, value: str, expiry_seconds: int) -> bool:
     return redis_client.setex(key, expiry_seconds, value)
 
@@ -1,7 +1,9 @@
+import asyncio
 import logging
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from typing import Optional
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
 import redis
 
 from src.database import get_db
@@ -17,6 +19,11 @@ from src.schemas.account import (
 from src.schemas.profile import AccountRenameRequest
 from src.models.user import User
 from src.services.account_service import AccountService
+from src.services.columnar import TransactionColumns
+from src.utils.money import Money
+from src.services.data_version import DataVersionService
+from src.services.rate_limiter import PRIORITY_INTERACTIVE
+from src.services.sync_queue import SyncQueue
 from src.utils.responses import success_response, error_response
 
 logger = logging.getLogger(__name__)
@@ -69,7 +76,7 @@ async def create_account(
     redis_client = get_redis()
     service = AccountService(db, redis_client)
 
-    account, error = service.create_account(
+    account, error = await service.create_account(
         current_user.id,
         request.client_id,
         None
@@ -122,9 +129,11 @@ async def create_account_direct(
     db.commit()
     db.refresh(new_account)
     
+    redis_client = get_redis()
+    DataVersionService(redis_client).bump_user(current_user.id)
+    
     # Сохраняем начальный баланс в Redis для виртуальных счетов
     if initial_balance > 0:
-        redis_client = get_redis()
         balance_key = f"virtual_balance:{new_account.id}"
         redis_client.set(balance_key, str(initial_balance), ex=86400 * 30)  # 30 дней
     
@@ -167,12 +176,12 @@ async def get_account_balances(
     redis_client = get_redis()
     service = AccountService(db, redis_client)
 
-    balance = service.get_account_balance(current_user.id, account_id, client_id)
+    balance = await service.get_account_balance(current_user.id, account_id, client_id)
 
     if not balance:
         return error_response("Не удалось получить баланс", 404)
 
-    return success_response(balance)
+    return success_response(balance, meta={"cache": service.cache_summary()})
 
 @router.get("/{account_id}/transactions")
 async def get_account_transactions(
@@ -184,9 +193,9 @@ async def get_account_transactions(
     redis_client = get_redis()
     service = AccountService(db, redis_client)
 
-    transactions = service.get_account_transactions(current_user.id, account_id, client_id)
+    transactions = await service.get_account_transactions(current_user.id, account_id, client_id)
 
-    return success_response(transactions)
+    return success_response(transactions, meta={"cache": service.cache_summary()})
 
 @router.get("/balances/all")
 async def get_all_balances(
@@ -204,17 +213,18 @@ async def get_all_balances(
         except ValueError:
             return error_response("Неверный формат client_ids. Используйте: 1,2,3", 400)
 
-    balances = service.get_all_user_balances(current_user.id, bank_ids)
+    balances = await service.get_all_user_balances(current_user.id, bank_ids)
 
-    return success_response(balances)
+    return success_response(balances, meta={"cache": service.cache_summary()})
 
 @router.get("/transactions/all")
 async def get_all_transactions(
     client_ids: Optional[str] = Query(None, description="ID банков через запятую (1,2,3)"),
-    offset: int = Query(0, ge=0, description="Смещение для пагинации"),
+    offset: int = Query(0, ge=0, description="Смещение для пагинации (устарело, используйте cursor)"),
     limit: int = Query(20, ge=1, le=100, description="Количество записей (max 100)"),
     start_date: Optional[str] = Query(None, description="Дата начала (YYYY-MM-DD)"),
     end_date: Optional[str] = Query(None, description="Дата окончания (YYYY-MM-DD)"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (pagination.nextCursor)"),
     current_user: User = Depends(get_current_verified_user),
     db: Session = Depends(get_db)
 ):
@@ -228,16 +238,20 @@ async def get_all_transactions(
         except ValueError:
             return error_response("Неверный формат client_ids. Используйте: 1,2,3", 400)
 
-    transactions = service.get_all_user_transactions(
-        current_user.id,
-        bank_ids,
-        offset,
-        limit,
-        start_date,
-        end_date
-    )
+    try:
+        transactions = await service.get_all_user_transactions(
+            current_user.id,
+            bank_ids,
+            offset,
+            limit,
+            start_date,
+            end_date,
+            cursor
+        )
+    except ValueError as e:
+        return error_response(str(e), 400)
 
-    return success_response(transactions)
+    return success_response(transactions, meta={"cache": service.cache_summary()})
 
 @router.put("/{account_id}/rename")
 async def rename_account(
@@ -266,18 +280,40 @@ async def force_sync_account(
     current_user: User = Depends(get_current_verified_user),
     db: Session = Depends(get_db)
 ):
-    redis_client = get_redis()
-    service = AccountService(db, redis_client)
+    """
+    Поставить синхронизацию счета в очередь фонового воркера.
+    Статус задачи - GET /api/accounts/sync-jobs/{jobId}
+    """
+    from src.models.account import BankAccount
     
-    sync_result, error = service.force_sync_account(current_user.id, account_id)
+    account = db.query(BankAccount).filter(
+        BankAccount.id == account_id,
+        BankAccount.user_id == current_user.id
+    ).first()
     
-    if error:
-        return error_response(error, 400)
+    if not account:
+        return error_response("Счёт не найден", 404)
+    
+    queue = SyncQueue(get_redis())
+    job_id = queue.enqueue(current_user.id, account.id, PRIORITY_INTERACTIVE)
     
     return success_response({
-        "message": "Счёт успешно синхронизирован",
-        "syncData": sync_result
-    })
+        "message": "Синхронизация счёта запущена",
+        "jobId": job_id,
+        "job": queue.get_job(job_id)
+    }, 202)
+
+@router.get("/sync-jobs/{job_id}")
+async def get_sync_job(
+    job_id: str,
+    current_user: User = Depends(get_current_verified_user)
+):
+    job = SyncQueue(get_redis()).get_job(job_id)
+    
+    if not job or job["userId"] != current_user.id:
+        return error_response("Задача синхронизации не найдена", 404)
+    
+    return success_response(job)
 
 @router.put("/{account_id}/priority")
 async def set_account_priority(
@@ -305,6 +341,7 @@ async def set_account_priority(
     
     account.priority = priority
     db.commit()
+    DataVersionService(get_redis()).bump_user(current_user.id)
     
     return success_response({
         "message": f"Приоритет установлен: {priority}",
@@ -357,6 +394,7 @@ async def toggle_account_visibility(
     
     account.is_hidden = not account.is_hidden
     db.commit()
+    DataVersionService(get_redis()).bump_user(current_user.id)
     
     return success_response({
         "message": f"Баланс {'скрыт' if account.is_hidden else 'показан'}",
@@ -364,6 +402,17 @@ async def toggle_account_visibility(
         "isHidden": account.is_hidden
     })
 
+def _statement_bounds(start_date: Optional[str], end_date: Optional[str]) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """
+    Период выписки [start_date, end_date] включительно -> полуинтервал в UTC
+    """
+    date_from = datetime.strptime(start_date, "%Y-%m-%d").replace(tzinfo=timezone.utc) if start_date else None
+    date_to = (
+        datetime.strptime(end_date, "%Y-%m-%d").replace(tzinfo=timezone.utc) + timedelta(days=1)
+        if end_date else None
+    )
+    return date_from, date_to
+
 @router.get("/{account_id}/statement")
 async def get_account_statement(
     account_id: int,
@@ -381,7 +430,6 @@ async def get_account_statement(
     service = AccountService(db, redis_client)
     
     from src.models.account import BankAccount
-    from datetime import datetime
     
     # Проверяем доступ к счету
     account = db.query(BankAccount).filter(
@@ -394,7 +442,7 @@ async def get_account_statement(
     
     # Получаем баланс
     try:
-        balance = service.get_account_balance(
+        balance = await service.get_account_balance(
             current_user.id,
             account.account_id,
             account.bank_id
@@ -402,39 +450,28 @@ async def get_account_statement(
     except Exception as e:
         balance = {"amount": 0, "currency": "RUB"}
     
-    # Получаем транзакции
+    # Досинхронизируем счёт; период и статистика считаются по bank_transactions
     try:
-        transactions = service.get_account_transactions(
+        date_from, date_to = _statement_bounds(start_date, end_date)
+        await service.sync_user_transactions(
             current_user.id,
-            account.account_id,
-            account.bank_id
+            [{"accountId": account.account_id, "clientId": account.bank_id}]
+        )
+
+        transactions = service.query_transactions(
+            current_user.id,
+            accounts=[(account.bank_id, account.account_id)],
+            date_from=date_from,
+            date_to=date_to
         )
-        
-        # Фильтруем по датам если указаны
-        if start_date or end_date:
-            filtered_transactions = []
-            for txn in transactions:
-                txn_date = datetime.fromisoformat(txn["date"].replace('Z', '+00:00')).date()
-                
-                if start_date:
-                    start = datetime.strptime(start_date, "%Y-%m-%d").date()
-                    if txn_date < start:
-                        continue
-                
-                if end_date:
-                    end = datetime.strptime(end_date, "%Y-%m-%d").date()
-                    if txn_date > end:
-                        continue
-                
-                filtered_transactions.append(txn)
-            
-            transactions = filtered_transactions
+        columns = TransactionColumns.load(db, current_user.id, [account.bank_id], [account.account_id])
+        period = columns.between(date_from, date_to)
+        total_income = columns.sum(period & ~columns.debit)
+        total_expenses = columns.sum(period & columns.debit)
     except Exception as e:
+        logger.error(f"Ошибка формирования выписки по счету {account_id}: {e}")
         transactions = []
-    
-    # Считаем статистику
-    total_income = sum(abs(txn["amount"]) for txn in transactions if txn.get("type") == "credit")
-    total_expenses = sum(abs(txn["amount"]) for txn in transactions if txn.get("type") == "debit")
+        total_income = total_expenses = Money(0)
     
     return success_response({
         "account": {
@@ -449,13 +486,13 @@ async def get_account_statement(
             "endDate": end_date or "N/A"
         },
         "statistics": {
-            "totalIncome": total_income,
-            "totalExpenses": total_expenses,
-            "netAmount": total_income - total_expenses,
+            "totalIncome": total_income.to_float(),
+            "totalExpenses": total_expenses.to_float(),
+            "netAmount": (total_income - total_expenses).to_float(),
             "transactionCount": len(transactions)
         },
         "transactions": transactions
-    })
+    }, meta={"cache": service.cache_summary()})
 
 @router.get("/statements/all")
 async def get_all_accounts_statement(
@@ -469,91 +506,87 @@ async def get_all_accounts_statement(
     service = AccountService(db, redis_client)
     
     from src.models.account import BankAccount
-    from datetime import datetime
     
     accounts = db.query(BankAccount).filter(
         BankAccount.user_id == current_user.id,
         BankAccount.is_active == True
     ).all()
     
-    total_balance = 0.0
-    all_transactions = []
-    accounts_summary = []
-    
-    for account in accounts:
-        try:
-            balance = service.get_account_balance(
-                current_user.id,
-                account.account_id,
-                account.bank_id
-            )
-            balance_amount = balance.get("amount", 0)
-            total_balance += balance_amount
-            
-            transactions = service.get_account_transactions(
-                current_user.id,
-                account.account_id,
-                account.bank_id
-            )
-            
-            # Фильтруем по датам
-            if start_date or end_date:
-                filtered = []
-                for txn in transactions:
-                    txn_date = datetime.fromisoformat(txn["date"].replace('Z', '+00:00')).date()
-                    
-                    if start_date:
-                        start = datetime.strptime(start_date, "%Y-%m-%d").date()
-                        if txn_date < start:
-                            continue
-                    
-                    if end_date:
-                        end = datetime.strptime(end_date, "%Y-%m-%d").date()
-                        if txn_date > end:
-                            continue
-                    
-                    filtered.append(txn)
-                
-                transactions = filtered
-            
-            all_transactions.extend(transactions)
-            
-            account_income = sum(abs(t["amount"]) for t in transactions if t.get("type") == "credit")
-            account_expenses = sum(abs(t["amount"]) for t in transactions if t.get("type") == "debit")
-            
-            accounts_summary.append({
-                "accountId": account.account_id,
-                "accountName": account.account_name,
-                "balance": balance_amount,
-                "income": account_income,
-                "expenses": account_expenses,
-                "transactionCount": len(transactions)
-            })
-            
-        except Exception as e:
-            logger.error(f"Ошибка получения данных счета {account.id}: {e}")
+    entries = [
+        (current_user.id, {"accountId": account.account_id, "clientId": account.bank_id})
+        for account in accounts
+    ]
+    balances, _ = await asyncio.gather(
+        service.get_account_balances_batch(entries),
+        service.sync_user_transactions(current_user.id, [acc for _, acc in entries])
+    )
+
+    # Счета без баланса в выписку не попадают
+    available = []
+    for account, balance in zip(accounts, balances):
+        if isinstance(balance, Exception):
+            logger.error(f"Ошибка получения данных счета {account.id}: {balance!r}")
             continue
-    
-    # Общая статистика
-    total_income = sum(abs(t["amount"]) for t in all_transactions if t.get("type") == "credit")
-    total_expenses = sum(abs(t["amount"]) for t in all_transactions if t.get("type") == "debit")
-    
-    # Сортируем транзакции по дате
-    all_transactions.sort(key=lambda x: x["date"], reverse=True)
+        available.append((account, balance))
+
+    try:
+        date_from, date_to = _statement_bounds(start_date, end_date)
+        columns = TransactionColumns.load(
+            db, current_user.id, bank_account_ids=[account.id for account, _ in available]
+        )
+        period = columns.between(date_from, date_to)
+        income_by_account = columns.account_totals(period & ~columns.debit)
+        expenses_by_account = columns.account_totals(period & columns.debit)
+        total_income = columns.sum(period & ~columns.debit)
+        total_expenses = columns.sum(period & columns.debit)
+        total_transactions = int(period.sum())
+
+        # Последние транзакции периода
+        all_transactions = service.query_transactions(
+            current_user.id,
+            accounts=[(account.bank_id, account.account_id) for account, _ in available],
+            date_from=date_from,
+            date_to=date_to,
+            limit=100
+        ) if available else []
+    except Exception as e:
+        logger.error(f"Ошибка формирования общей выписки: {e}")
+        income_by_account = expenses_by_account = {}
+        total_income = total_expenses = Money(0)
+        total_transactions = 0
+        all_transactions = []
+
+    # Как и раньше, общий баланс - простая сумма по всем валютам
+    total_balance = 0
+    accounts_summary = []
+    for account, balance in available:
+        balance_amount = Money.from_fields(balance)
+        total_balance += balance_amount.minor
+
+        income, income_count = income_by_account.get(account.id, (Money(0), 0))
+        expenses, expenses_count = expenses_by_account.get(account.id, (Money(0), 0))
+        accounts_summary.append({
+            "accountId": account.account_id,
+            "accountName": account.account_name,
+            "balance": balance_amount.to_float(),
+            "income": income.to_float(),
+            "expenses": expenses.to_float(),
+            "transactionCount": income_count + expenses_count
+        })
     
     return success_response({
         "summary": {
-            "totalBalance": total_balance,
-            "totalIncome": total_income,
-            "totalExpenses": total_expenses,
-            "netAmount": total_income - total_expenses,
+            "totalBalance": total_balance / 100,
+            "totalIncome": total_income.to_float(),
+            "totalExpenses": total_expenses.to_float(),
+            "netAmount": (total_income - total_expenses).to_float(),
             "accountsCount": len(accounts),
-            "totalTransactions": len(all_transactions)
+            "totalTransactions": total_transactions
         },
         "period": {
             "startDate": start_date or "N/A",
             "endDate": end_date or "N/A"
         },
         "accounts": accounts_summary,
-        "transactions": all_transactions[:100]  # Ограничиваем 100 транзакциями
-    })
+        "transactions": all_transactions  # Ограничиваем 100 транзакциями
+    }, meta={"cache": service.cache_summary()})
@@ -7,7 +7,9 @@ from src.database import get_db
 from src.redis_client import get_redis
 from src.dependencies import get_current_verified_user
 from src.models.user import User
+from src.services.analytics_engine import parse_period
 from src.services.analytics_service import AnalyticsService
+from src.services.data_version import DataVersionService
 from src.utils.responses import success_response, error_response
 
 logger = logging.getLogger(__name__)
@@ -30,7 +32,12 @@ async def get_analytics_overview(
         except ValueError:
             return error_response("Неверный формат client_ids", 400)
     
-    overview = service.get_user_overview(current_user.id, bank_ids)
+    overview = await DataVersionService(redis_client).cached_view(
+        "analytics_overview",
+        current_user.id,
+        {"bankIds": bank_ids},
+        lambda: service.get_user_overview(current_user.id, bank_ids)
+    )
     
     return success_response(overview)
 
@@ -41,10 +48,20 @@ async def get_categories_breakdown(
     current_user: User = Depends(get_current_verified_user),
     db: Session = Depends(get_db)
 ):
+    try:
+        parse_period(start_date, end_date)
+    except ValueError:
+        return error_response("Неверный формат даты. Используйте ISO 8601 (YYYY-MM-DD)", 400)
+
     redis_client = get_redis()
     service = AnalyticsService(db, redis_client)
     
-    categories = service.get_categories_breakdown(current_user.id, start_date, end_date)
+    categories = await DataVersionService(redis_client).cached_view(
+        "analytics_categories",
+        current_user.id,
+        {"startDate": start_date, "endDate": end_date},
+        lambda: service.get_categories_breakdown(current_user.id, start_date, end_date)
+    )
     
     return success_response(categories)
 
@@ -82,7 +99,12 @@ async def get_advanced_insights(
         except ValueError:
             return error_response("Неверный формат client_ids", 400)
     
-    insights = service.get_advanced_insights(current_user.id, bank_ids)
+    insights = await DataVersionService(redis_client).cached_view(
+        "analytics_insights",
+        current_user.id,
+        {"bankIds": bank_ids},
+        lambda: service.get_advanced_insights(current_user.id, bank_ids)
+    )
     
     return success_response(insights)
 
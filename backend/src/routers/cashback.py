@@ -9,6 +9,7 @@ from src.redis_client import get_redis
 from src.dependencies import get_current_user
 from src.models.user import User
 from src.services.cashback_service import CashbackService
+from src.services.data_version import DataVersionService
 from src.utils.responses import success_response, error_response
 import redis
 
@@ -25,7 +26,12 @@ async def get_aggregate_cashback(
     """Получить агрегированные данные о кешбеке"""
     try:
         service = CashbackService(db, redis_client)
-        aggregated = service.aggregate_cashback(current_user.id)
+        aggregated = await DataVersionService(redis_client).cached_view(
+            "cashback_aggregate",
+            current_user.id,
+            {},
+            lambda: service.aggregate_cashback(current_user.id)
+        )
         return success_response(aggregated)
     except Exception as e:
         logger.error(f"Ошибка получения агрегированных данных: {e}")
@@ -44,7 +50,7 @@ async def get_monthly_cashback(
             month = datetime.now().strftime("%Y-%m")
 
         service = CashbackService(db, redis_client)
-        cashback_data = service.get_or_create_cashback_data(current_user.id, month)
+        cashback_data = await service.get_or_create_cashback_data(current_user.id, month)
         
         result = {
             "month": month,
@@ -73,7 +79,12 @@ async def get_categories_breakdown(
     """Получить разбивку кешбека по категориям"""
     try:
         service = CashbackService(db, redis_client)
-        breakdown = service.get_categories_breakdown(current_user.id, month)
+        breakdown = await DataVersionService(redis_client).cached_view(
+            "cashback_categories",
+            current_user.id,
+            {"month": month},
+            lambda: service.get_categories_breakdown(current_user.id, month)
+        )
         return success_response({"categories": breakdown})
     except Exception as e:
         logger.error(f"Ошибка получения разбивки по категориям: {e}")
@@ -110,7 +121,7 @@ async def export_cashback_data(
     """Экспорт данных о кешбеке для партнера (требует согласия)"""
     try:
         service = CashbackService(db, redis_client)
-        export_data, error = service.export_cashback_data(current_user.id, partner_id)
+        export_data, error = await service.export_cashback_data(current_user.id, partner_id)
         
         if error:
             return error_response(error, 403)
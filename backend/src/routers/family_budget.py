@@ -8,6 +8,7 @@ from src.dependencies import get_current_user
 from src.models.user import User
 from src.services.savings_service import FamilyBudgetService
 from src.schemas.savings import BudgetLimitCreate, BudgetLimitResponse
+from src.utils.money import Money
 from typing import List
 
 
@@ -63,8 +64,8 @@ async def set_member_limit(
             "limit": {
                 "id": limit.id,
                 "userId": limit.user_id,
-                "monthlyLimit": limit.monthly_limit,
-                "dailyLimit": limit.daily_limit,
+                "monthlyLimit": float(limit.monthly_limit),
+                "dailyLimit": float(limit.daily_limit),
                 "notifyAt": limit.notify_at_percentage
             }
         }
@@ -102,12 +103,12 @@ async def get_group_limits(
                 "id": l.id,
                 "userId": l.user_id,
                 "userName": l.user.name if l.user else "Unknown",
-                "monthlyLimit": l.monthly_limit,
-                "dailyLimit": l.daily_limit,
-                "currentMonthSpent": l.current_month_spent,
-                "currentDaySpent": l.current_day_spent,
+                "monthlyLimit": float(l.monthly_limit),
+                "dailyLimit": float(l.daily_limit),
+                "currentMonthSpent": float(l.current_month_spent),
+                "currentDaySpent": float(l.current_day_spent),
                 "notifyAt": l.notify_at_percentage,
-                "percentageUsed": round((l.current_month_spent / l.monthly_limit * 100) if l.monthly_limit > 0 else 0, 1)
+                "percentageUsed": round(Money.parse(l.current_month_spent).ratio(Money.parse(l.monthly_limit)) * 100, 1)
             }
             for l in limits
         ]
@@ -1,5 +1,5 @@
 import logging
-from fastapi import APIRouter, Depends, Query, Path
+from fastapi import APIRouter, Depends, Query, Path, Request
 from sqlalchemy.orm import Session
 from typing import Optional
 import redis
@@ -20,10 +20,13 @@ from src.schemas.profile import RoleUpdateRequest
 from src.constants.constants import GroupRole
 from src.models.user import User
 from src.models.group import GroupMember
+from src.models.invitation import Invitation
 from src.services.group_service import GroupService
 from src.services.invitation_service import InvitationService
 from src.services.account_service import AccountService
+from src.services.data_version import DataVersionService
 from src.utils.responses import success_response, error_response
+from src.utils.etag import make_etag, etag_matches, not_modified_response, set_etag
 from src.constants.constants import ACCOUNT_LIMITS
 
 logger = logging.getLogger(__name__)
@@ -97,6 +100,8 @@ async def delete_group(
     if not success:
         return error_response(error, 400)
 
+    DataVersionService(get_redis()).bump_group(request.group_id)
+
     return success_response({
         "message": "Группа успешно удалена"
     })
@@ -112,6 +117,8 @@ async def exit_group(
     if not success:
         return error_response(error, 400)
 
+    DataVersionService(get_redis()).bump_group(request.group_id)
+
     return success_response({
         "message": "Вы успешно вышли из группы"
     })
@@ -131,6 +138,7 @@ async def get_group_accounts(
 
 @router.get("/{group_id}/accounts/balances")
 async def get_group_balances(
+    request: Request,
     group_id: int = Path(...),
     client_id: Optional[int] = Query(None),
     current_user: User = Depends(get_current_verified_user),
@@ -144,34 +152,40 @@ async def get_group_balances(
     redis_client = get_redis()
     account_service = AccountService(db, redis_client)
 
+    version = DataVersionService(redis_client).group_version(group_id, [member.id for member in members])
+    etag = make_etag(request, f"group:{group_id}", version)
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+
     balances = []
 
-    for member in members:
-        member_accounts = account_service.get_user_accounts(member.id, client_id)
-
-        for acc in member_accounts:
-            try:
-                balance = account_service.get_account_balance(
-                    member.id,
-                    acc["accountId"],
-                    acc["clientId"]
-                )
-
-                balances.append({
-                    "clientId": str(acc["clientId"]),
-                    "name": acc["clientName"],
-                    "accountName": acc["accountName"],
-                    "owner": {"name": member.name},
-                    "balance": balance
-                })
-            except Exception as e:
-                logger.error(f"Ошибка получения баланса: {e}")
-                continue
-
-    return success_response(balances)
+    entries = [
+        (member, acc)
+        for member in members
+        for acc in account_service.get_user_accounts(member.id, client_id)
+    ]
+    results = await account_service.get_account_balances_batch(
+        [(member.id, acc) for member, acc in entries]
+    )
+
+    for (member, acc), balance in zip(entries, results):
+        if isinstance(balance, Exception):
+            logger.error(f"Ошибка получения баланса: {balance}")
+            continue
+
+        balances.append({
+            "clientId": str(acc["clientId"]),
+            "name": acc["clientName"],
+            "accountName": acc["accountName"],
+            "owner": {"name": member.name},
+            "balance": balance
+        })
+
+    return set_etag(success_response(balances), etag)
 
 @router.get("/{group_id}/accounts/transactions")
 async def get_group_transactions(
+    request: Request,
     group_id: int = Path(...),
     client_id: Optional[int] = Query(None),
     current_user: User = Depends(get_current_verified_user),
@@ -185,31 +199,36 @@ async def get_group_transactions(
     redis_client = get_redis()
     account_service = AccountService(db, redis_client)
 
-    all_transactions = []
+    version = DataVersionService(redis_client).group_version(group_id, [member.id for member in members])
+    etag = make_etag(request, f"group:{group_id}", version)
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
 
-    for member in members:
-        member_accounts = account_service.get_user_accounts(member.id, client_id)
+    all_transactions = []
 
-        for acc in member_accounts:
-            try:
-                transactions = account_service.get_account_transactions(
-                    member.id,
-                    acc["accountId"],
-                    acc["clientId"]
-                )
+    entries = [
+        (member, acc)
+        for member in members
+        for acc in account_service.get_user_accounts(member.id, client_id)
+    ]
+    results = await account_service.get_account_transactions_batch(
+        [(member.id, acc) for member, acc in entries]
+    )
 
-                for txn in transactions:
-                    txn["owner"] = {"name": member.name}
-                    txn["accountName"] = acc["accountName"]
+    for (member, acc), transactions in zip(entries, results):
+        if isinstance(transactions, Exception):
+            logger.error(f"Ошибка получения транзакций: {transactions}")
+            continue
 
-                all_transactions.extend(transactions)
-            except Exception as e:
-                logger.error(f"Ошибка получения транзакций: {e}")
-                continue
+        # Кешированные списки общие для запросов - дополняем копии
+        all_transactions.extend(
+            {**txn, "owner": {"name": member.name}, "accountName": acc["accountName"]}
+            for txn in transactions
+        )
 
     all_transactions.sort(key=lambda x: x.get("date", ""), reverse=True)
 
-    return success_response(all_transactions)
+    return set_etag(success_response(all_transactions), etag)
 
 @router.get("/{group_id}/accounts/{client_id}")
 async def get_group_account_details(
@@ -297,6 +316,9 @@ async def accept_invitation(
     if not success:
         return error_response(error, 400)
 
+    invitation = db.query(Invitation).filter(Invitation.id == request.request_id).first()
+    DataVersionService(get_redis()).bump_group(invitation.group_id)
+
     return success_response({
         "message": "Приглашение принято успешно"
     })
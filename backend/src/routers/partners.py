@@ -170,7 +170,7 @@ async def create_subscription_via_partner(
         except ValueError:
             return error_response(f"Неподдерживаемый тип услуги", 400)
 
-        subscription, error = service.create_subscription(
+        subscription, error = await service.create_subscription(
             user_id,
             subscription_data.get("bank_id"),
             service_type,
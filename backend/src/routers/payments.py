@@ -1,10 +1,12 @@
 """
 API роутер для платежей и переводов
 """
+import redis
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from src.database import get_db
 from src.dependencies import get_current_user
+from src.redis_client import get_redis
 from src.models.user import User
 from src.services.payment_service import PaymentService
 from src.schemas.payment import (
@@ -25,7 +27,8 @@ router = APIRouter(prefix="/api/payments", tags=["Payments"])
 async def transfer_by_phone(
     request: TransferByPhoneRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    redis_client: redis.Redis = Depends(get_redis)
 ):
     """
     Перевод денег зарегистрированному пользователю по номеру телефона
@@ -34,8 +37,7 @@ async def transfer_by_phone(
     Деньги НЕ списываются с реального счета (это sandbox).
     """
     try:
-        payment, error = PaymentService.create_internal_transfer(
-            db,
+        payment, error = await PaymentService(db, redis_client).create_internal_transfer(
             current_user.id,
             request.from_account_id,
             request.to_phone,
@@ -60,7 +62,7 @@ async def transfer_by_phone(
                 "message": f"Перевод {request.amount}₽ успешно выполнен!",
                 "payment": {
                     "id": payment.id,
-                    "amount": payment.amount,
+                    "amount": float(payment.amount),
                     "currency": payment.currency,
                     "status": payment.status.value,
                     "to_name": payment.to_name,
@@ -86,7 +88,8 @@ async def transfer_by_phone(
 async def transfer_card(
     request: TransferRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    redis_client: redis.Redis = Depends(get_redis)
 ):
     """Перевод на карту по номеру счета"""
     if not request.to_account:
@@ -95,8 +98,7 @@ async def transfer_card(
             detail="Укажите номер счета получателя"
         )
     
-    payment, error = PaymentService.create_card_transfer(
-        db,
+    payment, error = await PaymentService(db, redis_client).create_card_transfer(
         current_user.id,
         request.from_account_id,
         request.to_account,
@@ -117,7 +119,7 @@ async def transfer_card(
             "message": "Перевод отправлен в обработку",
             "payment": {
                 "id": payment.id,
-                "amount": payment.amount,
+                "amount": float(payment.amount),
                 "status": payment.status.value,
                 "to_account": payment.to_account
             }
@@ -129,11 +131,11 @@ async def transfer_card(
 async def pay_utility(
     request: UtilityPaymentRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    redis_client: redis.Redis = Depends(get_redis)
 ):
     """Оплата услуг (ЖКХ, связь, интернет и т.д.)"""
-    payment, error = PaymentService.create_utility_payment(
-        db,
+    payment, error = await PaymentService(db, redis_client).create_utility_payment(
         current_user.id,
         request.from_account_id,
         request.payment_type,
@@ -154,7 +156,7 @@ async def pay_utility(
             "message": f"Платеж {request.amount}₽ успешно выполнен!",
             "payment": {
                 "id": payment.id,
-                "amount": payment.amount,
+                "amount": float(payment.amount),
                 "status": payment.status.value,
                 "provider": request.provider,
                 "account_number": request.account_number
@@ -179,7 +181,7 @@ async def get_payment_history(
             {
                 "id": p.id,
                 "paymentType": p.payment_type.value,
-                "amount": p.amount,
+                "amount": float(p.amount),
                 "currency": p.currency,
                 "status": p.status.value,
                 "description": p.description,
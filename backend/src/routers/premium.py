@@ -4,8 +4,10 @@ API роутер для Premium подписки
 import logging
 from fastapi import APIRouter, Depends, HTTPException, status, Body
 from sqlalchemy.orm import Session
+import redis
 from src.database import get_db
 from src.dependencies import get_current_user
+from src.redis_client import get_redis
 from src.models.user import User
 from src.constants.constants import AccountType
 from src.services.payment_service import PaymentService
@@ -29,7 +31,8 @@ class PurchasePremiumRequest(BaseModel):
 async def purchase_premium(
     request: PurchasePremiumRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    redis_client: redis.Redis = Depends(get_redis)
 ):
     """
     Покупка Premium подписки
@@ -86,8 +89,7 @@ async def purchase_premium(
     
     # Создаем платеж
     logger.info(f"💳 Создание платежа Premium для пользователя {current_user.id}, счет: {from_account_id}")
-    payment, error = PaymentService.create_premium_payment(
-        db,
+    payment, error = await PaymentService(db, redis_client).create_premium_payment(
         current_user.id,
         from_account_id,
         amount=299.0
@@ -132,7 +134,7 @@ async def purchase_premium(
             "accountType": current_user.account_type.value,
             "payment": {
                 "id": payment.id,
-                "amount": payment.amount,
+                "amount": float(payment.amount),
                 "status": payment.status.value,
                 "createdAt": payment.created_at.isoformat()
             }
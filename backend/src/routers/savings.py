@@ -74,8 +74,8 @@ async def create_savings_goal(
                 "id": goal.id,
                 "name": goal.name,
                 "description": goal.description,
-                "targetAmount": goal.target_amount,
-                "currentAmount": goal.current_amount,
+                "targetAmount": float(goal.target_amount),
+                "currentAmount": float(goal.current_amount),
                 "progressPercentage": progress["progress_percentage"],
                 "status": goal.status.value,
                 "targetDate": goal.target_date.isoformat() if goal.target_date else None,
@@ -102,8 +102,8 @@ async def get_savings_goals(
                 "id": g.id,
                 "name": g.name,
                 "description": g.description,
-                "targetAmount": g.target_amount,
-                "currentAmount": g.current_amount,
+                "targetAmount": float(g.target_amount),
+                "currentAmount": float(g.current_amount),
                 "progressPercentage": SavingsService.calculate_progress(g)["progress_percentage"],
                 "status": g.status.value,
                 "targetDate": g.target_date.isoformat() if g.target_date else None,
@@ -152,7 +152,7 @@ async def contribute_to_goal(
             "message": message,
             "goal": {
                 "id": goal.id,
-                "currentAmount": goal.current_amount,
+                "currentAmount": float(goal.current_amount),
                 "progressPercentage": progress["progress_percentage"],
                 "status": goal.status.value,
                 "isCompleted": goal.status == "completed"
@@ -224,7 +224,7 @@ async def add_rule_to_goal(
                 "id": rule.id,
                 "ruleType": rule.rule_type.value,
                 "sourceAccountId": rule.source_account_id,
-                "fixedAmount": rule.fixed_amount,
+                "fixedAmount": float(rule.fixed_amount) if rule.fixed_amount is not None else None,
                 "percentage": rule.percentage
             }
         }
@@ -40,7 +40,7 @@ async def get_products(
     """Получить каталог доступных продуктов банка"""
     try:
         service = SubscriptionService(db, redis_client)
-        products = service.get_available_products(current_user.id, bank_id, product_type)
+        products = await service.get_available_products(current_user.id, bank_id, product_type)
         return success_response({"products": products})
     except Exception as e:
         logger.error(f"Ошибка получения продуктов: {e}")
@@ -93,7 +93,7 @@ async def create_subscription(
             return error_response(f"Неподдерживаемый тип услуги: {request.service_type}", 400)
 
         service = SubscriptionService(db, redis_client)
-        subscription, error = service.create_subscription(
+        subscription, error = await service.create_subscription(
             current_user.id,
             request.bank_id,
             service_type,
@@ -1,23 +1,66 @@
+import asyncio
+import base64
+import heapq
 import logging
 import json
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any, Optional, Tuple
+from itertools import islice
+from typing import List, Dict, Any, Optional, Tuple, Callable, Awaitable, Iterator, TypeVar
 import redis
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from src.models.account import BankAccount
+from src.models.bank_transaction import BankTransaction
 from src.models.user import User
-from src.services.bank_client import BankClient
+from src.services.bank_client import BankClient, TransactionBatch, TransactionsInterrupted
+from src.services.rate_limiter import PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+from src.services.swr_cache import SWRCache
+from src.services import balance_cache
+from src.services.data_version import DataVersionService
+from src.services.rollup_service import SpendingRollupService
+from src.services.transaction_record import AccountRef, TransactionRecord
+from src.database import SessionLocal
+from src.local_cache import local_cache, invalidate
+from src.constants.mcc_mapping import categorize_transactions
 from src.config import settings
+from src.utils.money import Money
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Строк в одном INSERT: держимся ниже лимита параметров PostgreSQL
+TRANSACTION_INSERT_BATCH = 1000
+
+def encode_transactions_cursor(booking_ts: datetime, row_id: int) -> str:
+    raw = json.dumps({"d": booking_ts.isoformat(), "i": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_transactions_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        return datetime.fromisoformat(data["d"]), int(data["i"])
+    except Exception:
+        raise ValueError("Некорректный курсор пагинации")
+
 class AccountService:
 
-    def __init__(self, db: Session, redis_client: redis.Redis):
+    def __init__(
+        self,
+        db: Session,
+        redis_client: redis.Redis,
+        priority: str = PRIORITY_INTERACTIVE
+    ):
         self.db = db
         self.redis_client = redis_client
-        self.bank_client = BankClient(redis_client)
+        self.bank_client = BankClient(redis_client, priority)
+        self.cache = SWRCache(redis_client)
+        self.versions = DataVersionService(redis_client)
+        self.rollups = SpendingRollupService(db)
+        self.cache_meta: List[Dict[str, Any]] = []
 
     def get_user_accounts(
         self,
@@ -46,7 +89,7 @@ class AccountService:
 
         return result
 
-    def create_account(
+    async def create_account(
         self,
         user_id: int,
         bank_id: int,
@@ -55,14 +98,14 @@ class AccountService:
         try:
             client_id = f"{settings.TEAM_CLIENT_ID}-{user_id}"
 
-            consent_id = self.bank_client.create_consent(
+            consent_id = await self.bank_client.create_consent(
                 user_id,
                 bank_id,
                 client_id,
                 ["ReadAccountsDetail", "ReadBalances", "ReadTransactionsDetail"]
             )
 
-            bank_accounts = self.bank_client.get_accounts(user_id, bank_id, client_id)
+            bank_accounts = await self.bank_client.get_accounts(user_id, bank_id, client_id)
 
             if not bank_accounts:
                 return None, "Не удалось получить счета из банка"
@@ -81,6 +124,7 @@ class AccountService:
             self.db.add(new_account)
             self.db.commit()
             self.db.refresh(new_account)
+            self.versions.bump_user(user_id)
 
             logger.info(f"✅ Создан счёт {new_account.id} для пользователя {user_id}")
             return new_account, None
@@ -102,9 +146,11 @@ class AccountService:
         if account.user_id and account.user_id != user_id:
             return False, "Счёт уже привязан к другому пользователю"
 
+        previous_user_id = account.user_id
         account.user_id = user_id
         account.is_active = True
         self.db.commit()
+        self.versions.bump_users([user_id] + ([previous_user_id] if previous_user_id else []))
 
         logger.info(f"✅ Счёт {account_id} привязан к пользователю {user_id}")
         return True, None
@@ -117,10 +163,17 @@ class AccountService:
     ) -> Optional[Dict[str, Any]]:
         cache_key = f"account_info:{user_id}:{account_id}"
 
+        local = local_cache.get(cache_key) if settings.LOCAL_CACHE_ENABLED else None
+        if local:
+            return local[0]
+
         cached = self.redis_client.get(cache_key)
         if cached:
             logger.info(f"✅ Используем кешированную информацию о счёте {account_id}")
-            return json.loads(cached)
+            info = json.loads(cached)
+            if settings.LOCAL_CACHE_ENABLED:
+                local_cache.set(cache_key, info, len(cached))
+            return info
 
         account = (
             self.db.query(BankAccount)
@@ -143,66 +196,475 @@ class AccountService:
             "isActive": account.is_active
         }
 
-        self.redis_client.setex(
-            cache_key,
-            settings.BANK_DATA_CACHE_TTL,
-            json.dumps(info)
-        )
+        raw = json.dumps(info)
+        self.redis_client.setex(cache_key, settings.BANK_DATA_CACHE_TTL, raw)
+        if settings.LOCAL_CACHE_ENABLED:
+            local_cache.set(cache_key, info, len(raw))
 
         return info
 
-    def get_account_balance(
+    async def get_account_balance(
         self,
         user_id: int,
         account_id: str,
         bank_id: int
     ) -> Optional[Dict[str, Any]]:
-        cache_key = f"balance:{user_id}:{account_id}"
+        balance, meta = await self.cache.get(
+            f"balance:{user_id}:{account_id}",
+            lambda: self._load_account_balance(user_id, account_id, bank_id),
+            lambda: self._in_background_session("_load_account_balance", user_id, account_id, bank_id)
+        )
+        self.cache_meta.append(meta)
 
-        cached = self.redis_client.get(cache_key)
-        if cached:
-            logger.info(f"✅ Используем кешированный баланс для {account_id}")
-            return json.loads(cached)
+        return balance
 
+    async def _load_account_balance(
+        self,
+        user_id: int,
+        account_id: str,
+        bank_id: int
+    ) -> Optional[Dict[str, Any]]:
         client_id = f"{settings.TEAM_CLIENT_ID}-{user_id}"
-        balance = self.bank_client.get_account_balance(user_id, bank_id, account_id, client_id)
+        balance = await self.bank_client.get_account_balance(user_id, bank_id, account_id, client_id)
 
-        self.redis_client.setex(
-            cache_key,
-            settings.BANK_DATA_CACHE_TTL,
-            json.dumps(balance)
-        )
+        # Версия данных меняется, только если банк вернул другой баланс
+        cached = balance_cache.read(self.redis_client, f"balance:{user_id}:{account_id}")
+        if cached is None or Money.from_fields(cached) != Money.from_fields(balance):
+            self.versions.bump_user(user_id)
 
         return balance
 
-    def get_account_transactions(
+    async def get_account_transactions(
         self,
         user_id: int,
         account_id: str,
         bank_id: int
     ) -> List[Dict[str, Any]]:
-        cache_key = f"transactions:{user_id}:{account_id}"
+        transactions, meta = await self.cache.get(
+            f"transactions:{user_id}:{account_id}",
+            lambda: self._load_account_transactions(user_id, account_id, bank_id),
+            lambda: self._in_background_session("_load_account_transactions", user_id, account_id, bank_id)
+        )
+        self.cache_meta.append(meta)
 
-        cached = self.redis_client.get(cache_key)
-        if cached:
-            logger.info(f"✅ Используем кешированные транзакции для {account_id}")
-            return json.loads(cached)
+        return transactions
+
+    async def _load_account_transactions(
+        self,
+        user_id: int,
+        account_id: str,
+        bank_id: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Синхронизировать счёт и вернуть последние BANK_TXN_CACHE_LIMIT его транзакций -
+        значение кеша transactions:*. Размер записи не растёт вместе с историей счёта:
+        более ранние транзакции читаются из bank_transactions постранично (get_all_user_transactions).
+        """
+        await self.sync_account_transactions(user_id, account_id, bank_id)
+        return self.query_transactions(
+            user_id, accounts=[(bank_id, account_id)], limit=settings.BANK_TXN_CACHE_LIMIT
+        )
+
+    async def get_account_balances_batch(
+        self,
+        entries: List[Tuple[int, Dict[str, Any]]]
+    ) -> List[Any]:
+        """
+        Балансы нескольких счетов: кеш читается одним пайплайном, в банк идут только промахи.
+        entries - пары (user_id, счёт из get_user_accounts); результат в том же порядке,
+        недоступные счета представлены исключением.
+        """
+        return await self._get_cached_batch("balance", "_load_account_balance", entries)
+
+    async def get_account_transactions_batch(
+        self,
+        entries: List[Tuple[int, Dict[str, Any]]]
+    ) -> List[Any]:
+        """
+        Транзакции нескольких счетов, аналогично get_account_balances_batch
+        """
+        return await self._get_cached_batch("transactions", "_load_account_transactions", entries)
+
+    async def _get_cached_batch(
+        self,
+        prefix: str,
+        method_name: str,
+        entries: List[Tuple[int, Dict[str, Any]]]
+    ) -> List[Any]:
+        keys = [f"{prefix}:{user_id}:{acc['accountId']}" for user_id, acc in entries]
+        cached = self.cache.read_many(keys)
+
+        results: List[Any] = [None] * len(entries)
+        misses: List[int] = []
+
+        for index, (entry, key, cached_entry) in enumerate(zip(entries, keys, cached)):
+            if cached_entry is None:
+                misses.append(index)
+                continue
+
+            user_id, acc = entry
+            value, age = cached_entry
+            results[index] = value
+            self.cache_meta.append(self.cache.revalidate(
+                key,
+                age,
+                lambda user_id=user_id, acc=acc: self._in_background_session(
+                    method_name, user_id, acc["accountId"], acc["clientId"]
+                )
+            ))
+
+        if not misses:
+            return results
+
+        load = getattr(self, method_name)
+        loaded = await self.gather_by_account(
+            misses,
+            lambda index: entries[index][1]["clientId"],
+            lambda index: self.cache.load(
+                keys[index],
+                lambda: load(entries[index][0], entries[index][1]["accountId"], entries[index][1]["clientId"]),
+                store=False
+            )
+        )
+
+        to_store = {}
+        for index, value in zip(misses, loaded):
+            results[index] = value
+            if not isinstance(value, Exception):
+                to_store[keys[index]] = value
+                self.cache_meta.append(self.cache.meta(0, False, False))
+
+        self.cache.set_many(to_store)
+
+        return results
+
+    async def _in_background_session(self, method_name: str, *args: Any) -> Any:
+        """
+        Фоновое обновление кеша переживает запрос, поэтому работает в своей сессии БД
+        и с фоновым приоритетом обращений к банку.
+        """
+        db = SessionLocal()
+        try:
+            service = AccountService(db, self.redis_client, PRIORITY_BACKGROUND)
+            return await getattr(service, method_name)(*args)
+        finally:
+            db.close()
+
+    def cache_summary(self) -> Dict[str, Any]:
+        """
+        Свежесть данных, прочитанных этим сервисом из кеша, для метаданных ответа
+        """
+        if not self.cache_meta:
+            return {"stale": False, "ageSeconds": 0, "refreshing": False, "cachedAt": None}
+
+        oldest = max(self.cache_meta, key=lambda meta: meta["ageSeconds"])
+        return {
+            "stale": any(meta["stale"] for meta in self.cache_meta),
+            "ageSeconds": oldest["ageSeconds"],
+            "refreshing": any(meta["refreshing"] for meta in self.cache_meta),
+            "cachedAt": oldest["cachedAt"]
+        }
+
+    async def sync_account_transactions(
+        self,
+        user_id: int,
+        account_id: str,
+        bank_id: int
+    ) -> int:
+        """
+        Синхронизировать транзакции счёта с банком в таблицу bank_transactions.
+        Первая синхронизация выгружает всю историю постранично, последующие -
+        только транзакции не старше водяного знака (последний booking_ts счёта).
+        Выгрузка, не дошедшая до последней страницы (лимит страниц или ошибка банка),
+        сохраняет полученное и курсор (sync_next_page, sync_since): следующая
+        синхронизация продолжает её, а водяной знак и last_synced_at не сдвигаются,
+        пока история не выгружена целиком.
+        Возвращает количество новых транзакций.
+        """
+        account_filter = (
+            BankAccount.user_id == user_id,
+            BankAccount.bank_id == bank_id,
+            BankAccount.account_id == account_id
+        )
+        cursor = self.db.query(BankAccount.sync_next_page, BankAccount.sync_since).filter(*account_filter).first()
+
+        if cursor is not None and cursor.sync_next_page is not None:
+            start_page, watermark = cursor.sync_next_page, cursor.sync_since
+        else:
+            start_page = 1
+            watermark = (
+                self.db.query(BankTransaction.booking_ts)
+                .filter(BankTransaction.bank_id == bank_id, BankTransaction.account_id == account_id)
+                .order_by(BankTransaction.booking_ts.desc())
+                .limit(1)
+                .scalar()
+            )
+        since = watermark.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ") if watermark else None
 
         client_id = f"{settings.TEAM_CLIENT_ID}-{user_id}"
-        transactions = self.bank_client.get_account_transactions(
-            user_id,
-            bank_id,
-            account_id,
-            client_id
+        try:
+            batch = await self.bank_client.get_account_transactions(
+                user_id,
+                bank_id,
+                account_id,
+                client_id,
+                since=since,
+                start_page=start_page
+            )
+        except TransactionsInterrupted as e:
+            added = self._save_sync_batch(user_id, bank_id, account_id, e.batch, watermark, account_filter)
+            logger.warning(f"⚠️  Синхронизация {account_id} прервана на странице {e.batch.next_page}: +{added} транзакций сохранено")
+            raise e.error
+
+        added = self._save_sync_batch(user_id, bank_id, account_id, batch, watermark, account_filter)
+
+        if batch.next_page is not None:
+            logger.info(f"⏸️  Синхронизация {account_id} не завершена: +{added} транзакций, продолжение со страницы {batch.next_page}")
+        elif since:
+            logger.info(f"✅ Инкрементальная синхронизация {account_id}: +{added} транзакций")
+        else:
+            logger.info(f"✅ Полная синхронизация {account_id}: {added} транзакций")
+
+        return added
+
+    def _save_sync_batch(
+        self,
+        user_id: int,
+        bank_id: int,
+        account_id: str,
+        batch: TransactionBatch,
+        watermark: Optional[datetime],
+        account_filter: Tuple[Any, ...]
+    ) -> int:
+        """
+        Сохранить транзакции выгрузки и её курсор. Незавершённая выгрузка запоминает
+        страницу и водяной знак, с которыми её продолжить; last_synced_at ставится
+        только завершённой.
+        """
+        added = self.store_transactions(user_id, bank_id, account_id, batch.records)
+        if added:
+            self.versions.bump_user(user_id)
+
+        if batch.next_page is None:
+            values = {
+                BankAccount.sync_next_page: None,
+                BankAccount.sync_since: None,
+                BankAccount.last_synced_at: datetime.now(timezone.utc)
+            }
+        else:
+            values = {BankAccount.sync_next_page: batch.next_page, BankAccount.sync_since: watermark}
+
+        self.db.query(BankAccount).filter(*account_filter).update(values, synchronize_session=False)
+        self.db.commit()
+
+        return added
+
+    def store_transactions(
+        self,
+        user_id: int,
+        bank_id: int,
+        account_id: str,
+        transactions: List[TransactionRecord]
+    ) -> int:
+        """
+        Сохранить транзакции из Bank API, дубликаты по (bank_id, account_id, transactionId) пропускаются
+        """
+        if not transactions:
+            return 0
+
+        bank_account_id = (
+            self.db.query(BankAccount.id)
+            .filter(
+                BankAccount.user_id == user_id,
+                BankAccount.bank_id == bank_id,
+                BankAccount.account_id == account_id
+            )
+            .scalar()
         )
 
-        self.redis_client.setex(
-            cache_key,
-            settings.BANK_DATA_CACHE_TTL,
-            json.dumps(transactions)
+        categories = categorize_transactions((txn.mcc_code, txn.description) for txn in transactions)
+
+        rows = {}
+        for txn, category in zip(transactions, categories):
+            rows[txn.id] = {
+                "user_id": user_id,
+                "bank_account_id": bank_account_id,
+                "bank_id": bank_id,
+                "account_id": account_id,
+                "transaction_id": txn.id,
+                "booking_ts": txn.booking_ts,
+                "amount": txn.amount.to_decimal(),
+                "currency": txn.amount.currency,
+                "type": txn.type,
+                "mcc_code": txn.mcc_code or None,
+                "category": category.value,
+                "description": txn.description
+            }
+
+        values = list(rows.values())
+        inserted = []
+
+        try:
+            for start in range(0, len(values), TRANSACTION_INSERT_BATCH):
+                stmt = (
+                    pg_insert(BankTransaction)
+                    .values(values[start:start + TRANSACTION_INSERT_BATCH])
+                    .on_conflict_do_nothing(constraint="uq_bank_transaction")
+                    .returning(
+                        BankTransaction.booking_ts,
+                        BankTransaction.category,
+                        BankTransaction.type,
+                        BankTransaction.amount
+                    )
+                )
+                # RETURNING отдаёт только действительно вставленные строки - их и учитываем в агрегатах
+                inserted.extend(self.db.execute(stmt).all())
+
+            self.rollups.add(user_id, inserted)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        return len(inserted)
+
+    def _transactions_query(
+        self,
+        user_id: int,
+        accounts: Optional[List[Tuple[int, str]]] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        categories: Optional[List[str]] = None,
+        txn_type: Optional[str] = None
+    ):
+        query = self.db.query(BankTransaction).filter(BankTransaction.user_id == user_id)
+
+        if accounts:
+            # Счёт задаётся парой (банк, счёт): одинаковый accountId другого банка не попадает в выборку
+            query = query.filter(tuple_(BankTransaction.bank_id, BankTransaction.account_id).in_(accounts))
+        if date_from:
+            query = query.filter(BankTransaction.booking_ts >= date_from)
+        if date_to:
+            query = query.filter(BankTransaction.booking_ts < date_to)
+        if categories:
+            query = query.filter(BankTransaction.category.in_(categories))
+        if txn_type:
+            query = query.filter(BankTransaction.type == txn_type)
+
+        return query.order_by(BankTransaction.booking_ts.desc(), BankTransaction.id.desc())
+
+    def query_transactions(
+        self,
+        user_id: int,
+        accounts: Optional[List[Tuple[int, str]]] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        categories: Optional[List[str]] = None,
+        txn_type: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Транзакции пользователя из bank_transactions; фильтры по дате (полуинтервал
+        [date_from, date_to)), счетам (пары bank_id, account_id) и категориям выполняются в SQL.
+        """
+        query = self._transactions_query(user_id, accounts, date_from, date_to, categories, txn_type)
+
+        if limit:
+            query = query.limit(limit)
+
+        # Только нужные колонки, без ORM-объектов
+        query = query.with_entities(
+            BankTransaction.transaction_id,
+            BankTransaction.booking_ts,
+            BankTransaction.description,
+            BankTransaction.amount,
+            BankTransaction.currency,
+            BankTransaction.type,
+            BankTransaction.mcc_code,
+            BankTransaction.category
         )
+        return [TransactionRecord.from_row(row).to_dict() for row in query]
 
-        return transactions
+    async def sync_user_transactions(
+        self,
+        user_id: int,
+        accounts: List[Dict[str, Any]]
+    ) -> None:
+        """
+        Досинхронизировать счета без кеша транзакций; устаревшие по soft TTL
+        обновляются в фоне, запрос их не ждёт
+        """
+        if not accounts:
+            return
+
+        ages = self.cache.ages([f"transactions:{user_id}:{acc['accountId']}" for acc in accounts])
+
+        stale = []
+        for acc, age in zip(accounts, ages):
+            if age is None:
+                stale.append(acc)
+                continue
+
+            refreshing = False
+            if self.cache.is_stale(age):
+                refreshing = self.cache.schedule_refresh(
+                    f"transactions:{user_id}:{acc['accountId']}",
+                    lambda acc=acc: self._in_background_session(
+                        "_load_account_transactions", user_id, acc["accountId"], acc["clientId"]
+                    )
+                )
+            self.cache_meta.append(self.cache.meta(age, self.cache.is_stale(age), refreshing))
+
+        if not stale:
+            return
+
+        results = await self.get_account_transactions_batch([(user_id, acc) for acc in stale])
+
+        for account, result in zip(stale, results):
+            if isinstance(result, Exception):
+                logger.error(f"Ошибка синхронизации транзакций для {account['accountId']}: {result!r}")
+
+    async def gather_by_account(
+        self,
+        accounts: List[Any],
+        bank_id_of: Callable[[Any], int],
+        fetch: Callable[[Any], Awaitable[T]]
+    ) -> List[Any]:
+        """
+        Параллельно выполнить fetch для каждого счёта.
+        Не более BANK_FANOUT_PER_BANK_LIMIT одновременных запросов к одному банку,
+        общий дедлайн BANK_FANOUT_DEADLINE секунд. Результаты возвращаются в порядке
+        accounts; упавшие или не уложившиеся в дедлайн счета представлены исключением.
+        """
+        if not accounts:
+            return []
+
+        semaphores: Dict[int, asyncio.Semaphore] = {}
+
+        async def run(account: Any) -> T:
+            bank_id = bank_id_of(account)
+            if bank_id not in semaphores:
+                semaphores[bank_id] = asyncio.Semaphore(settings.BANK_FANOUT_PER_BANK_LIMIT)
+
+            async with semaphores[bank_id]:
+                return await fetch(account)
+
+        tasks = [asyncio.ensure_future(run(account)) for account in accounts]
+        _, pending = await asyncio.wait(tasks, timeout=settings.BANK_FANOUT_DEADLINE)
+
+        for task in pending:
+            task.cancel()
+
+        results = []
+        for task in tasks:
+            if task in pending:
+                results.append(asyncio.TimeoutError("Превышен дедлайн запроса к банку"))
+            elif task.exception() is not None:
+                results.append(task.exception())
+            else:
+                results.append(task.result())
+
+        return results
 
     def _get_bank_name(self, bank_id: int) -> str:
         bank_names = {
@@ -212,7 +674,7 @@ class AccountService:
         }
         return bank_names.get(bank_id, f"bank{bank_id}")
 
-    def get_all_user_balances(
+    async def get_all_user_balances(
         self,
         user_id: int,
         bank_ids: Optional[List[int]] = None
@@ -229,118 +691,142 @@ class AccountService:
         balances_data = []
         total_balance = {}
 
-        for account in accounts:
-            try:
-                balance = self.get_account_balance(
-                    user_id,
-                    account["accountId"],
-                    account["clientId"]
-                )
-
-                balance_item = {
-                    "accountId": account["accountId"],
-                    "accountName": account["accountName"],
-                    "clientId": account["clientId"],
-                    "clientName": account["clientName"],
-                    "balance": balance
-                }
-                balances_data.append(balance_item)
+        results = await self.get_account_balances_batch([(user_id, acc) for acc in accounts])
 
-                currency = balance.get("currency", "RUB")
-                amount = balance.get("amount", 0)
+        for account, balance in zip(accounts, results):
+            if isinstance(balance, Exception):
+                logger.error(f"Ошибка получения баланса для {account['accountId']}: {balance!r}")
+                continue
 
-                if currency not in total_balance:
-                    total_balance[currency] = 0
-                total_balance[currency] += amount
+            balance_item = {
+                "accountId": account["accountId"],
+                "accountName": account["accountName"],
+                "clientId": account["clientId"],
+                "clientName": account["clientName"],
+                "balance": balance
+            }
+            balances_data.append(balance_item)
 
-            except Exception as e:
-                logger.error(f"Ошибка получения баланса для {account['accountId']}: {e}")
-                continue
+            amount = Money.from_fields(balance)
+            total_balance[amount.currency] = total_balance.get(amount.currency, Money(0, amount.currency)) + amount
 
         return {
             "accounts": balances_data,
-            "total": [{"currency": curr, "amount": amt} for curr, amt in total_balance.items()],
+            "total": [{"currency": curr, "amount": amt.to_float()} for curr, amt in total_balance.items()],
             "count": len(balances_data)
         }
 
-    def get_all_user_transactions(
+    async def get_all_user_transactions(
         self,
         user_id: int,
         bank_ids: Optional[List[int]] = None,
         offset: int = 0,
         limit: int = 20,
         start_date: Optional[str] = None,
-        end_date: Optional[str] = None
+        end_date: Optional[str] = None,
+        cursor: Optional[str] = None
     ) -> Dict[str, Any]:
         """
-        Получить транзакции всех счетов пользователя с пагинацией и фильтрацией.
-        Оптимизировано для избежания N+1 проблемы.
-        """
-        from datetime import datetime
+        Получить транзакции всех счетов пользователя с фильтрацией.
 
+        Основной режим - keyset-пагинация: непрозрачный курсор (date, id) и ленивое
+        k-way слияние уже отсортированных потоков счетов, страница стоит
+        O(limit · log accounts). offset без курсора поддерживается для совместимости.
+        Бросает ValueError при некорректном курсоре.
+        """
         accounts = self.get_user_accounts(user_id, None)
 
         if bank_ids:
             accounts = [acc for acc in accounts if acc["clientId"] in bank_ids]
 
-        all_transactions = []
+        after = decode_transactions_cursor(cursor) if cursor else None
 
-        for account in accounts:
-            try:
-                transactions = self.get_account_transactions(
-                    user_id,
-                    account["accountId"],
-                    account["clientId"]
-                )
-
-                for txn in transactions:
-                    txn["accountId"] = account["accountId"]
-                    txn["accountName"] = account["accountName"]
-                    txn["clientId"] = account["clientId"]
-                    txn["clientName"] = account["clientName"]
-
-                all_transactions.extend(transactions)
+        await self.sync_user_transactions(user_id, accounts)
 
-            except Exception as e:
-                logger.error(f"Ошибка получения транзакций для {account['accountId']}: {e}")
-                continue
-
-        if start_date or end_date:
-            filtered_transactions = []
-            for txn in all_transactions:
-                txn_date_str = txn.get("date", "")
-                if not txn_date_str:
-                    continue
+        date_from = None
+        date_to = None
+        try:
+            if start_date:
+                date_from = datetime.strptime(start_date, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+            if end_date:
+                date_to = datetime.strptime(end_date, "%Y-%m-%d").replace(tzinfo=timezone.utc) + timedelta(days=1)
+        except ValueError as e:
+            logger.warning(f"Ошибка парсинга даты фильтра: {e}")
+
+        # Один AccountRef на счёт: транзакции ссылаются на него, а не копируют поля
+        accounts_by_key = {(acc["clientId"], acc["accountId"]): AccountRef.from_account(acc) for acc in accounts}
+
+        if offset and not cursor:
+            return self._get_transactions_page_by_offset(
+                user_id, accounts, accounts_by_key, offset, limit, date_from, date_to
+            )
 
-                try:
-                    txn_date = datetime.fromisoformat(txn_date_str.replace('Z', '+00:00'))
-                    txn_date_only = txn_date.date()
+        streams = [
+            self._account_transactions_stream(user_id, acc, after, date_from, date_to, limit + 1)
+            for acc in accounts
+        ]
+        merged = heapq.merge(*streams, key=lambda row: (row.booking_ts, row.id), reverse=True)
+        rows = list(islice(merged, limit + 1))
 
-                    if start_date:
-                        start = datetime.strptime(start_date, "%Y-%m-%d").date()
-                        if txn_date_only < start:
-                            continue
+        has_more = len(rows) > limit
+        rows = rows[:limit]
 
-                    if end_date:
-                        end = datetime.strptime(end_date, "%Y-%m-%d").date()
-                        if txn_date_only > end:
-                            continue
+        return {
+            "transactions": [self._feed_item(row, accounts_by_key) for row in rows],
+            "pagination": {
+                "limit": limit,
+                "nextCursor": encode_transactions_cursor(rows[-1].booking_ts, rows[-1].id) if has_more else None,
+                "hasMore": has_more
+            }
+        }
 
-                    filtered_transactions.append(txn)
+    def _account_transactions_stream(
+        self,
+        user_id: int,
+        account: Dict[str, Any],
+        after: Optional[Tuple[datetime, int]],
+        date_from: Optional[datetime],
+        date_to: Optional[datetime],
+        size: int
+    ) -> Iterator[BankTransaction]:
+        """
+        Поток транзакций одного счёта по убыванию (booking_ts, id), начиная после курсора.
+        Запрос выполняется при первом обращении к потоку.
+        """
+        query = self._transactions_query(
+            user_id,
+            accounts=[(account["clientId"], account["accountId"])],
+            date_from=date_from,
+            date_to=date_to
+        )
 
-                except Exception as e:
-                    logger.warning(f"Ошибка парсинга даты {txn_date_str}: {e}")
-                    filtered_transactions.append(txn)
+        if after:
+            query = query.filter(tuple_(BankTransaction.booking_ts, BankTransaction.id) < tuple_(*after))
 
-            all_transactions = filtered_transactions
+        yield from query.limit(size)
 
-        all_transactions.sort(key=lambda x: x.get("date", ""), reverse=True)
+    def _get_transactions_page_by_offset(
+        self,
+        user_id: int,
+        accounts: List[Dict[str, Any]],
+        accounts_by_key: Dict[Tuple[int, str], AccountRef],
+        offset: int,
+        limit: int,
+        date_from: Optional[datetime],
+        date_to: Optional[datetime]
+    ) -> Dict[str, Any]:
+        query = self._transactions_query(
+            user_id,
+            accounts=list(accounts_by_key),
+            date_from=date_from,
+            date_to=date_to
+        )
 
-        total_count = len(all_transactions)
-        paginated_transactions = all_transactions[offset:offset + limit]
+        total_count = query.order_by(None).count() if accounts else 0
+        rows = query.offset(offset).limit(limit).all() if accounts else []
 
         return {
-            "transactions": paginated_transactions,
+            "transactions": [self._feed_item(row, accounts_by_key) for row in rows],
             "pagination": {
                 "offset": offset,
                 "limit": limit,
@@ -348,6 +834,13 @@ class AccountService:
                 "hasMore": offset + limit < total_count
             }
         }
+
+    def _feed_item(
+        self,
+        row: BankTransaction,
+        accounts_by_key: Dict[Tuple[int, str], AccountRef]
+    ) -> Dict[str, Any]:
+        return TransactionRecord.from_row(row, accounts_by_key.get((row.bank_id, row.account_id))).to_dict()
     
     def rename_account(
         self,
@@ -369,48 +862,37 @@ class AccountService:
         
         account.account_name = new_name
         self.db.commit()
+
+        info_key = f"account_info:{user_id}:{account.account_id}"
+        self.redis_client.delete(info_key)
+        invalidate(self.redis_client, [info_key])
+        self.versions.bump_user(user_id)
         
         logger.info(f"Счёт {account_id} переименован в '{new_name}'")
         return True, None
     
-    def force_sync_account(
-        self,
-        user_id: int,
-        account_id: int
-    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    async def sync_account(self, account: BankAccount) -> Dict[str, Any]:
         """
-        Принудительная синхронизация счета (очистка кеша)
+        Синхронизировать счёт с банком и перезаписать его баланс и транзакции в кеше
+        (задача фоновой синхронизации, см. worker.py)
         """
-        account = (
-            self.db.query(BankAccount)
-            .filter(BankAccount.id == account_id, BankAccount.user_id == user_id)
-            .first()
+        user_id = account.user_id
+
+        balance, transactions = await asyncio.gather(
+            self.cache.load(
+                f"balance:{user_id}:{account.account_id}",
+                lambda: self._load_account_balance(user_id, account.account_id, account.bank_id)
+            ),
+            self.cache.load(
+                f"transactions:{user_id}:{account.account_id}",
+                lambda: self._load_account_transactions(user_id, account.account_id, account.bank_id)
+            )
         )
-        
-        if not account:
-            return None, "Счёт не найден"
-        
-        cache_keys = [
-            f"balance:{user_id}:{account.account_id}",
-            f"transactions:{user_id}:{account.account_id}",
-            f"account_info:{user_id}:{account.account_id}"
-        ]
-        
-        for key in cache_keys:
-            self.redis_client.delete(key)
-        
-        try:
-            balance = self.get_account_balance(user_id, account.account_id, account.bank_id)
-            transactions = self.get_account_transactions(user_id, account.account_id, account.bank_id)
-            
-            logger.info(f"Счёт {account_id} синхронизирован принудительно")
-            
-            return {
-                "balance": balance,
-                "transactionsCount": len(transactions),
-                "syncedAt": datetime.now().isoformat()
-            }, None
-            
-        except Exception as e:
-            logger.error(f"Ошибка синхронизации: {e}")
-            return None, str(e)
\ No newline at end of file
+
+        logger.info(f"✅ Счёт {account.id} синхронизирован")
+
+        return {
+            "balance": balance,
+            "transactionsCount": len(transactions),
+            "syncedAt": account.last_synced_at.isoformat() if account.last_synced_at else None
+        }
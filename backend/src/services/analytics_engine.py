@@ -0,0 +1,559 @@
+import asyncio
+import heapq
+import logging
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from src.config import settings
+from src.services.account_service import AccountService
+from src.services.columnar import TransactionColumns
+from src.services.rollup_service import (
+    SpendingRollupService, RollupTotals, ANALYTICS_TZ, DIRECTION_CREDIT, DIRECTION_DEBIT, PAYMENT_CATEGORY_SQL,
+    day_start, local_month_start, payment_category, payment_hourly, payment_totals, subtract_totals
+)
+from src.constants.mcc_mapping import CATEGORY_NAMES_RU
+from src.constants.constants import TransactionCategory
+from src.models.bank_transaction import BankTransaction
+from src.models.payment import Payment, PaymentStatus
+from src.utils.money import Money
+
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+TOP_TRANSACTIONS = 5
+
+# Поступление считается зарплатой, если составляет не меньше этой доли дохода своего месяца
+PAYDAY_MIN_SHARE = 0.25
+# Допустимый сдвиг дня зарплаты между месяцами (выходные, праздники)
+PAYDAY_TOLERANCE_DAYS = 3
+
+class Fact(NamedTuple):
+    """Операция пользователя, приведённая к общему виду: транзакция банка или внутренний платёж"""
+    id: str
+    ts: datetime
+    date: str
+    description: str
+    amount: Money
+    is_expense: bool
+    category: TransactionCategory
+
+def _as_utc(value: datetime) -> datetime:
+    # Платежи хранят naive UTC (datetime.utcnow), транзакции банка - aware
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+def _parse_day(value: Optional[str]) -> Optional[date]:
+    # Дата или момент в ISO 8601; момент относится к своему дню по UTC, как агрегаты (rollup_day)
+    return _as_utc(datetime.fromisoformat(value.replace("Z", "+00:00"))).date() if value else None
+
+def parse_period(start_date: Optional[str], end_date: Optional[str]) -> Tuple[Optional[date], Optional[date]]:
+    """
+    Период отчёта - дни [start_date, end_date] включительно по UTC. Время в границах
+    отбрасывается: дневные агрегаты не различают моменты внутри дня, и все пути
+    расчёта (агрегаты, колонки транзакций, платежи) должны считать один и тот же период.
+    Бросает ValueError при некорректной дате.
+    """
+    return _parse_day(start_date), _parse_day(end_date)
+
+def _payment_fact(payment: Any) -> Fact:
+    """
+    Исходящий платёж: строка запроса с id, completed_at, description, payment_type, amount
+    """
+    return Fact(
+        id=f"payment_{payment.id}",
+        ts=_as_utc(payment.completed_at),
+        date=payment.completed_at.isoformat(),
+        description=payment.description or f"Платеж {payment.payment_type.value}",
+        amount=Money.parse(payment.amount),
+        is_expense=True,
+        category=payment_category(payment.payment_type)
+    )
+
+def _transaction_fact(row: Any) -> Fact:
+    """
+    Расход по счёту: строка запроса с transaction_id, booking_ts, description, category, amount
+    """
+    return Fact(
+        id=row.transaction_id,
+        ts=_as_utc(row.booking_ts),
+        date=row.booking_ts.isoformat(),
+        description=row.description or "",
+        amount=Money.parse(row.amount),
+        is_expense=True,
+        category=_category(row.category)
+    )
+
+def _naive_utc(value: datetime) -> datetime:
+    # Границы для Payment.completed_at (naive UTC)
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def _category(value: str) -> TransactionCategory:
+    try:
+        return TransactionCategory(value)
+    except ValueError:
+        return TransactionCategory.OTHER
+
+def _months_back(day: date, months: int) -> date:
+    index = day.year * 12 + day.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1)
+
+def detect_paydays(income_days: Dict[date, int]) -> List[int]:
+    """
+    Дни месяца регулярных поступлений (зарплата, аванс). Крупным считается поступление
+    не меньше PAYDAY_MIN_SHARE дохода своего месяца; день зарплаты - день месяца, около
+    которого (± PAYDAY_TOLERANCE_DAYS) крупные поступления были хотя бы в половине
+    месяцев истории и не меньше чем в двух.
+    """
+    monthly: Dict[Tuple[int, int], int] = {}
+    for day, amount in income_days.items():
+        monthly[(day.year, day.month)] = monthly.get((day.year, day.month), 0) + amount
+
+    large = [
+        (day.day, (day.year, day.month))
+        for day, amount in income_days.items()
+        if amount > 0 and amount >= monthly[(day.year, day.month)] * PAYDAY_MIN_SHARE
+    ]
+    min_support = max(2, (len(monthly) + 1) // 2)
+
+    candidates = []
+    for anchor in range(1, 32):
+        near = [(day, month) for day, month in large if abs(day - anchor) <= PAYDAY_TOLERANCE_DAYS]
+        support = len({month for _, month in near})
+        if support >= min_support:
+            spread = sum(abs(day - anchor) for day, _ in near) / len(near)
+            candidates.append((-support, spread, anchor))
+
+    # Жадно берём самые регулярные дни, не пересекающиеся окнами допуска
+    paydays: List[int] = []
+    for _, _, anchor in sorted(candidates):
+        if all(abs(anchor - chosen) > 2 * PAYDAY_TOLERANCE_DAYS for chosen in paydays):
+            paydays.append(anchor)
+    return sorted(paydays)
+
+def days_until_payday(paydays: List[int], today: date) -> Optional[int]:
+    """
+    Дней до ближайшего дня зарплаты (0 - сегодня); день за концом месяца - последнее число
+    """
+    if not paydays:
+        return None
+
+    result = None
+    for payday in paydays:
+        month = today.replace(day=1)
+        for _ in range(2):
+            last_day = ((month + timedelta(days=32)).replace(day=1) - timedelta(days=1)).day
+            candidate = month.replace(day=min(payday, last_day))
+            if candidate >= today:
+                days = (candidate - today).days
+                result = days if result is None else min(result, days)
+                break
+            month = (month + timedelta(days=32)).replace(day=1)
+    return result
+
+class AnalyticsReport:
+    """
+    Все метрики аналитики пользователя: итоги по месяцам и категориям периода
+    (из агрегатов или колонок транзакций), топ-транзакции категорий, гистограмма
+    расходов месяца по дням недели и часам и дневные поступления для поиска дня
+    зарплаты. overview() / categories() собирают из них ответы эндпоинтов.
+    """
+
+    def __init__(self, now: datetime, start_day: Optional[date], end_day: Optional[date]):
+        self.current_month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        self.previous_month_start = (self.current_month_start - timedelta(days=1)).replace(day=1)
+        # Период - дни [start_day, end_day] включительно, он же полуинтервал [start, end) в UTC
+        self.start_day = start_day
+        self.end_day = end_day
+        self.start = day_start(start_day) if start_day else None
+        self.end = day_start(end_day + timedelta(days=1)) if end_day else None
+
+        # Гистограмма и день зарплаты - по местному времени ANALYTICS_TZ
+        self.today = now.astimezone(ANALYTICS_TZ).date()
+        self.local_month = self.today.replace(day=1)
+        self.local_month_start = local_month_start(now)
+        self.income_since = _months_back(self.local_month, settings.PAYDAY_LOOKBACK_MONTHS)
+
+        # Суммы копятся в Money (целые копейки), в float переводятся только в ответах
+        self.with_balances = False
+        self.balances_by_currency: Dict[str, Money] = {}
+        self.accounts_count = 0
+
+        self.current_expenses = Money(0)
+        self.current_income = Money(0)
+        self.previous_expenses = Money(0)
+        self.previous_income = Money(0)
+        self.month_categories: Dict[TransactionCategory, Money] = {}
+        # Расходы текущего месяца по (день недели, час): [сумма, количество]
+        self.time_grid = [[Money(0), 0] for _ in range(len(WEEKDAYS) * 24)]
+        # Поступления (кроме переводов) по дням с income_since
+        self.income_days: Dict[date, Money] = {}
+
+        # Расходы за период [start, end) по категориям: [сумма, количество, heap топ-транзакций]
+        self.period_categories: Dict[TransactionCategory, List[Any]] = {}
+
+    def add_balance(self, balance: Dict[str, Any]) -> None:
+        amount = Money.from_fields(balance)
+        self.balances_by_currency[amount.currency] = self.balances_by_currency.get(amount.currency, Money(0, amount.currency)) + amount
+
+    def add_month_totals(self, current: RollupTotals, previous: RollupTotals) -> None:
+        """
+        Итоги текущего и прошлого месяца по (категория, направление)
+        """
+        for (category, direction), (amount, _) in current.items():
+            if direction == DIRECTION_DEBIT:
+                self.current_expenses += amount
+                cat = _category(category)
+                self.month_categories[cat] = self.month_categories.get(cat, Money(0)) + amount
+            else:
+                self.current_income += amount
+
+        for (_, direction), (amount, _) in previous.items():
+            if direction == DIRECTION_DEBIT:
+                self.previous_expenses += amount
+            else:
+                self.previous_income += amount
+
+    def add_time_totals(self, weekday: int, hour: int, amount: Money, count: int) -> None:
+        slot = self.time_grid[weekday * 24 + hour]
+        slot[0] += amount
+        slot[1] += count
+
+    def add_income_day(self, day: date, amount: Money) -> None:
+        self.income_days[day] = self.income_days.get(day, Money(0)) + amount
+
+    def add_period_totals(self, totals: RollupTotals, top_facts: List[Fact]) -> None:
+        """
+        Расходы за период по категориям; top_facts - кандидаты в топ-транзакции категорий
+        """
+        for (category, direction), (amount, count) in totals.items():
+            if direction != DIRECTION_DEBIT:
+                continue
+            data = self.period_categories.setdefault(_category(category), [Money(0), 0, []])
+            data[0] += amount
+            data[1] += count
+
+        for seq, fact in enumerate(top_facts):
+            data = self.period_categories.get(fact.category)
+            if data is not None:
+                self._push_top(data[2], fact, seq)
+
+    def _push_top(self, top: List[Any], fact: Fact, seq: int) -> None:
+        entry = (fact.amount.minor, seq, fact)
+        if len(top) < TOP_TRANSACTIONS:
+            heapq.heappush(top, entry)
+        elif entry > top[0]:
+            heapq.heapreplace(top, entry)
+
+    def overview(self) -> Dict[str, Any]:
+        top_categories = sorted(
+            [
+                {
+                    "category": cat.value,
+                    "categoryName": CATEGORY_NAMES_RU.get(cat, cat.value),
+                    "amount": amount.to_float(),
+                    "percentage": round(amount.ratio(self.current_expenses) * 100, 1)
+                }
+                for cat, amount in self.month_categories.items()
+            ],
+            key=lambda x: x["amount"],
+            reverse=True
+        )[:5]
+
+        return {
+            # Как и раньше, общий баланс - простая сумма по всем валютам
+            "totalBalance": sum(amount.minor for amount in self.balances_by_currency.values()) / 100,
+            "balanceByCurrency": {currency: amount.to_float() for currency, amount in self.balances_by_currency.items()},
+            "currentMonth": {
+                "expenses": self.current_expenses.to_float(),
+                "income": self.current_income.to_float(),
+                "expenseChange": self._change(self.current_expenses, self.previous_expenses),
+                "incomeChange": self._change(self.current_income, self.previous_income)
+            },
+            "topCategories": top_categories,
+            "accountsCount": self.accounts_count
+        }
+
+    def categories(self) -> List[Dict[str, Any]]:
+        total_amount = sum((data[0] for data in self.period_categories.values()), Money(0))
+
+        result = []
+        for category, (amount, count, top) in self.period_categories.items():
+            result.append({
+                "category": category.value,
+                "categoryName": CATEGORY_NAMES_RU.get(category, category.value),
+                "amount": amount.to_float(),
+                "count": count,
+                "percentage": round(amount.ratio(total_amount) * 100, 1),
+                "topTransactions": [
+                    {"id": fact.id, "date": fact.date, "description": fact.description, "amount": fact.amount.to_float()}
+                    for _, _, fact in sorted(top, reverse=True)
+                ]
+            })
+
+        return sorted(result, key=lambda x: x["amount"], reverse=True)
+
+    def weekday_stats(self) -> Dict[str, Dict[str, Any]]:
+        result = {}
+        for weekday, day in enumerate(WEEKDAYS):
+            slots = self.time_grid[weekday * 24:(weekday + 1) * 24]
+            result[day] = {
+                "expenses": sum((amount for amount, _ in slots), Money(0)).to_float(),
+                "count": sum(count for _, count in slots)
+            }
+        return result
+
+    def hour_stats(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "hour": hour,
+                "expenses": sum((self.time_grid[weekday * 24 + hour][0] for weekday in range(len(WEEKDAYS))), Money(0)).to_float(),
+                "count": sum(self.time_grid[weekday * 24 + hour][1] for weekday in range(len(WEEKDAYS)))
+            }
+            for hour in range(24)
+        ]
+
+    def paydays(self) -> List[int]:
+        return detect_paydays({day: amount.minor for day, amount in self.income_days.items()})
+
+    def _change(self, current: Money, previous: Money) -> float:
+        if previous.minor > 0:
+            return round((current - previous).ratio(previous) * 100, 1)
+        return 0.0
+
+class AnalyticsEngine:
+    """
+    Аналитика пользователя за один проход на запрос.
+
+    Итоги по месяцам и категориям читаются из дневных агрегатов (SpendingRollupService)
+    за постоянное число запросов; из сырых операций выбираются только топ-транзакции.
+    При фильтре по банкам (в агрегатах нет разреза по банкам) транзакции загружаются
+    в колоночном виде (TransactionColumns) и агрегируются векторно, внутренние
+    платежи агрегируются в SQL.
+    """
+
+    def __init__(self, db: Session, account_service: AccountService):
+        self.db = db
+        self.account_service = account_service
+        self.rollups = SpendingRollupService(db)
+
+    async def build(
+        self,
+        user_id: int,
+        bank_ids: Optional[List[int]] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        with_balances: bool = True
+    ) -> AnalyticsReport:
+        report = AnalyticsReport(datetime.now(timezone.utc), *parse_period(start_date, end_date))
+
+        accounts = self.account_service.get_user_accounts(user_id, None)
+        if bank_ids:
+            accounts = [acc for acc in accounts if acc["clientId"] in bank_ids]
+        report.accounts_count = len(accounts)
+        report.with_balances = with_balances
+
+        # Новые транзакции попадают в bank_transactions и агрегаты при синхронизации
+        balances = await self._sync_accounts(user_id, accounts, with_balances)
+
+        if bank_ids:
+            self._add_columns(report, TransactionColumns.load(
+                self.db, user_id, bank_ids, [acc["accountId"] for acc in accounts]
+            ))
+            self._add_payments(report, user_id)
+        else:
+            self._add_rollups(report, user_id)
+
+        for balance in balances:
+            if isinstance(balance, Exception):
+                logger.error(f"Ошибка получения баланса: {balance}")
+                continue
+            report.add_balance(balance)
+
+        return report
+
+    async def _sync_accounts(
+        self,
+        user_id: int,
+        accounts: List[Dict[str, Any]],
+        with_balances: bool
+    ) -> List[Any]:
+        if not with_balances:
+            await self.account_service.sync_user_transactions(user_id, accounts)
+            return []
+
+        balances, _ = await asyncio.gather(
+            self.account_service.get_account_balances_batch([(user_id, acc) for acc in accounts]),
+            self.account_service.sync_user_transactions(user_id, accounts)
+        )
+        return balances
+
+    def _add_rollups(self, report: AnalyticsReport, user_id: int) -> None:
+        self.rollups.ensure_built(user_id)
+
+        current_month = report.current_month_start.date()
+        previous_month = report.previous_month_start.date()
+
+        latest = self.rollups.cumulative(user_id)
+        before_current = self.rollups.cumulative(user_id, current_month - timedelta(days=1))
+        before_previous = self.rollups.cumulative(user_id, previous_month - timedelta(days=1))
+        report.add_month_totals(
+            subtract_totals(latest, before_current),
+            subtract_totals(before_current, before_previous)
+        )
+
+        for weekday, hour, amount, count in self.rollups.hourly(user_id, report.local_month):
+            report.add_time_totals(weekday, hour, amount, count)
+
+        for day, amount, _ in self.rollups.daily(
+            user_id,
+            report.income_since,
+            direction=DIRECTION_CREDIT,
+            exclude_categories=[TransactionCategory.TRANSFERS.value]
+        ):
+            report.add_income_day(day, amount)
+
+        if report.start_day is None and report.end_day is None:
+            period = latest
+        else:
+            period = self.rollups.range_totals(user_id, report.start_day, report.end_day)
+        report.add_period_totals(period, self._top_facts(user_id, report.start, report.end))
+
+    def _add_columns(self, report: AnalyticsReport, columns: TransactionColumns) -> None:
+        current = columns.between(report.current_month_start)
+        previous = columns.between(report.previous_month_start, report.current_month_start)
+        report.add_month_totals(columns.totals(current), columns.totals(previous))
+
+        local_month = columns.between(report.local_month_start) & columns.debit
+        for weekday, hour, amount, count in columns.hourly(local_month, ANALYTICS_TZ):
+            report.add_time_totals(weekday, hour, amount, count)
+
+        income = columns.between(day_start(report.income_since)) & ~columns.debit
+        income &= ~columns.category(TransactionCategory.TRANSFERS)
+        for day, amount, _ in columns.daily(income):
+            report.add_income_day(day, amount)
+
+        period = columns.between(report.start, report.end)
+        top = columns.top_ids(period & columns.debit, TOP_TRANSACTIONS)
+        rows = self.db.query(
+            BankTransaction.transaction_id,
+            BankTransaction.booking_ts,
+            BankTransaction.description,
+            BankTransaction.category,
+            func.abs(BankTransaction.amount).label("amount")
+        ).filter(BankTransaction.id.in_(top)).all() if top else []
+
+        report.add_period_totals(columns.totals(period), [_transaction_fact(row) for row in rows])
+
+    def _top_facts(self, user_id: int, since: Optional[datetime], until: Optional[datetime]) -> List[Fact]:
+        """
+        Крупнейшие расходы каждой категории за [since, until): топ транзакций
+        банка оконной функцией в SQL и исходящие внутренние платежи
+        """
+        amount = func.abs(BankTransaction.amount)
+        query = select(
+            BankTransaction.transaction_id,
+            BankTransaction.booking_ts,
+            BankTransaction.description,
+            BankTransaction.category,
+            amount.label("amount"),
+            func.row_number().over(
+                partition_by=BankTransaction.category,
+                order_by=(amount.desc(), BankTransaction.id.desc())
+            ).label("rank")
+        ).where(BankTransaction.user_id == user_id, BankTransaction.type == DIRECTION_DEBIT)
+
+        if since:
+            query = query.where(BankTransaction.booking_ts >= since)
+        if until:
+            query = query.where(BankTransaction.booking_ts < until)
+
+        ranked = query.subquery()
+        facts = [
+            _transaction_fact(row)
+            for row in self.db.execute(select(ranked).where(ranked.c.rank <= TOP_TRANSACTIONS))
+        ]
+
+        facts.extend(self._top_payment_facts(
+            user_id,
+            _naive_utc(since) if since else None,
+            _naive_utc(until) if until else None
+        ))
+        return facts
+
+    def _top_payment_facts(self, user_id: int, since: Optional[datetime], until: Optional[datetime]) -> List[Fact]:
+        """
+        Крупнейшие исходящие платежи каждой категории за [since, until) (naive UTC)
+        """
+        query = select(
+            Payment.id,
+            Payment.completed_at,
+            Payment.description,
+            Payment.payment_type,
+            Payment.amount,
+            func.row_number().over(
+                partition_by=PAYMENT_CATEGORY_SQL,
+                order_by=(Payment.amount.desc(), Payment.id.desc())
+            ).label("rank")
+        ).where(
+            Payment.user_id == user_id,
+            Payment.status == PaymentStatus.COMPLETED,
+            Payment.completed_at.isnot(None)
+        )
+        if since is not None:
+            query = query.where(Payment.completed_at >= since)
+        if until is not None:
+            query = query.where(Payment.completed_at < until)
+
+        ranked = query.subquery()
+        try:
+            return [
+                _payment_fact(row)
+                for row in self.db.execute(select(ranked).where(ranked.c.rank <= TOP_TRANSACTIONS))
+            ]
+        except Exception as e:
+            logger.error(f"Ошибка получения внутренних платежей: {e}")
+            return []
+
+    def _add_payments(self, report: AnalyticsReport, user_id: int) -> None:
+        """
+        Внутренние платежи при фильтре по банкам: суммы по категориям и дням
+        считаются в SQL, из строк выбираются только топ-платежи периода
+        и платежи текущего месяца для гистограммы по часам
+        """
+        current_month = report.current_month_start.date()
+        previous_month = report.previous_month_start.date()
+        current: RollupTotals = {}
+        previous: RollupTotals = {}
+
+        try:
+            for category, direction, day, amount, count in payment_totals(
+                self.db, user_id, since=_naive_utc(day_start(min(previous_month, report.income_since)))
+            ):
+                if direction == DIRECTION_CREDIT and category != TransactionCategory.TRANSFERS.value and day >= report.income_since:
+                    report.add_income_day(day, amount)
+
+                if day < previous_month:
+                    continue
+                totals = current if day >= current_month else previous
+                total_amount, total_count = totals.get((category, direction), (Money(0), 0))
+                totals[(category, direction)] = (total_amount + amount, total_count + count)
+
+            hours = payment_hourly(self.db, user_id, since=_naive_utc(report.local_month_start))
+            for (month, direction, weekday, hour), (amount, count) in hours.items():
+                if direction == DIRECTION_DEBIT and month == report.local_month:
+                    report.add_time_totals(weekday, hour, Money(amount), count)
+
+            since = _naive_utc(report.start) if report.start else None
+            until = _naive_utc(report.end) if report.end else None
+            period = {
+                (category, direction): (amount, count)
+                for category, direction, _, amount, count in payment_totals(self.db, user_id, since, until, by_day=False)
+            }
+        except Exception as e:
+            logger.error(f"Ошибка получения внутренних платежей: {e}")
+            return
+
+        report.add_month_totals(current, previous)
+        report.add_period_totals(period, self._top_payment_facts(user_id, since, until))
@@ -1,13 +1,10 @@
 import logging
 from sqlalchemy.orm import Session
-from typing import Dict, Any, List
-from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
 import redis
 
 from src.services.account_service import AccountService
-from src.constants.mcc_mapping import categorize_transaction, CATEGORY_NAMES_RU
-from src.constants.constants import TransactionCategory
-from src.models.payment import Payment, PaymentType, PaymentStatus
+from src.services.analytics_engine import AnalyticsEngine, AnalyticsReport, days_until_payday
 
 logger = logging.getLogger(__name__)
 
@@ -17,8 +14,29 @@ class AnalyticsService:
         self.db = db
         self.redis_client = redis_client
         self.account_service = AccountService(db, redis_client)
+        self.engine = AnalyticsEngine(db, self.account_service)
+        # Отчёты одного прохода в рамках запроса
+        self._reports: Dict[Tuple, AnalyticsReport] = {}
     
-    def get_user_overview(
+    async def _report(
+        self,
+        user_id: int,
+        bank_ids: Optional[List[int]] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        with_balances: bool = True
+    ) -> AnalyticsReport:
+        key = (user_id, tuple(bank_ids or ()), start_date, end_date)
+        report = self._reports.get(key)
+
+        # Отчёт с балансами подходит и запросу без них
+        if report is None or (with_balances and not report.with_balances):
+            report = await self.engine.build(user_id, bank_ids, start_date, end_date, with_balances)
+            self._reports[key] = report
+
+        return report
+    
+    async def get_user_overview(
         self,
         user_id: int,
         bank_ids: List[int] = None
@@ -26,191 +44,10 @@ class AnalyticsService:
         """
         Обзорная аналитика пользователя: балансы, доходы, расходы
         """
-        accounts = self.account_service.get_user_accounts(user_id, None)
-        
-        if bank_ids:
-            accounts = [acc for acc in accounts if acc["clientId"] in bank_ids]
-        
-        total_balance = 0.0
-        balances_by_currency = {}
-        
-        for account in accounts:
-            try:
-                balance = self.account_service.get_account_balance(
-                    user_id,
-                    account["accountId"],
-                    account["clientId"]
-                )
-                
-                amount = balance.get("amount", 0)
-                currency = balance.get("currency", "RUB")
-                
-                total_balance += amount
-                
-                if currency not in balances_by_currency:
-                    balances_by_currency[currency] = 0
-                balances_by_currency[currency] += amount
-                
-            except Exception as e:
-                logger.error(f"Ошибка получения баланса: {e}")
-                continue
-        
-        current_month_start = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        previous_month_start = (current_month_start - timedelta(days=1)).replace(day=1)
-        
-        current_expenses = 0.0
-        current_income = 0.0
-        previous_expenses = 0.0
-        previous_income = 0.0
-        
-        category_totals = {}
-        
-        # Обрабатываем транзакции из Bank API
-        for account in accounts:
-            try:
-                transactions = self.account_service.get_account_transactions(
-                    user_id,
-                    account["accountId"],
-                    account["clientId"]
-                )
-                
-                for txn in transactions:
-                    try:
-                        txn_date = datetime.fromisoformat(txn["date"].replace('Z', '+00:00'))
-                        amount = abs(txn["amount"])
-                        txn_type = txn.get("type", "debit")
-                        
-                        category = categorize_transaction(
-                            txn.get("mccCode", ""),
-                            txn.get("description", "")
-                        )
-                        
-                        if txn_date >= current_month_start:
-                            if txn_type == "debit":
-                                current_expenses += amount
-                                
-                                if category not in category_totals:
-                                    category_totals[category] = 0
-                                category_totals[category] += amount
-                            else:
-                                current_income += amount
-                        
-                        elif txn_date >= previous_month_start and txn_date < current_month_start:
-                            if txn_type == "debit":
-                                previous_expenses += amount
-                            else:
-                                previous_income += amount
-                    
-                    except Exception as e:
-                        logger.warning(f"Ошибка обработки транзакции: {e}")
-                        continue
-                
-            except Exception as e:
-                logger.error(f"Ошибка получения транзакций: {e}")
-                continue
-        
-        # Обрабатываем внутренние платежи (Payment модель)
-        try:
-            from sqlalchemy import or_
-            internal_payments = self.db.query(Payment).filter(
-                or_(
-                    Payment.user_id == user_id,  # Исходящие платежи
-                    Payment.to_user_id == user_id  # Входящие платежи
-                ),
-                Payment.status == PaymentStatus.COMPLETED,
-                Payment.completed_at.isnot(None)
-            ).all()
-            
-            for payment in internal_payments:
-                try:
-                    payment_date = payment.completed_at
-                    if not payment_date:
-                        payment_date = payment.created_at
-                    
-                    amount = float(payment.amount)
-                    
-                    # Определяем, это доход или расход
-                    is_incoming = payment.to_user_id == user_id if payment.to_user_id else False
-                    is_outgoing = payment.user_id == user_id
-                    
-                    if payment_date >= current_month_start:
-                        if is_outgoing:
-                            # Исходящий платеж - это расход
-                            current_expenses += amount
-                            
-                            # Определяем категорию по типу платежа
-                            category = TransactionCategory.OTHER
-                            if payment.payment_type == PaymentType.UTILITIES:
-                                category = TransactionCategory.UTILITIES
-                            elif payment.payment_type == PaymentType.MOBILE or payment.payment_type == PaymentType.PHONE:
-                                category = TransactionCategory.COMMUNICATIONS
-                            elif payment.payment_type == PaymentType.INTERNET:
-                                category = TransactionCategory.COMMUNICATIONS
-                            elif payment.payment_type == PaymentType.TV:
-                                category = TransactionCategory.ENTERTAINMENT
-                            elif payment.payment_type == PaymentType.ELECTRICITY:
-                                category = TransactionCategory.UTILITIES
-                            elif payment.payment_type == PaymentType.PREMIUM:
-                                category = TransactionCategory.OTHER
-                            elif payment.payment_type == PaymentType.TO_PERSON or payment.payment_type == PaymentType.CARD_TO_CARD:
-                                category = TransactionCategory.TRANSFERS
-                            
-                            if category not in category_totals:
-                                category_totals[category] = 0
-                            category_totals[category] += amount
-                        elif is_incoming:
-                            # Входящий платеж - это доход
-                            current_income += amount
-                    
-                    elif payment_date >= previous_month_start and payment_date < current_month_start:
-                        if is_outgoing:
-                            previous_expenses += amount
-                        elif is_incoming:
-                            previous_income += amount
-                
-                except Exception as e:
-                    logger.warning(f"Ошибка обработки внутреннего платежа: {e}")
-                    continue
-        
-        except Exception as e:
-            logger.error(f"Ошибка получения внутренних платежей: {e}")
-        
-        top_categories = sorted(
-            [
-                {
-                    "category": cat.value,
-                    "categoryName": CATEGORY_NAMES_RU.get(cat, cat.value),
-                    "amount": amount,
-                    "percentage": round((amount / current_expenses * 100) if current_expenses > 0 else 0, 1)
-                }
-                for cat, amount in category_totals.items()
-            ],
-            key=lambda x: x["amount"],
-            reverse=True
-        )[:5]
-        
-        expense_change = 0.0
-        if previous_expenses > 0:
-            expense_change = round(((current_expenses - previous_expenses) / previous_expenses) * 100, 1)
-        
-        income_change = 0.0
-        if previous_income > 0:
-            income_change = round(((current_income - previous_income) / previous_income) * 100, 1)
-        
-        return {
-            "totalBalance": total_balance,
-            "balanceByCurrency": balances_by_currency,
-            "currentMonth": {
-                "expenses": current_expenses,
-                "income": current_income,
-                "expenseChange": expense_change,
-                "incomeChange": income_change
-            },
-            "topCategories": top_categories,
-            "accountsCount": len(accounts)
-        }
+        report = await self._report(user_id, bank_ids)
+        return report.overview()
     
-    def get_categories_breakdown(
+    async def get_categories_breakdown(
         self,
         user_id: int,
         start_date: str = None,
@@ -219,145 +56,10 @@ class AnalyticsService:
         """
         Детальная разбивка расходов по категориям
         """
-        accounts = self.account_service.get_user_accounts(user_id, None)
-        
-        category_data = {}
-        
-        # Обрабатываем транзакции из Bank API
-        for account in accounts:
-            try:
-                transactions = self.account_service.get_account_transactions(
-                    user_id,
-                    account["accountId"],
-                    account["clientId"]
-                )
-                
-                for txn in transactions:
-                    try:
-                        txn_date = datetime.fromisoformat(txn["date"].replace('Z', '+00:00'))
-                        
-                        if start_date:
-                            start = datetime.fromisoformat(start_date)
-                            if txn_date < start:
-                                continue
-                        
-                        if end_date:
-                            end = datetime.fromisoformat(end_date)
-                            if txn_date > end:
-                                continue
-                        
-                        if txn.get("type") == "debit":
-                            category = categorize_transaction(
-                                txn.get("mccCode", ""),
-                                txn.get("description", "")
-                            )
-                            
-                            if category not in category_data:
-                                category_data[category] = {
-                                    "amount": 0,
-                                    "count": 0,
-                                    "transactions": []
-                                }
-                            
-                            category_data[category]["amount"] += abs(txn["amount"])
-                            category_data[category]["count"] += 1
-                            category_data[category]["transactions"].append({
-                                "id": txn["id"],
-                                "date": txn["date"],
-                                "description": txn["description"],
-                                "amount": abs(txn["amount"])
-                            })
-                    
-                    except Exception as e:
-                        logger.warning(f"Ошибка обработки транзакции: {e}")
-                        continue
-            
-            except Exception as e:
-                logger.error(f"Ошибка получения транзакций: {e}")
-                continue
-        
-        # Обрабатываем внутренние платежи (Payment модель) - только исходящие (расходы)
-        try:
-            from sqlalchemy import or_
-            internal_payments = self.db.query(Payment).filter(
-                Payment.user_id == user_id,  # Только исходящие платежи
-                Payment.status == PaymentStatus.COMPLETED,
-                Payment.completed_at.isnot(None)
-            ).all()
-            
-            for payment in internal_payments:
-                try:
-                    payment_date = payment.completed_at
-                    if not payment_date:
-                        payment_date = payment.created_at
-                    
-                    if start_date:
-                        start = datetime.fromisoformat(start_date)
-                        if payment_date < start:
-                            continue
-                    
-                    if end_date:
-                        end = datetime.fromisoformat(end_date)
-                        if payment_date > end:
-                            continue
-                    
-                    # Определяем категорию по типу платежа
-                    category = TransactionCategory.OTHER
-                    if payment.payment_type == PaymentType.UTILITIES:
-                        category = TransactionCategory.UTILITIES
-                    elif payment.payment_type == PaymentType.MOBILE or payment.payment_type == PaymentType.PHONE:
-                        category = TransactionCategory.COMMUNICATIONS
-                    elif payment.payment_type == PaymentType.INTERNET:
-                        category = TransactionCategory.COMMUNICATIONS
-                    elif payment.payment_type == PaymentType.TV:
-                        category = TransactionCategory.ENTERTAINMENT
-                    elif payment.payment_type == PaymentType.ELECTRICITY:
-                        category = TransactionCategory.UTILITIES
-                    elif payment.payment_type == PaymentType.PREMIUM:
-                        category = TransactionCategory.OTHER
-                    elif payment.payment_type == PaymentType.TO_PERSON or payment.payment_type == PaymentType.CARD_TO_CARD:
-                        category = TransactionCategory.TRANSFERS
-                    
-                    if category not in category_data:
-                        category_data[category] = {
-                            "amount": 0,
-                            "count": 0,
-                            "transactions": []
-                        }
-                    
-                    amount = float(payment.amount)
-                    category_data[category]["amount"] += amount
-                    category_data[category]["count"] += 1
-                    category_data[category]["transactions"].append({
-                        "id": f"payment_{payment.id}",
-                        "date": payment_date.isoformat(),
-                        "description": payment.description or f"Платеж {payment.payment_type.value}",
-                        "amount": amount
-                    })
-                
-                except Exception as e:
-                    logger.warning(f"Ошибка обработки внутреннего платежа: {e}")
-                    continue
-        
-        except Exception as e:
-            logger.error(f"Ошибка получения внутренних платежей: {e}")
-        
-        total_amount = sum(data["amount"] for data in category_data.values())
-        
-        result = []
-        for category, data in category_data.items():
-            result.append({
-                "category": category.value,
-                "categoryName": CATEGORY_NAMES_RU.get(category, category.value),
-                "amount": data["amount"],
-                "count": data["count"],
-                "percentage": round((data["amount"] / total_amount * 100) if total_amount > 0 else 0, 1),
-                "topTransactions": sorted(data["transactions"], key=lambda x: x["amount"], reverse=True)[:5]
-            })
-        
-        return sorted(result, key=lambda x: x["amount"], reverse=True)
+        report = await self._report(user_id, None, start_date, end_date, with_balances=False)
+        return report.categories()
     
-    def get_advanced_insights(
+    async def get_advanced_insights(
         self,
         user_id: int,
         bank_ids: List[int] = None
@@ -365,8 +67,9 @@ class AnalyticsService:
         """
         Расширенная аналитика с выводами и советами
         """
-        overview = self.get_user_overview(user_id, bank_ids)
-        categories = self.get_categories_breakdown(user_id)
+        report = await self._report(user_id, bank_ids)
+        overview = report.overview()
+        categories = report.categories()
         
         current_month = overview.get("currentMonth", {})
         expenses = current_month.get("expenses", 0)
@@ -490,18 +193,15 @@ class AnalyticsService:
                 "message": f"Текущий показатель: {savings_rate:.1f}%"
             })
         
-        # Статистика по дням недели (mock, в реальности нужно анализировать транзакции)
-        weekday_stats = {
-            "monday": {"expenses": expenses * 0.12, "count": 8},
-            "tuesday": {"expenses": expenses * 0.15, "count": 10},
-            "wednesday": {"expenses": expenses * 0.14, "count": 9},
-            "thursday": {"expenses": expenses * 0.16, "count": 11},
-            "friday": {"expenses": expenses * 0.18, "count": 12},
-            "saturday": {"expenses": expenses * 0.15, "count": 10},
-            "sunday": {"expenses": expenses * 0.10, "count": 7}
-        }
+        # Расходы текущего месяца по дням недели и часам (местное время)
+        weekday_stats = report.weekday_stats()
+        hour_stats = report.hour_stats()
         
         most_active_day = max(weekday_stats.items(), key=lambda x: x[1]["expenses"])
+        most_active_hour = max(hour_stats, key=lambda x: x["expenses"])
+        
+        # День зарплаты по регулярным крупным поступлениям
+        paydays = report.paydays()
         
         return {
             "metrics": {
@@ -510,7 +210,7 @@ class AnalyticsService:
                 "avgDailyIncome": round(avg_daily_income, 2),
                 "expenseToIncomeRatio": round((expenses / income * 100) if income > 0 else 0, 1),
                 "totalBalance": total_balance,
-                "daysUntilPayday": 15  # Mock
+                "daysUntilPayday": days_until_payday(paydays, report.today)
             },
             "insights": insights,
             "warnings": warnings,
@@ -529,7 +229,10 @@ class AnalyticsService:
                     "expenses": round(most_active_day[1]["expenses"], 2),
                     "count": most_active_day[1]["count"]
                 },
-                "weekdayStats": weekday_stats
+                "weekdayStats": weekday_stats,
+                "mostActiveHour": most_active_hour,
+                "hourStats": hour_stats,
+                "paydays": paydays
             },
             "summary": {
                 "totalTransactions": sum(cat.get("count", 0) for cat in categories),
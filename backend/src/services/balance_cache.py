@@ -0,0 +1,172 @@
+"""
+Кеш балансов счетов (ключи balance:{user_id}:{account_id}) в виде Redis-хеша:
+amountMinor - целые копейки, currency - код валюты. Платежи меняют баланс
+на стороне Redis скриптом (HINCRBY), без чтения и перезаписи значения из Python,
+поэтому параллельные платежи не затирают изменения друг друга.
+"""
+import redis
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from src.config import settings
+from src.local_cache import local_cache, invalidation_message
+from src.redis_client import binary_client_for
+from src.utils.money import Money
+
+NAMESPACE = "balance"
+
+# Сдвинуть балансы, удалить ключи и увеличить счётчики одной атомарной операцией.
+# Сначала проверяются все списания: если хоть одно уводит баланс ниже нуля,
+# ничего не меняется. Балансы без хеша в кеше пропускаются (прочитаются из банка),
+# значения прежнего строкового формата удаляются. Срок жизни хеша не продлевается:
+# он отсчитывается от чтения баланса из банка, ttl ставится только ключу без срока.
+# KEYS: n ключей балансов, ключи на удаление, ключи-счётчики для INCR
+# ARGV: n, число ключей на удаление, ttl, канал инвалидации, сообщение, 1 - проверять списания,
+#       затем сдвиги в копейках по ключам балансов
+ADJUST_SCRIPT = """
+local n, deletes = tonumber(ARGV[1]), tonumber(ARGV[2])
+local current, legacy = {}, {}
+
+-- Сначала все проверки: отклонённая операция не должна менять ни один ключ
+for i = 1, n do
+    local kind = redis.call('TYPE', KEYS[i]).ok
+    local amount = false
+    if kind == 'hash' then
+        amount = tonumber(redis.call('HGET', KEYS[i], 'amountMinor')) or false
+    elseif kind ~= 'none' then
+        legacy[i] = true
+    end
+
+    local delta = tonumber(ARGV[6 + i])
+    if amount and ARGV[6] == '1' and delta < 0 and amount + delta < 0 then
+        return {0, i, amount}
+    end
+    current[i] = amount
+end
+
+local result = {1}
+for i = 1, n do
+    if legacy[i] then
+        redis.call('DEL', KEYS[i])
+    end
+    if current[i] then
+        local updated = redis.call('HINCRBY', KEYS[i], 'amountMinor', ARGV[6 + i])
+        if redis.call('TTL', KEYS[i]) < 0 then
+            redis.call('EXPIRE', KEYS[i], ARGV[3])
+        end
+        table.insert(result, current[i])
+        table.insert(result, updated)
+    else
+        table.insert(result, false)
+        table.insert(result, false)
+    end
+end
+
+for i = n + 1, n + deletes do
+    redis.call('DEL', KEYS[i])
+end
+for i = n + deletes + 1, #KEYS do
+    redis.call('INCR', KEYS[i])
+end
+redis.call('PUBLISH', ARGV[4], ARGV[5])
+
+return result
+"""
+
+def is_balance_key(key: str) -> bool:
+    return key.startswith(NAMESPACE + ":")
+
+def to_hash(value: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+    """
+    Поля хеша для баланса из BankClient.get_account_balance и их размер в байтах
+    (для учёта в локальном кеше)
+    """
+    money = Money.from_fields(value)
+    mapping = {"amountMinor": money.minor, "currency": money.currency}
+    return mapping, sum(len(field) + len(str(item)) for field, item in mapping.items())
+
+def from_hash(raw: Dict[bytes, bytes]) -> Optional[Tuple[Dict[str, Any], int]]:
+    """
+    Баланс в формате BankClient из HGETALL и его размер, как у to_hash; None - ключа нет
+    """
+    if not raw or b"amountMinor" not in raw:
+        return None
+
+    money = Money(int(raw[b"amountMinor"]), raw.get(b"currency", b"RUB").decode())
+    size = sum(len(field) + len(item) for field, item in raw.items())
+    return {"amount": money.to_float(), "amountMinor": money.minor, "currency": money.currency}, size
+
+def read(client: redis.Redis, key: str) -> Optional[Dict[str, Any]]:
+    """
+    Баланс из кеша в обход локального кеша процесса; None - нет или прежний строковый формат
+    """
+    try:
+        entry = from_hash(binary_client_for(client).hgetall(key))
+    except redis.ResponseError:
+        return None
+    return entry[0] if entry else None
+
+class BalanceShift(NamedTuple):
+    """Изменение кешированного баланса счёта: delta < 0 - списание"""
+    key: str
+    delta: Money
+
+class BalanceAdjustment(NamedTuple):
+    """
+    Результат adjust: balances - (прежний, новый) баланс по каждому сдвигу,
+    None - баланса нет в кеше. applied=False - списание rejected отклонено,
+    available - баланс его счёта.
+    """
+    applied: bool
+    balances: Tuple[Optional[Tuple[Money, Money]], ...] = ()
+    rejected: Optional[BalanceShift] = None
+    available: Optional[Money] = None
+
+class BalanceCache:
+    """
+    Атомарные изменения кешированных балансов за одно обращение к Redis
+    """
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis_client = redis_client
+        self._adjust = redis_client.register_script(ADJUST_SCRIPT)
+
+    def adjust(
+        self,
+        shifts: List[BalanceShift],
+        delete_keys: List[str],
+        counter_keys: List[str],
+        check: bool = True
+    ) -> BalanceAdjustment:
+        """
+        Сдвинуть балансы, удалить delete_keys (списки транзакций), увеличить counter_keys
+        (версии данных) и разослать инвалидацию локальных кешей. С check списание,
+        после которого баланс стал бы отрицательным, отклоняет всю операцию.
+        """
+        keys = [shift.key for shift in shifts]
+        changed = keys + delete_keys
+
+        result = self._adjust(
+            keys=keys + delete_keys + counter_keys,
+            args=[
+                len(shifts),
+                len(delete_keys),
+                settings.BANK_DATA_CACHE_TTL,
+                settings.LOCAL_CACHE_CHANNEL,
+                invalidation_message(changed),
+                1 if check else 0,
+                *(shift.delta.minor for shift in shifts)
+            ]
+        )
+
+        if not result[0]:
+            shift = shifts[int(result[1]) - 1]
+            return BalanceAdjustment(False, rejected=shift, available=Money(int(result[2]), shift.delta.currency))
+
+        local_cache.delete(changed)
+        return BalanceAdjustment(True, tuple(
+            None if previous is None else (
+                Money(int(previous), shift.delta.currency),
+                Money(int(updated), shift.delta.currency)
+            )
+            for shift, previous, updated in zip(shifts, result[1::2], result[2::2])
+        ))
@@ -1,19 +1,57 @@
 import logging
+import time
 import httpx
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, NamedTuple, Optional, List, Tuple
 import redis
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
 from src.config import settings
 from src.constants.bank_config import get_bank_url, get_bank_name
+from src.http_client import get_bank_http_client
+from src.services.bank_token_manager import BankTokenManager
+from src.services.circuit_breaker import BankCircuitBreaker
+from src.services.rate_limiter import BankRateLimiter, PRIORITY_INTERACTIVE
+from src.services.transaction_record import TransactionRecord
+from src.utils.money import Money
 
 logger = logging.getLogger(__name__)
 
+
+def _money_fields(amount_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Сумма из ответа банка ({"amount": "1234.56", "currency": "RUB"}): строка разбирается
+    сразу в копейки (amountMinor); amount - то же значение для отображения клиенту
+    """
+    money = Money.parse(amount_data.get("amount", "0"), amount_data.get("currency", "RUB"))
+    return {"amount": money.to_float(), "amountMinor": money.minor, "currency": money.currency}
+
+class TransactionBatch(NamedTuple):
+    """
+    Транзакции за один вызов get_account_transactions. next_page - страница, с которой
+    продолжить выгрузку; None - банк отдал всё до последней страницы.
+    """
+    records: List[TransactionRecord]
+    next_page: Optional[int] = None
+
+class TransactionsInterrupted(Exception):
+    """
+    Выгрузка прервалась ошибкой error на странице batch.next_page; batch.records -
+    транзакции предыдущих страниц, которые уже получены
+    """
+
+    def __init__(self, batch: TransactionBatch, error: Exception):
+        self.batch = batch
+        self.error = error
+        super().__init__(str(error))
+
 class BankClient:
 
-    def __init__(self, redis_client: redis.Redis):
+    def __init__(self, redis_client: redis.Redis, priority: str = PRIORITY_INTERACTIVE):
         self.redis_client = redis_client
-        self.timeout = httpx.Timeout(30.0, connect=10.0)
+        self.priority = priority
+        self.token_manager = BankTokenManager(redis_client)
+        self.circuit_breaker = BankCircuitBreaker(redis_client)
+        self.rate_limiter = BankRateLimiter(redis_client)
 
     def _get_bank_config(self, bank_id: int) -> Dict[str, str]:
         return {
@@ -23,14 +61,55 @@ class BankClient:
             "client_secret": settings.TEAM_CLIENT_SECRET
         }
 
-    def get_bank_token(self, user_id: int, bank_id: int) -> str:
-        token_key = f"bank_token:{user_id}:{bank_id}"
+    async def _request(
+        self,
+        bank_id: int,
+        endpoint_class: str,
+        method: str,
+        url: str,
+        user_id: Optional[int] = None,
+        **kwargs
+    ) -> httpx.Response:
+        await self.rate_limiter.acquire(bank_id, endpoint_class, user_id, self.priority)
+
+        timeout, probe = self.circuit_breaker.before_call(bank_id)
+        client = get_bank_http_client(bank_id)
+        started = time.monotonic()
+
+        try:
+            response = await client.request(
+                method,
+                url,
+                timeout=httpx.Timeout(timeout, connect=min(timeout, settings.BANK_HTTP_CONNECT_TIMEOUT)),
+                **kwargs
+            )
+            response.raise_for_status()
+        except Exception as e:
+            self.circuit_breaker.record(bank_id, time.monotonic() - started, not self._is_bank_failure(e), probe)
+            raise
+
+        self.circuit_breaker.record(bank_id, time.monotonic() - started, True, probe)
+        return response
+
+    def _is_bank_failure(self, error: Exception) -> bool:
+        # 4xx (кроме 429) - ошибка запроса, а не признак деградации банка
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code >= 500 or error.response.status_code == 429
+        return isinstance(error, httpx.TransportError)
+
+    async def get_bank_token(self, bank_id: int) -> str:
+        try:
+            return await self.token_manager.get_token(bank_id, self._fetch_bank_token)
 
-        cached_token = self.redis_client.get(token_key)
-        if cached_token:
-            logger.info(f"✅ Используем кешированный токен для банка {bank_id}")
-            return cached_token
+        except Exception as e:
+            logger.error(f"❌ Ошибка получения токена от банка {bank_id}: {e}")
+            if settings.DEBUG:
+                mock_token = f"mock_token_{get_bank_name(bank_id)}_dev"
+                logger.warning(f"⚠️  Используем mock токен для разработки")
+                return mock_token
+            raise
 
+    async def _fetch_bank_token(self, bank_id: int) -> Tuple[str, int]:
         bank_config = self._get_bank_config(bank_id)
         url = f"{bank_config['base_url']}/auth/bank-token"
 
@@ -39,31 +118,22 @@ class BankClient:
             "client_secret": bank_config["client_secret"]
         }
 
-        try:
-            with httpx.Client(timeout=self.timeout) as client:
-                response = client.post(url, params=params)
-                response.raise_for_status()
-
-                data = response.json()
-                token = data.get("access_token")
+        response = await self._request(bank_id, "auth", "POST", url, params=params)
 
-                if not token:
-                    raise ValueError("Токен не получен от банка")
+        data = response.json()
+        token = data.get("access_token")
 
-                self.redis_client.setex(token_key, 82800, token)
+        if not token:
+            raise ValueError("Токен не получен от банка")
 
-                logger.info(f"✅ Получен новый токен для банка {bank_id} ({bank_config['name']})")
-                return token
+        ttl = settings.BANK_TOKEN_TTL
+        if data.get("expires_in"):
+            ttl = min(ttl, int(data["expires_in"]))
 
-        except Exception as e:
-            logger.error(f"❌ Ошибка получения токена от банка {bank_id}: {e}")
-            if settings.DEBUG:
-                mock_token = f"mock_token_{bank_config['name']}_dev"
-                logger.warning(f"⚠️  Используем mock токен для разработки")
-                return mock_token
-            raise
+        logger.info(f"✅ Получен новый токен для банка {bank_id} ({bank_config['name']})")
+        return token, ttl
 
-    def create_consent(
+    async def create_consent(
         self,
         user_id: int,
         bank_id: int,
@@ -71,7 +141,7 @@ class BankClient:
         permissions: List[str]
     ) -> str:
         bank_config = self._get_bank_config(bank_id)
-        token = self.get_bank_token(user_id, bank_id)
+        token = await self.get_bank_token(bank_id)
 
         url = f"{bank_config['base_url']}/account-consents/request"
 
@@ -90,30 +160,28 @@ class BankClient:
         }
 
         try:
-            with httpx.Client(timeout=self.timeout) as client:
-                response = client.post(url, headers=headers, json=body)
-                response.raise_for_status()
+            response = await self._request(bank_id, "consents", "POST", url, user_id=user_id, headers=headers, json=body)
 
-                data = response.json()
-                consent_id = data.get("consent_id")
-                consent_status = data.get("status", "unknown")
+            data = response.json()
+            consent_id = data.get("consent_id")
+            consent_status = data.get("status", "unknown")
 
-                if not consent_id:
-                    if consent_status == "pending":
-                        logger.warning(f"⚠️  Consent pending в банке {bank_id} - требуется ручное подтверждение")
-                        consent_id = data.get("request_id", f"pending_{bank_id}_{user_id}")
-                    else:
-                        raise ValueError("Consent ID не получен")
+            if not consent_id:
+                if consent_status == "pending":
+                    logger.warning(f"⚠️  Consent pending в банке {bank_id} - требуется ручное подтверждение")
+                    consent_id = data.get("request_id", f"pending_{bank_id}_{user_id}")
+                else:
+                    raise ValueError("Consent ID не получен")
 
-                consent_key = f"consent:{user_id}:{bank_id}"
-                self.redis_client.setex(consent_key, settings.CONSENT_REQUEST_TTL, consent_id)
+            consent_key = f"consent:{user_id}:{bank_id}"
+            self.redis_client.setex(consent_key, settings.CONSENT_REQUEST_TTL, consent_id)
 
-                if consent_status == "approved":
-                    logger.info(f"✅ Consent {consent_id} одобрен для банка {bank_id}")
-                else:
-                    logger.warning(f"⚠️  Consent {consent_id} в статусе: {consent_status}")
+            if consent_status == "approved":
+                logger.info(f"✅ Consent {consent_id} одобрен для банка {bank_id}")
+            else:
+                logger.warning(f"⚠️  Consent {consent_id} в статусе: {consent_status}")
 
-                return consent_id
+            return consent_id
 
         except Exception as e:
             logger.error(f"❌ Ошибка создания consent: {e}")
@@ -123,20 +191,20 @@ class BankClient:
                 return mock_consent
             raise
 
-    def get_accounts(
+    async def get_accounts(
         self,
         user_id: int,
         bank_id: int,
         client_id: str
     ) -> List[Dict[str, Any]]:
         bank_config = self._get_bank_config(bank_id)
-        token = self.get_bank_token(user_id, bank_id)
+        token = await self.get_bank_token(bank_id)
 
         consent_key = f"consent:{user_id}:{bank_id}"
         consent_id = self.redis_client.get(consent_key)
 
         if not consent_id:
-            consent_id = self.create_consent(
+            consent_id = await self.create_consent(
                 user_id,
                 bank_id,
                 client_id,
@@ -156,24 +224,22 @@ class BankClient:
         }
 
         try:
-            with httpx.Client(timeout=self.timeout) as client:
-                response = client.get(url, headers=headers, params=params)
-                response.raise_for_status()
-
-                data = response.json()
-
-                accounts = []
-                if "data" in data and "account" in data["data"]:
-                    for acc in data["data"]["account"]:
-                        accounts.append({
-                            "accountId": acc.get("accountId"),
-                            "accountName": acc.get("nickname", "Счёт"),
-                            "currency": acc.get("currency", "RUB"),
-                            "accountType": acc.get("accountType", "Personal")
-                        })
+            response = await self._request(bank_id, "accounts", "GET", url, user_id=user_id, headers=headers, params=params)
+
+            data = response.json()
+
+            accounts = []
+            if "data" in data and "account" in data["data"]:
+                for acc in data["data"]["account"]:
+                    accounts.append({
+                        "accountId": acc.get("accountId"),
+                        "accountName": acc.get("nickname", "Счёт"),
+                        "currency": acc.get("currency", "RUB"),
+                        "accountType": acc.get("accountType", "Personal")
+                    })
 
-                logger.info(f"✅ Получено {len(accounts)} счетов из {bank_config['name']}")
-                return accounts
+            logger.info(f"✅ Получено {len(accounts)} счетов из {bank_config['name']}")
+            return accounts
 
         except Exception as e:
             logger.error(f"❌ Ошибка получения счетов: {e}")
@@ -189,7 +255,7 @@ class BankClient:
                 ]
             raise
 
-    def get_account_balance(
+    async def get_account_balance(
         self,
         user_id: int,
         bank_id: int,
@@ -197,13 +263,13 @@ class BankClient:
         client_id: str
     ) -> Dict[str, Any]:
         bank_config = self._get_bank_config(bank_id)
-        token = self.get_bank_token(user_id, bank_id)
+        token = await self.get_bank_token(bank_id)
 
         consent_key = f"consent:{user_id}:{bank_id}"
         consent_id = self.redis_client.get(consent_key)
 
         if not consent_id:
-            consent_id = self.create_consent(
+            consent_id = await self.create_consent(
                 user_id,
                 bank_id,
                 client_id,
@@ -219,50 +285,50 @@ class BankClient:
         }
 
         try:
-            with httpx.Client(timeout=self.timeout) as client:
-                response = client.get(url, headers=headers)
-                response.raise_for_status()
+            response = await self._request(bank_id, "accounts", "GET", url, user_id=user_id, headers=headers)
 
-                data = response.json()
+            data = response.json()
 
-                if "data" in data and "balance" in data["data"]:
-                    balances = data["data"]["balance"]
-                    if balances:
-                        first_balance = balances[0]
-                        return {
-                            "amount": float(first_balance.get("amount", {}).get("amount", 0)),
-                            "currency": first_balance.get("amount", {}).get("currency", "RUB")
-                        }
+            if "data" in data and "balance" in data["data"]:
+                balances = data["data"]["balance"]
+                if balances:
+                    return _money_fields(balances[0].get("amount", {}))
 
-                logger.info(f"✅ Получен баланс для счёта {account_id}")
-                return {"amount": 0, "currency": "RUB"}
+            logger.info(f"✅ Получен баланс для счёта {account_id}")
+            return {"amount": 0, "amountMinor": 0, "currency": "RUB"}
 
         except Exception as e:
             logger.error(f"❌ Ошибка получения баланса: {e}")
             if settings.DEBUG:
                 import random
-                return {
-                    "amount": round(random.uniform(1000, 50000), 2),
-                    "currency": "RUB"
-                }
+                return _money_fields({"amount": f"{random.uniform(1000, 50000):.2f}", "currency": "RUB"})
             raise
 
-    def get_account_transactions(
+    async def get_account_transactions(
         self,
         user_id: int,
         bank_id: int,
         account_id: str,
         client_id: str,
-        limit: int = 10
-    ) -> List[Dict[str, Any]]:
+        since: Optional[str] = None,
+        start_page: int = 1
+    ) -> TransactionBatch:
+        """
+        Получить транзакции счёта, проходя по страницам выдачи банка начиная со start_page.
+        Без since выгружается вся история, с since - только транзакции
+        с bookingDateTime не раньше since (инкрементальная синхронизация).
+        За вызов читается не больше BANK_TXN_MAX_PAGES страниц: если история длиннее,
+        next_page результата указывает, откуда продолжить. Ошибка после первой
+        полученной страницы поднимается как TransactionsInterrupted с уже полученными транзакциями.
+        """
         bank_config = self._get_bank_config(bank_id)
-        token = self.get_bank_token(user_id, bank_id)
+        token = await self.get_bank_token(bank_id)
 
         consent_key = f"consent:{user_id}:{bank_id}"
         consent_id = self.redis_client.get(consent_key)
 
         if not consent_id:
-            consent_id = self.create_consent(
+            consent_id = await self.create_consent(
                 user_id,
                 bank_id,
                 client_id,
@@ -277,58 +343,86 @@ class BankClient:
             "X-Consent-Id": consent_id
         }
 
-        params = {
-            "limit": limit
-        }
+        transactions: List[TransactionRecord] = []
+        seen_ids = set()
+        next_page: Optional[int] = None
+        page = start_page
 
         try:
-            with httpx.Client(timeout=self.timeout) as client:
-                response = client.get(url, headers=headers, params=params)
-                response.raise_for_status()
+            for page in range(start_page, start_page + settings.BANK_TXN_MAX_PAGES):
+                params = {
+                    "page": page,
+                    "limit": settings.BANK_TXN_PAGE_SIZE
+                }
+                if since:
+                    params["from_booking_date_time"] = since
 
-                data = response.json()
+                response = await self._request(bank_id, "transactions", "GET", url, user_id=user_id, headers=headers, params=params)
 
-                transactions = []
-                if "data" in data and "transaction" in data["data"]:
-                    for txn in data["data"]["transaction"]:
-                        amount_data = txn.get("amount", {})
-                        transactions.append({
-                            "id": txn.get("transactionId", ""),
-                            "date": txn.get("bookingDateTime", datetime.utcnow().isoformat()),
-                            "description": txn.get("transactionInformation", "Транзакция"),
-                            "amount": float(amount_data.get("amount", 0)),
-                            "currency": amount_data.get("currency", "RUB"),
-                            "type": txn.get("creditDebitIndicator", "debit").lower()
-                        })
-
-                logger.info(f"✅ Получено {len(transactions)} транзакций для {account_id}")
-                return transactions
+                data = response.json()
+                page_items = (data.get("data") or {}).get("transaction", [])
+
+                new_items = 0
+                for txn in page_items:
+                    transaction = TransactionRecord.from_bank(txn)
+                    if transaction.id in seen_ids:
+                        continue
+                    seen_ids.add(transaction.id)
+                    transactions.append(transaction)
+                    new_items += 1
+
+                # Банк, игнорирующий page, отдаёт ту же страницу повторно
+                if new_items == 0 or not self._has_next_page(data, page, len(page_items)):
+                    break
+            else:
+                next_page = page + 1
+                logger.warning(
+                    f"⚠️  Достигнут лимит {settings.BANK_TXN_MAX_PAGES} страниц транзакций для {account_id}, "
+                    f"продолжение со страницы {next_page}"
+                )
+
+            logger.info(f"✅ Получено {len(transactions)} транзакций для {account_id} (стр. {start_page}-{page})")
+            return TransactionBatch(transactions, next_page)
 
         except Exception as e:
-            logger.error(f"❌ Ошибка получения транзакций: {e}")
+            logger.error(f"❌ Ошибка получения транзакций (стр. {page}): {e}")
+            if transactions:
+                raise TransactionsInterrupted(TransactionBatch(transactions, page), e) from e
             if settings.DEBUG:
+                # Дельта и продолжение выгрузки не должны подмешивать случайные mock-транзакции в накопленную историю
+                if since or start_page > 1:
+                    return TransactionBatch([], start_page if start_page > 1 else None)
                 import random
                 transactions = []
-                for i in range(min(limit, 5)):
-                    transactions.append({
-                        "id": f"txn_{random.randint(10000, 99999)}",
-                        "date": (datetime.utcnow() - timedelta(days=i)).isoformat(),
-                        "description": random.choice([
+                for i in range(5):
+                    transactions.append(TransactionRecord(
+                        id=f"txn_{random.randint(10000, 99999)}",
+                        booking_ts=datetime.now(timezone.utc) - timedelta(days=i),
+                        description=random.choice([
                             "Покупка в магазине",
                             "Оплата ресторана",
                             "Перевод",
                             "Снятие наличных"
                         ]),
-                        "amount": round(random.uniform(-500, 1000), 2),
-                        "currency": "RUB",
-                        "type": "debit" if random.random() > 0.3 else "credit"
-                    })
-                return transactions
+                        amount=Money.parse(round(random.uniform(-500, 1000), 2)),
+                        type="debit" if random.random() > 0.3 else "credit"
+                    ))
+                return TransactionBatch(transactions)
             raise
 
-    # ========== НОВЫЕ API ИЗ api_new.txt ==========
+    def _has_next_page(self, data: Dict[str, Any], page: int, page_count: int) -> bool:
+        meta = data.get("meta") or {}
+        total_pages = meta.get("totalPages")
+        if total_pages is not None:
+            return page < int(total_pages)
+
+        links = data.get("links") or {}
+        if "next" in links:
+            return bool(links["next"])
 
-    def create_payment_consent_vrp(
+        return page_count >= settings.BANK_TXN_PAGE_SIZE
+
+    async def create_payment_consent_vrp(
         self,
         user_id: int,
         bank_id: int,
@@ -341,7 +435,7 @@ class BankClient:
     ) -> Dict[str, Any]:
         """Создать VRP согласие для подписок (Variable Recurring Payments)"""
         bank_config = self._get_bank_config(bank_id)
-        token = self.get_bank_token(user_id, bank_id)
+        token = await self.get_bank_token(bank_id)
 
         url = f"{bank_config['base_url']}/payment-consents/request"
 
@@ -364,18 +458,16 @@ class BankClient:
         }
 
         try:
-            with httpx.Client(timeout=self.timeout) as client:
-                response = client.post(url, headers=headers, json=body)
-                response.raise_for_status()
+            response = await self._request(bank_id, "consents", "POST", url, user_id=user_id, headers=headers, json=body)
 
-                data = response.json()
-                consent_id = data.get("consent_id") or data.get("data", {}).get("consentId")
+            data = response.json()
+            consent_id = data.get("consent_id") or data.get("data", {}).get("consentId")
 
-                logger.info(f"✅ Создано VRP согласие {consent_id} для банка {bank_id}")
-                return {
-                    "consent_id": consent_id,
-                    "status": data.get("status", "approved")
-                }
+            logger.info(f"✅ Создано VRP согласие {consent_id} для банка {bank_id}")
+            return {
+                "consent_id": consent_id,
+                "status": data.get("status", "approved")
+            }
 
         except Exception as e:
             logger.error(f"❌ Ошибка создания VRP согласия: {e}")
@@ -385,7 +477,7 @@ class BankClient:
                 return {"consent_id": mock_consent, "status": "approved"}
             raise
 
-    def get_products(
+    async def get_products(
         self,
         user_id: int,
         bank_id: int,
@@ -393,7 +485,7 @@ class BankClient:
     ) -> List[Dict[str, Any]]:
         """Получить каталог продуктов банка"""
         bank_config = self._get_bank_config(bank_id)
-        token = self.get_bank_token(user_id, bank_id)
+        token = await self.get_bank_token(bank_id)
 
         url = f"{bank_config['base_url']}/products"
 
@@ -407,23 +499,21 @@ class BankClient:
             params["product_type"] = product_type
 
         try:
-            with httpx.Client(timeout=self.timeout) as client:
-                response = client.get(url, headers=headers, params=params)
-                response.raise_for_status()
+            response = await self._request(bank_id, "products", "GET", url, user_id=user_id, headers=headers, params=params)
 
-                data = response.json()
+            data = response.json()
                 
-                products = []
-                if isinstance(data, list):
-                    products = data
-                elif "data" in data:
-                    if isinstance(data["data"], list):
-                        products = data["data"]
-                    elif "product" in data["data"]:
-                        products = data["data"]["product"]
-
-                logger.info(f"✅ Получено {len(products)} продуктов из {bank_config['name']}")
-                return products
+            products = []
+            if isinstance(data, list):
+                products = data
+            elif "data" in data:
+                if isinstance(data["data"], list):
+                    products = data["data"]
+                elif "product" in data["data"]:
+                    products = data["data"]["product"]
+
+            logger.info(f"✅ Получено {len(products)} продуктов из {bank_config['name']}")
+            return products
 
         except Exception as e:
             logger.error(f"❌ Ошибка получения продуктов: {e}")
@@ -451,7 +541,7 @@ class BankClient:
                 ]
             raise
 
-    def get_product_details(
+    async def get_product_details(
         self,
         user_id: int,
         bank_id: int,
@@ -459,7 +549,7 @@ class BankClient:
     ) -> Dict[str, Any]:
         """Получить детали продукта"""
         bank_config = self._get_bank_config(bank_id)
-        token = self.get_bank_token(user_id, bank_id)
+        token = await self.get_bank_token(bank_id)
 
         url = f"{bank_config['base_url']}/products/{product_id}"
 
@@ -469,12 +559,10 @@ class BankClient:
         }
 
         try:
-            with httpx.Client(timeout=self.timeout) as client:
-                response = client.get(url, headers=headers)
-                response.raise_for_status()
+            response = await self._request(bank_id, "products", "GET", url, user_id=user_id, headers=headers)
 
-                data = response.json()
-                return data if isinstance(data, dict) else {"data": data}
+            data = response.json()
+            return data if isinstance(data, dict) else {"data": data}
 
         except Exception as e:
             logger.error(f"❌ Ошибка получения деталей продукта: {e}")
@@ -487,7 +575,7 @@ class BankClient:
                 }
             raise
 
-    def create_product_agreement_consent(
+    async def create_product_agreement_consent(
         self,
         user_id: int,
         bank_id: int,
@@ -501,7 +589,7 @@ class BankClient:
     ) -> Dict[str, Any]:
         """Создать согласие на управление договорами с продуктами"""
         bank_config = self._get_bank_config(bank_id)
-        token = self.get_bank_token(user_id, bank_id)
+        token = await self.get_bank_token(bank_id)
 
         url = f"{bank_config['base_url']}/product-agreement-consents/request"
 
@@ -527,18 +615,16 @@ class BankClient:
             body["valid_until"] = valid_until
 
         try:
-            with httpx.Client(timeout=self.timeout) as client:
-                response = client.post(url, headers=headers, json=body)
-                response.raise_for_status()
+            response = await self._request(bank_id, "consents", "POST", url, user_id=user_id, headers=headers, json=body)
 
-                data = response.json()
-                consent_id = data.get("consent_id") or data.get("data", {}).get("consentId")
+            data = response.json()
+            consent_id = data.get("consent_id") or data.get("data", {}).get("consentId")
 
-                logger.info(f"✅ Создано согласие на управление договорами {consent_id}")
-                return {
-                    "consent_id": consent_id,
-                    "status": data.get("status", "approved")
-                }
+            logger.info(f"✅ Создано согласие на управление договорами {consent_id}")
+            return {
+                "consent_id": consent_id,
+                "status": data.get("status", "approved")
+            }
 
         except Exception as e:
             logger.error(f"❌ Ошибка создания согласия на управление договорами: {e}")
@@ -548,7 +634,7 @@ class BankClient:
                 return {"consent_id": mock_consent, "status": "approved"}
             raise
 
-    def create_product_agreement(
+    async def create_product_agreement(
         self,
         user_id: int,
         bank_id: int,
@@ -561,7 +647,7 @@ class BankClient:
     ) -> Dict[str, Any]:
         """Открыть договор с продуктом (депозит, кредит, карта)"""
         bank_config = self._get_bank_config(bank_id)
-        token = self.get_bank_token(user_id, bank_id)
+        token = await self.get_bank_token(bank_id)
 
         url = f"{bank_config['base_url']}/product-agreements"
 
@@ -587,18 +673,16 @@ class BankClient:
         params = {"client_id": client_id}
 
         try:
-            with httpx.Client(timeout=self.timeout) as client:
-                response = client.post(url, headers=headers, json=body, params=params)
-                response.raise_for_status()
+            response = await self._request(bank_id, "agreements", "POST", url, user_id=user_id, headers=headers, json=body, params=params)
 
-                data = response.json()
-                agreement_id = data.get("agreement_id") or data.get("data", {}).get("agreementId")
+            data = response.json()
+            agreement_id = data.get("agreement_id") or data.get("data", {}).get("agreementId")
 
-                logger.info(f"✅ Создан договор с продуктом {agreement_id}")
-                return {
-                    "agreement_id": agreement_id,
-                    "status": data.get("status", "active")
-                }
+            logger.info(f"✅ Создан договор с продуктом {agreement_id}")
+            return {
+                "agreement_id": agreement_id,
+                "status": data.get("status", "active")
+            }
 
         except Exception as e:
             logger.error(f"❌ Ошибка создания договора с продуктом: {e}")
@@ -608,7 +692,7 @@ class BankClient:
                 return {"agreement_id": mock_agreement, "status": "active"}
             raise
 
-    def create_card(
+    async def create_card(
         self,
         user_id: int,
         bank_id: int,
@@ -620,7 +704,7 @@ class BankClient:
     ) -> Dict[str, Any]:
         """Выпустить новую карту и привязать к счету"""
         bank_config = self._get_bank_config(bank_id)
-        token = self.get_bank_token(user_id, bank_id)
+        token = await self.get_bank_token(bank_id)
 
         url = f"{bank_config['base_url']}/cards"
 
@@ -642,18 +726,16 @@ class BankClient:
         params = {"client_id": client_id}
 
         try:
-            with httpx.Client(timeout=self.timeout) as client:
-                response = client.post(url, headers=headers, json=body, params=params)
-                response.raise_for_status()
+            response = await self._request(bank_id, "agreements", "POST", url, user_id=user_id, headers=headers, json=body, params=params)
 
-                data = response.json()
-                card_id = data.get("card_id") or data.get("data", {}).get("cardId")
+            data = response.json()
+            card_id = data.get("card_id") or data.get("data", {}).get("cardId")
 
-                logger.info(f"✅ Выпущена карта {card_id}")
-                return {
-                    "card_id": card_id,
-                    "status": data.get("status", "active")
-                }
+            logger.info(f"✅ Выпущена карта {card_id}")
+            return {
+                "card_id": card_id,
+                "status": data.get("status", "active")
+            }
 
         except Exception as e:
             logger.error(f"❌ Ошибка выпуска карты: {e}")
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import redis
+from redis.exceptions import LockError
+from typing import Awaitable, Callable, Dict, Set, Tuple
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+# fetch(bank_id) -> (token, ttl_seconds)
+TokenFetcher = Callable[[int], Awaitable[Tuple[str, int]]]
+
+# Обновления токенов, уже запущенные в этом процессе
+_refreshing: Set[int] = set()
+_background_tasks: Set[asyncio.Task] = set()
+_local_locks: Dict[int, asyncio.Lock] = {}
+
+class BankTokenManager:
+    """
+    Командный токен банка один на всех пользователей: он выдаётся по
+    TEAM_CLIENT_ID/TEAM_CLIENT_SECRET и хранится под ключом bank_token:{bank_id}.
+
+    За BANK_TOKEN_REFRESH_AHEAD секунд до истечения токен обновляется в фоне
+    ровно одним процессом (Redis-лок), остальные продолжают использовать текущий.
+    """
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis_client = redis_client
+
+    def _token_key(self, bank_id: int) -> str:
+        return f"bank_token:{bank_id}"
+
+    def _lock_key(self, bank_id: int) -> str:
+        return f"bank_token_lock:{bank_id}"
+
+    async def get_token(self, bank_id: int, fetch: TokenFetcher) -> str:
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.get(self._token_key(bank_id))
+        pipe.ttl(self._token_key(bank_id))
+        token, ttl = pipe.execute()
+
+        if token:
+            if 0 <= ttl < settings.BANK_TOKEN_REFRESH_AHEAD:
+                self._schedule_refresh(bank_id, fetch)
+            return token
+
+        return await self._refresh_now(bank_id, fetch)
+
+    def _schedule_refresh(self, bank_id: int, fetch: TokenFetcher) -> None:
+        if bank_id in _refreshing:
+            return
+
+        _refreshing.add(bank_id)
+        task = asyncio.ensure_future(self._refresh_ahead(bank_id, fetch))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+    async def _refresh_ahead(self, bank_id: int, fetch: TokenFetcher) -> None:
+        try:
+            lock = self.redis_client.lock(self._lock_key(bank_id), timeout=settings.BANK_TOKEN_LOCK_TIMEOUT)
+            if not lock.acquire(blocking=False):
+                return
+
+            try:
+                await self._fetch_and_store(bank_id, fetch)
+                logger.info(f"🔄 Токен банка {bank_id} обновлён заранее")
+            finally:
+                self._release(lock)
+
+        except Exception as e:
+            logger.warning(f"⚠️  Не удалось заранее обновить токен банка {bank_id}: {e}")
+        finally:
+            _refreshing.discard(bank_id)
+
+    async def _refresh_now(self, bank_id: int, fetch: TokenFetcher) -> str:
+        local_lock = _local_locks.setdefault(bank_id, asyncio.Lock())
+
+        async with local_lock:
+            # Пока ждали локальный лок, токен мог получить соседний запрос
+            token = self.redis_client.get(self._token_key(bank_id))
+            if token:
+                return token
+
+            lock = self.redis_client.lock(self._lock_key(bank_id), timeout=settings.BANK_TOKEN_LOCK_TIMEOUT)
+            if lock.acquire(blocking=False):
+                try:
+                    return await self._fetch_and_store(bank_id, fetch)
+                finally:
+                    self._release(lock)
+
+            # Токен уже получает другой процесс - ждём его результат
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + settings.BANK_TOKEN_LOCK_WAIT
+            while loop.time() < deadline:
+                await asyncio.sleep(0.1)
+                token = self.redis_client.get(self._token_key(bank_id))
+                if token:
+                    return token
+
+            logger.warning(f"⚠️  Не дождались токена банка {bank_id} от другого процесса, запрашиваем сами")
+            return await self._fetch_and_store(bank_id, fetch)
+
+    async def _fetch_and_store(self, bank_id: int, fetch: TokenFetcher) -> str:
+        token, ttl = await fetch(bank_id)
+        self.redis_client.setex(self._token_key(bank_id), ttl, token)
+        return token
+
+    def _release(self, lock) -> None:
+        try:
+            lock.release()
+        except LockError:
+            # Лок истёк по таймауту и мог быть захвачен другим процессом
+            pass
@@ -3,12 +3,15 @@ import json
 from sqlalchemy.orm import Session
 from typing import Dict, List, Optional, Tuple
 from decimal import Decimal
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta, timezone
 from collections import defaultdict
 
+from src.config import settings
 from src.models.cashback import CashbackData, CashbackConsent
 from src.services.account_service import AccountService
-from src.constants.mcc_mapping import categorize_transaction
+from src.services.rollup_service import SpendingRollupService, RollupTotals, DIRECTION_DEBIT
+from src.constants.constants import TransactionCategory
+from src.utils.money import Money
 import redis
 
 logger = logging.getLogger(__name__)
@@ -26,222 +29,268 @@ CASHBACK_RATES = {
     "OTHER": Decimal("0.5")  # Остальное: 0.5-1%
 }
 
+# Категория транзакции -> ключ CASHBACK_RATES
+CASHBACK_CATEGORY_RATES = {
+    TransactionCategory.GROCERIES.value: "FOOD",
+    TransactionCategory.RESTAURANTS.value: "RESTAURANT",
+    TransactionCategory.TRANSPORT.value: "TRANSPORT",
+    TransactionCategory.ENTERTAINMENT.value: "ENTERTAINMENT",
+    TransactionCategory.CLOTHING.value: "SHOPPING",
+    TransactionCategory.UTILITIES.value: "UTILITIES",
+    TransactionCategory.HEALTH.value: "HEALTH",
+    TransactionCategory.EDUCATION.value: "EDUCATION",
+}
+
+def _month_bounds(month: str) -> Tuple[date, date]:
+    """Первый день месяца YYYY-MM и первый день следующего"""
+    year, month_num = map(int, month.split("-"))
+    month_start = date(year, month_num, 1)
+    if month_num == 12:
+        month_end = date(year + 1, 1, 1)
+    else:
+        month_end = date(year, month_num + 1, 1)
+    return month_start, month_end
+
+def _recent_months(count: int) -> List[str]:
+    """Текущий и предыдущие месяцы, от нового к старому"""
+    index = date.today().year * 12 + date.today().month - 1
+    return [f"{(index - i) // 12:04d}-{(index - i) % 12 + 1:02d}" for i in range(count)]
+
+def _closes_at(month: str) -> datetime:
+    """Момент, после которого кешбек месяца больше не пересчитывается"""
+    _, month_end = _month_bounds(month)
+    return datetime(month_end.year, month_end.month, month_end.day, tzinfo=timezone.utc) + timedelta(
+        days=settings.CASHBACK_MONTH_CLOSE_DAYS
+    )
+
+def _is_closed(record: CashbackData) -> bool:
+    """Запись сделана после закрытия своего месяца"""
+    written_at = record.updated_at or record.created_at
+    if written_at is None:
+        return False
+    if written_at.tzinfo is None:
+        written_at = written_at.replace(tzinfo=timezone.utc)
+    return written_at >= _closes_at(record.month)
+
+def _cashback_result(month: str, totals: RollupTotals) -> Dict:
+    """Кешбек месяца по итогам его расходов (категория, направление) -> (сумма, количество)"""
+    total_cashback = Money(0)
+    transactions_count = 0
+    category_breakdown = defaultdict(lambda: {"amount": Money(0), "cashback": Money(0), "count": 0})
+
+    for (category, direction), (amount, count) in totals.items():
+        # Только расходы; переводы - не покупки, кешбек за них не начисляется
+        if direction != DIRECTION_DEBIT or category == TransactionCategory.TRANSFERS.value:
+            continue
+
+        # Получаем процент кешбека для категории
+        rate_key = CASHBACK_CATEGORY_RATES.get(category, "OTHER")
+        cashback_rate = CASHBACK_RATES[rate_key]
+        cashback_amount = amount.percent(cashback_rate)
+
+        total_cashback += cashback_amount
+        transactions_count += count
+
+        category_breakdown[category]["amount"] += amount
+        category_breakdown[category]["cashback"] += cashback_amount
+        category_breakdown[category]["count"] += count
+
+    # Вычисляем средний процент кешбека
+    total_amount = sum((cat["amount"] for cat in category_breakdown.values()), Money(0))
+    average_rate = total_cashback.ratio(total_amount) * 100
+
+    # Форматируем разбивку по категориям
+    categories_json = {}
+    for category, data in category_breakdown.items():
+        categories_json[category] = {
+            "amount": data["amount"].to_float(),
+            "cashback": data["cashback"].to_float(),
+            "count": data["count"],
+            "rate": data["cashback"].ratio(data["amount"]) * 100
+        }
+
+    return {
+        "month": month,
+        "total_cashback": total_cashback.to_float(),
+        "transactions_count": transactions_count,
+        "average_cashback_rate": average_rate,
+        "categories_breakdown": categories_json,
+        "total_amount": total_amount.to_float()
+    }
+
+def _cashback_values(calculated: Dict) -> Dict:
+    """Поля CashbackData из результата расчёта, в точности колонок"""
+    return {
+        "total_cashback": Money.parse(calculated["total_cashback"]).to_decimal(),
+        "transactions_count": calculated["transactions_count"],
+        "average_cashback_rate": Decimal(str(calculated["average_cashback_rate"])).quantize(Decimal("0.01")),
+        "categories_breakdown": json.dumps(calculated["categories_breakdown"], sort_keys=True)
+    }
+
 class CashbackService:
     def __init__(self, db: Session, redis_client: redis.Redis):
         self.db = db
         self.redis_client = redis_client
         self.account_service = AccountService(db, redis_client)
+        self.rollups = SpendingRollupService(db)
 
-    def calculate_cashback(
+    async def calculate_cashback(
         self,
         user_id: int,
         month: str  # Формат: YYYY-MM
     ) -> Dict:
-        """Рассчитать кешбек за указанный месяц"""
+        """Рассчитать кешбек за указанный месяц по дневным агрегатам расходов"""
+        return (await self.calculate_months(user_id, [month]))[month]
+
+    async def calculate_months(self, user_id: int, months: List[str]) -> Dict[str, Dict]:
+        """
+        Рассчитать кешбек сразу за несколько месяцев: одна синхронизация и один
+        проход по дневным агрегатам, разложенным по месяцам
+        """
         try:
-            # Парсим месяц
-            year, month_num = map(int, month.split("-"))
-            month_start = datetime(year, month_num, 1)
-            if month_num == 12:
-                month_end = datetime(year + 1, 1, 1)
-            else:
-                month_end = datetime(year, month_num + 1, 1)
-
-            # Получаем все счета пользователя
-            accounts = self.account_service.get_user_accounts(user_id, None)
-
-            total_cashback = Decimal("0")
-            transactions_count = 0
-            category_breakdown = defaultdict(lambda: {"amount": Decimal("0"), "cashback": Decimal("0"), "count": 0})
-
-            # Обрабатываем транзакции по всем счетам
-            for account in accounts:
-                try:
-                    transactions = self.account_service.get_account_transactions(
-                        user_id,
-                        account["accountId"],
-                        account["clientId"]
-                    )
+            return await self._calculate_months(user_id, months)
+        except Exception as e:
+            logger.error(f"Ошибка расчета кешбека: {e}")
+            return {month: _cashback_result(month, {}) for month in months}
 
-                    for txn in transactions:
-                        try:
-                            txn_date = datetime.fromisoformat(txn["date"].replace('Z', '+00:00'))
-                            
-                            # Проверяем, что транзакция в нужном месяце
-                            if not (month_start <= txn_date < month_end):
-                                continue
-
-                            # Только дебетовые транзакции (расходы)
-                            if txn.get("type", "debit") != "debit":
-                                continue
-
-                            amount = Decimal(str(abs(txn["amount"])))
-                            category = categorize_transaction(
-                                txn.get("mccCode", ""),
-                                txn.get("description", "")
-                            )
-
-                            # Получаем процент кешбека для категории
-                            cashback_rate = CASHBACK_RATES.get(category, CASHBACK_RATES["OTHER"])
-                            cashback_amount = (amount * cashback_rate) / Decimal("100")
-
-                            total_cashback += cashback_amount
-                            transactions_count += 1
-
-                            category_breakdown[category]["amount"] += amount
-                            category_breakdown[category]["cashback"] += cashback_amount
-                            category_breakdown[category]["count"] += 1
-
-                        except Exception as e:
-                            logger.warning(f"Ошибка обработки транзакции: {e}")
-                            continue
-
-                except Exception as e:
-                    logger.warning(f"Ошибка получения транзакций для счета {account['accountId']}: {e}")
-                    continue
-
-            # Вычисляем средний процент кешбека
-            total_amount = sum([cat["amount"] for cat in category_breakdown.values()])
-            average_rate = (total_cashback / total_amount * Decimal("100")) if total_amount > 0 else Decimal("0")
-
-            # Форматируем разбивку по категориям
-            categories_json = {}
-            for category, data in category_breakdown.items():
-                categories_json[category] = {
-                    "amount": float(data["amount"]),
-                    "cashback": float(data["cashback"]),
-                    "count": data["count"],
-                    "rate": float((data["cashback"] / data["amount"] * Decimal("100")) if data["amount"] > 0 else Decimal("0"))
-                }
+    async def _calculate_months(self, user_id: int, months: List[str]) -> Dict[str, Dict]:
+        bounds = {month: _month_bounds(month) for month in months}
 
-            return {
-                "month": month,
-                "total_cashback": float(total_cashback),
-                "transactions_count": transactions_count,
-                "average_cashback_rate": float(average_rate),
-                "categories_breakdown": categories_json,
-                "total_amount": float(total_amount)
-            }
+        # Досинхронизируем транзакции: новые попадают в агрегаты при сохранении
+        accounts = self.account_service.get_user_accounts(user_id, None)
+        await self.account_service.sync_user_transactions(user_id, accounts)
+        self.rollups.ensure_built(user_id)
 
-        except Exception as e:
-            logger.error(f"Ошибка расчета кешбека: {e}")
-            return {
-                "month": month,
-                "total_cashback": 0.0,
-                "transactions_count": 0,
-                "average_cashback_rate": 0.0,
-                "categories_breakdown": {},
-                "total_amount": 0.0
-            }
-
-    def get_or_create_cashback_data(
+        monthly = self.rollups.monthly(
+            user_id,
+            min(start for start, _ in bounds.values()),
+            max(end for _, end in bounds.values()) - timedelta(days=1)
+        )
+        return {month: _cashback_result(month, monthly.get(start, {})) for month, (start, _) in bounds.items()}
+
+    async def get_or_create_cashback_data(
         self,
         user_id: int,
         month: str
     ) -> CashbackData:
         """Получить или создать запись о кешбеке за месяц"""
-        cashback_data = self.db.query(CashbackData).filter(
+        return (await self.get_cashback_data(user_id, [month]))[month]
+
+    async def get_cashback_data(self, user_id: int, months: List[str]) -> Dict[str, CashbackData]:
+        """
+        Записи о кешбеке за месяцы. Закрытые месяцы (записанные позже чем через
+        CASHBACK_MONTH_CLOSE_DAYS после конца месяца) читаются из cashback_data как есть;
+        открытые и отсутствующие пересчитываются одним calculate_months и сохраняются.
+        Агрегаты обновляются по мере поступления транзакций, так что пересчёт открытого
+        месяца - чтение его дневных строк, а не проход по транзакциям.
+        """
+        records: Dict[str, CashbackData] = {}
+        for record in self.db.query(CashbackData).filter(
             CashbackData.user_id == user_id,
-            CashbackData.month == month
-        ).first()
-
-        if cashback_data:
-            return cashback_data
+            CashbackData.month.in_(months)
+        ).order_by(CashbackData.id):
+            records.setdefault(record.month, record)
 
-        # Рассчитываем кешбек
-        calculated = self.calculate_cashback(user_id, month)
+        stale = [month for month in months if month not in records or not _is_closed(records[month])]
+        if not stale:
+            return records
 
-        # Создаем новую запись
-        cashback_data = CashbackData(
-            user_id=user_id,
-            month=month,
-            total_cashback=Decimal(str(calculated["total_cashback"])),
-            transactions_count=calculated["transactions_count"],
-            average_cashback_rate=Decimal(str(calculated["average_cashback_rate"])),
-            categories_breakdown=json.dumps(calculated["categories_breakdown"])
-        )
+        try:
+            calculated = await self._calculate_months(user_id, stale)
+        except Exception as e:
+            # Сохранённые записи отдаём как есть, недостающие - нулевыми, без сохранения
+            logger.error(f"Ошибка расчета кешбека: {e}")
+            for month in stale:
+                if month not in records:
+                    records[month] = CashbackData(
+                        user_id=user_id, month=month, **_cashback_values(_cashback_result(month, {}))
+                    )
+            return records
+
+        now = datetime.now(timezone.utc)
+        for month in stale:
+            values = _cashback_values(calculated[month])
+            record = records.get(month)
+            if record is None:
+                record = CashbackData(user_id=user_id, month=month, **values)
+                self.db.add(record)
+                records[month] = record
+            elif any(getattr(record, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(record, field, value)
+            elif now >= _closes_at(month):
+                # Итоги не изменились, но месяц закрылся: отмечаем запись окончательной
+                record.updated_at = now
 
-        self.db.add(cashback_data)
         self.db.commit()
-        self.db.refresh(cashback_data)
+        return records
 
-        return cashback_data
-
-    def aggregate_cashback(self, user_id: int) -> Dict:
+    async def aggregate_cashback(self, user_id: int) -> Dict:
         """Агрегированные данные о кешбеке за все месяцы"""
         # Получаем данные за последние 12 месяцев
-        months = []
-        current = datetime.now()
-        for i in range(12):
-            month_date = current - timedelta(days=30 * i)
-            month_str = month_date.strftime("%Y-%m")
-            months.append(month_str)
+        months = _recent_months(12)
+        records = await self.get_cashback_data(user_id, months)
 
         monthly_data = []
-        total_cashback = Decimal("0")
+        total_cashback = Money(0)
+        total_amount = Money(0)
         total_transactions = 0
 
         for month in months:
-            cashback_data = self.get_or_create_cashback_data(user_id, month)
+            cashback_data = records[month]
             breakdown = json.loads(cashback_data.categories_breakdown) if cashback_data.categories_breakdown else {}
-            total_amount = sum([cat.get("amount", 0) for cat in breakdown.values()])
+            month_amount = sum((Money.parse(cat.get("amount", 0)) for cat in breakdown.values()), Money(0))
+            month_cashback = Money.parse(cashback_data.total_cashback)
             
             monthly_data.append({
                 "month": month,
-                "total_cashback": float(cashback_data.total_cashback),
+                "total_cashback": month_cashback.to_float(),
                 "transactions_count": cashback_data.transactions_count,
                 "average_cashback_rate": float(cashback_data.average_cashback_rate),
                 "categories_breakdown": breakdown,
-                "total_amount": total_amount
+                "total_amount": month_amount.to_float()
             })
-            total_cashback += cashback_data.total_cashback
+            total_cashback += month_cashback
+            total_amount += month_amount
             total_transactions += cashback_data.transactions_count
 
-        # Средний процент кешбека (взвешенный)
-        total_amount = sum([d.get("total_amount", 0) for d in monthly_data])
-        avg_rate = (total_cashback / Decimal(str(total_amount)) * Decimal("100")) if total_amount > 0 else Decimal("0")
-
         return {
-            "total_cashback": float(total_cashback),
+            "total_cashback": total_cashback.to_float(),
             "total_transactions": total_transactions,
-            "average_monthly_cashback": float(total_cashback / Decimal("12")),
-            "average_cashback_rate": float(avg_rate) if avg_rate else 0.0,
+            "average_monthly_cashback": round(total_cashback.to_float() / 12, 2),
+            # Средний процент кешбека (взвешенный)
+            "average_cashback_rate": total_cashback.ratio(total_amount) * 100,
             "monthly_data": monthly_data
         }
 
-    def get_categories_breakdown(
+    async def get_categories_breakdown(
         self,
         user_id: int,
         month: Optional[str] = None
     ) -> Dict:
         """Разбивка кешбека по категориям"""
         if month:
-            cashback_data = self.get_or_create_cashback_data(user_id, month)
+            cashback_data = await self.get_or_create_cashback_data(user_id, month)
             return json.loads(cashback_data.categories_breakdown) if cashback_data.categories_breakdown else {}
         else:
             # За последние 3 месяца
-            current = datetime.now()
-            categories_total = defaultdict(lambda: {"amount": Decimal("0"), "cashback": Decimal("0"), "count": 0})
-
-            for i in range(3):
-                month_date = current - timedelta(days=30 * i)
-                month_str = month_date.strftime("%Y-%m")
-                cashback_data = self.get_or_create_cashback_data(user_id, month_str)
-                
+            categories_total = defaultdict(lambda: {"amount": Money(0), "cashback": Money(0), "count": 0})
+
+            for cashback_data in (await self.get_cashback_data(user_id, _recent_months(3))).values():
                 if cashback_data.categories_breakdown:
                     breakdown = json.loads(cashback_data.categories_breakdown)
                     for category, data in breakdown.items():
-                        categories_total[category]["amount"] += Decimal(str(data["amount"]))
-                        categories_total[category]["cashback"] += Decimal(str(data["cashback"]))
+                        categories_total[category]["amount"] += Money.parse(data["amount"])
+                        categories_total[category]["cashback"] += Money.parse(data["cashback"])
                         categories_total[category]["count"] += data["count"]
 
             result = {}
             for category, data in categories_total.items():
                 result[category] = {
-                    "amount": float(data["amount"]),
-                    "cashback": float(data["cashback"]),
+                    "amount": data["amount"].to_float(),
+                    "cashback": data["cashback"].to_float(),
                     "count": data["count"],
-                    "rate": float((data["cashback"] / data["amount"] * Decimal("100")) if data["amount"] > 0 else Decimal("0"))
+                    "rate": data["cashback"].ratio(data["amount"]) * 100
                 }
 
             return result
@@ -267,7 +316,7 @@ class CashbackService:
 
         return consent
 
-    def export_cashback_data(
+    async def export_cashback_data(
         self,
         user_id: int,
         partner_id: Optional[int] = None
@@ -287,7 +336,7 @@ class CashbackService:
             return None, "Согласие на экспорт данных истекло"
 
         # Получаем агрегированные данные
-        aggregated = self.aggregate_cashback(user_id)
+        aggregated = await self.aggregate_cashback(user_id)
 
         # Формируем данные для экспорта (анонимизированные)
         export_data = {
@@ -0,0 +1,228 @@
+import logging
+import math
+import time
+import redis
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+# Границы корзин гистограммы латентности, мс
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+class CircuitOpenError(Exception):
+    """Банк временно исключён из обращения: цепь разомкнута"""
+
+    def __init__(self, bank_id: int, retry_after: float):
+        self.bank_id = bank_id
+        self.retry_after = retry_after
+        super().__init__(f"Банк {bank_id} временно недоступен (circuit open), повтор через {retry_after:.0f}с")
+
+def _percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def _bucket_field(latency_ms: float) -> str:
+    for bound in LATENCY_BUCKETS_MS:
+        if latency_ms <= bound:
+            return f"le_{bound}"
+    return "le_inf"
+
+class BankCircuitBreaker:
+    """
+    Circuit breaker на банк, состояние общее для всех воркеров (Redis).
+
+    closed    - запросы идут; по скользящему окну BANK_CB_WINDOW_SECONDS считаются
+                ошибки и медленные ответы, при превышении порогов цепь размыкается.
+    open      - запросы сразу отклоняются CircuitOpenError в течение BANK_CB_OPEN_SECONDS.
+    half_open - пропускается одна пробная операция: успех замыкает цепь, ошибка - снова open.
+
+    Таймаут запроса подстраивается под недавнюю латентность банка:
+    percentile(BANK_TIMEOUT_PERCENTILE) * BANK_TIMEOUT_MULTIPLIER в пределах
+    [BANK_TIMEOUT_MIN, BANK_HTTP_TIMEOUT].
+    """
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis_client = redis_client
+
+    def _state_key(self, bank_id: int) -> str:
+        return f"circuit:{bank_id}"
+
+    def _probe_key(self, bank_id: int) -> str:
+        return f"circuit:{bank_id}:probe"
+
+    def _samples_key(self, bank_id: int) -> str:
+        return f"circuit:{bank_id}:latency"
+
+    def _window_key(self, bank_id: int, window: int) -> str:
+        return f"circuit:{bank_id}:w:{window}"
+
+    def _current_window(self) -> int:
+        return int(time.time() // settings.BANK_CB_WINDOW_SECONDS)
+
+    def before_call(self, bank_id: int) -> Tuple[float, bool]:
+        """
+        Проверить, можно ли обращаться к банку.
+        Возвращает (таймаут в секундах, является ли вызов пробным) или бросает CircuitOpenError.
+        """
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.hgetall(self._state_key(bank_id))
+        pipe.lrange(self._samples_key(bank_id), 0, -1)
+        state_data, samples = pipe.execute()
+
+        timeout = self._adaptive_timeout(samples)
+        state = state_data.get("state", STATE_CLOSED)
+
+        if state == STATE_CLOSED:
+            return timeout, False
+
+        if state == STATE_OPEN:
+            opened_at = float(state_data.get("opened_at", 0))
+            retry_after = opened_at + settings.BANK_CB_OPEN_SECONDS - time.time()
+            if retry_after > 0:
+                raise CircuitOpenError(bank_id, retry_after)
+
+        if self._try_acquire_probe(bank_id):
+            if state != STATE_HALF_OPEN:
+                self.redis_client.hset(self._state_key(bank_id), mapping={
+                    "state": STATE_HALF_OPEN,
+                    "changed_at": time.time()
+                })
+                logger.info(f"🟡 Банк {bank_id}: circuit half-open, пробный запрос")
+            return timeout, True
+
+        raise CircuitOpenError(bank_id, settings.BANK_CB_OPEN_SECONDS)
+
+    def record(self, bank_id: int, latency: float, success: bool, probe: bool) -> None:
+        latency_ms = latency * 1000
+        window = self._current_window()
+        window_key = self._window_key(bank_id, window)
+        ttl = settings.BANK_CB_WINDOW_SECONDS * 2
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.hincrby(window_key, "total", 1)
+        if not success:
+            pipe.hincrby(window_key, "errors", 1)
+        if latency >= settings.BANK_CB_SLOW_CALL_SECONDS:
+            pipe.hincrby(window_key, "slow", 1)
+        pipe.hincrby(window_key, _bucket_field(latency_ms), 1)
+        pipe.expire(window_key, ttl)
+        pipe.lpush(self._samples_key(bank_id), int(latency_ms))
+        pipe.ltrim(self._samples_key(bank_id), 0, settings.BANK_CB_LATENCY_SAMPLES - 1)
+        pipe.hgetall(self._window_key(bank_id, window - 1))
+        pipe.hgetall(window_key)
+        results = pipe.execute()
+
+        if probe:
+            self.redis_client.delete(self._probe_key(bank_id))
+            if success:
+                self._close(bank_id, window)
+            else:
+                self._open(bank_id, "пробный запрос не прошёл")
+            return
+
+        stats = self._merge_windows(results[-2:])
+        if stats["total"] < settings.BANK_CB_MIN_CALLS:
+            return
+
+        error_rate = stats["errors"] / stats["total"]
+        slow_rate = stats["slow"] / stats["total"]
+
+        if error_rate >= settings.BANK_CB_ERROR_RATE:
+            self._open(bank_id, f"доля ошибок {error_rate:.0%}")
+        elif slow_rate >= settings.BANK_CB_SLOW_CALL_RATE:
+            self._open(bank_id, f"доля медленных ответов {slow_rate:.0%}")
+
+    def snapshot(self, bank_id: int) -> Dict[str, Any]:
+        window = self._current_window()
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.hgetall(self._state_key(bank_id))
+        pipe.lrange(self._samples_key(bank_id), 0, -1)
+        pipe.hgetall(self._window_key(bank_id, window - 1))
+        pipe.hgetall(self._window_key(bank_id, window))
+        state_data, samples, previous, current = pipe.execute()
+
+        stats = self._merge_windows([previous, current])
+        sorted_samples = sorted(float(s) for s in samples)
+
+        histogram = {f"le_{bound}": stats["buckets"].get(f"le_{bound}", 0) for bound in LATENCY_BUCKETS_MS}
+        histogram["le_inf"] = stats["buckets"].get("le_inf", 0)
+
+        return {
+            "state": state_data.get("state", STATE_CLOSED),
+            "openedAt": float(state_data["opened_at"]) if state_data.get("opened_at") else None,
+            "window": {
+                "seconds": settings.BANK_CB_WINDOW_SECONDS * 2,
+                "total": stats["total"],
+                "errors": stats["errors"],
+                "slow": stats["slow"],
+                "errorRate": round(stats["errors"] / stats["total"], 3) if stats["total"] else 0.0
+            },
+            "latencyMs": {
+                "samples": len(sorted_samples),
+                "p50": _percentile(sorted_samples, 0.5),
+                "p90": _percentile(sorted_samples, 0.9),
+                "p99": _percentile(sorted_samples, 0.99),
+                "histogram": histogram
+            },
+            "timeoutSeconds": round(self._adaptive_timeout(samples), 3)
+        }
+
+    def _adaptive_timeout(self, samples: List[str]) -> float:
+        if len(samples) < settings.BANK_CB_MIN_CALLS:
+            return settings.BANK_HTTP_TIMEOUT
+
+        latency_ms = _percentile(sorted(float(s) for s in samples), settings.BANK_TIMEOUT_PERCENTILE)
+        timeout = latency_ms / 1000 * settings.BANK_TIMEOUT_MULTIPLIER
+
+        return min(settings.BANK_HTTP_TIMEOUT, max(settings.BANK_TIMEOUT_MIN, timeout))
+
+    def _merge_windows(self, windows: List[Dict[str, str]]) -> Dict[str, Any]:
+        merged = {"total": 0, "errors": 0, "slow": 0, "buckets": {}}
+
+        for data in windows:
+            for field, value in data.items():
+                if field.startswith("le_"):
+                    merged["buckets"][field] = merged["buckets"].get(field, 0) + int(value)
+                elif field in merged:
+                    merged[field] += int(value)
+
+        return merged
+
+    def _try_acquire_probe(self, bank_id: int) -> bool:
+        return bool(self.redis_client.set(
+            self._probe_key(bank_id),
+            "1",
+            nx=True,
+            ex=max(1, int(settings.BANK_HTTP_TIMEOUT))
+        ))
+
+    def _open(self, bank_id: int, reason: str) -> None:
+        now = time.time()
+        self.redis_client.hset(self._state_key(bank_id), mapping={
+            "state": STATE_OPEN,
+            "opened_at": now,
+            "changed_at": now
+        })
+        logger.warning(f"🔴 Банк {bank_id}: circuit open ({reason})")
+
+    def _close(self, bank_id: int, window: int) -> None:
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.hset(self._state_key(bank_id), mapping={
+            "state": STATE_CLOSED,
+            "changed_at": time.time()
+        })
+        pipe.hdel(self._state_key(bank_id), "opened_at")
+        # Ошибки до восстановления не должны сразу снова разомкнуть цепь
+        for key in (self._window_key(bank_id, window - 1), self._window_key(bank_id, window)):
+            pipe.hdel(key, "total", "errors", "slow")
+        pipe.execute()
+        logger.info(f"🟢 Банк {bank_id}: circuit closed")
@@ -0,0 +1,224 @@
+import logging
+from datetime import date, datetime, timedelta, timezone
+from itertools import chain
+from sqlalchemy import BigInteger, case, cast, func
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from src.constants.constants import TransactionCategory
+from src.models.bank_transaction import BankTransaction
+from src.utils.money import Money
+
+logger = logging.getLogger(__name__)
+
+# Код категории - индекс в этом списке
+CATEGORIES: List[TransactionCategory] = list(TransactionCategory)
+_CATEGORY_CODES: Dict[str, int] = {category.value: code for code, category in enumerate(CATEGORIES)}
+_OTHER_CODE = _CATEGORY_CODES[TransactionCategory.OTHER.value]
+
+US_PER_DAY = 86_400_000_000
+US_PER_HOUR = 3_600_000_000
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# (категория, направление) -> (сумма, количество), как RollupTotals
+Totals = Dict[Tuple[str, str], Tuple[Money, int]]
+
+def epoch_us(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - _EPOCH) // timedelta(microseconds=1)
+
+class TransactionColumns:
+    """
+    Транзакции банка в колоночном виде для агрегации без цикла по строкам:
+    время в микросекундах UTC, суммы по модулю в копейках, коды категорий
+    (индекс в CATEGORIES), признак расхода и код счёта (индекс в accounts -
+    списке BankAccount.id).
+    """
+
+    __slots__ = ("ids", "ts", "amounts", "categories", "debit", "account_codes", "accounts")
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        ts: np.ndarray,
+        amounts: np.ndarray,
+        categories: np.ndarray,
+        debit: np.ndarray,
+        account_codes: np.ndarray,
+        accounts: List[int]
+    ):
+        self.ids = ids
+        self.ts = ts
+        self.amounts = amounts
+        self.categories = categories
+        self.debit = debit
+        self.account_codes = account_codes
+        self.accounts = accounts
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Tuple[int, int, int, int, int, int]]) -> "TransactionColumns":
+        """
+        rows - целочисленные (id, время в мкс, сумма в копейках, код категории,
+        1 для расхода, BankAccount.id или -1). Строки разворачиваются в массив потоком
+        значений: np.array по строкам результата SQLAlchemy в десятки раз медленнее.
+        """
+        data = np.fromiter(chain.from_iterable(rows), dtype=np.int64, count=len(rows) * 6).reshape(-1, 6)
+        accounts, account_codes = np.unique(data[:, 5], return_inverse=True)
+
+        return cls(
+            ids=data[:, 0],
+            ts=data[:, 1],
+            amounts=np.abs(data[:, 2]),
+            categories=data[:, 3],
+            debit=data[:, 4] == 1,
+            account_codes=account_codes.reshape(-1),
+            accounts=[int(account) for account in accounts]
+        )
+
+    @classmethod
+    def load(
+        cls,
+        db: Session,
+        user_id: int,
+        bank_ids: Optional[List[int]] = None,
+        account_ids: Optional[List[str]] = None,
+        bank_account_ids: Optional[List[int]] = None
+    ) -> "TransactionColumns":
+        """
+        Транзакции пользователя из bank_transactions. Все колонки приводит к целым БД,
+        включая коды категорий и направление, так что строки сразу ложатся в массив.
+        """
+        query = db.query(
+            BankTransaction.id,
+            cast(func.round(func.extract("epoch", BankTransaction.booking_ts) * 1_000_000), BigInteger),
+            cast(func.round(BankTransaction.amount * 100), BigInteger),
+            case(_CATEGORY_CODES, value=BankTransaction.category, else_=_OTHER_CODE),
+            case((BankTransaction.type == "debit", 1), else_=0),
+            func.coalesce(BankTransaction.bank_account_id, -1)
+        ).filter(BankTransaction.user_id == user_id)
+
+        if bank_ids:
+            query = query.filter(BankTransaction.bank_id.in_(bank_ids))
+        if account_ids is not None:
+            query = query.filter(BankTransaction.account_id.in_(account_ids))
+        if bank_account_ids is not None:
+            query = query.filter(BankTransaction.bank_account_id.in_(bank_account_ids))
+
+        return cls.from_rows(query.all())
+
+    def between(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> np.ndarray:
+        """
+        Маска строк в [start, end)
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if start is not None:
+            mask &= self.ts >= epoch_us(start)
+        if end is not None:
+            mask &= self.ts < epoch_us(end)
+        return mask
+
+    def totals(self, mask: np.ndarray) -> Totals:
+        """
+        Суммы и количества по (категория, направление) среди строк маски
+        """
+        keys = self.categories[mask] * 2 + self.debit[mask]
+        size = len(CATEGORIES) * 2
+        amounts = np.bincount(keys, weights=self.amounts[mask], minlength=size)
+        counts = np.bincount(keys, minlength=size)
+
+        result = {}
+        for key in np.flatnonzero(counts):
+            category = CATEGORIES[key // 2].value
+            direction = "debit" if key % 2 else "credit"
+            result[(category, direction)] = (Money(int(round(amounts[key]))), int(counts[key]))
+        return result
+
+    def sum(self, mask: np.ndarray) -> Money:
+        return Money(int(self.amounts[mask].sum()))
+
+    def account_totals(self, mask: np.ndarray) -> Dict[int, Tuple[Money, int]]:
+        """
+        Суммы и количества по счетам (BankAccount.id) среди строк маски
+        """
+        codes = self.account_codes[mask]
+        amounts = np.bincount(codes, weights=self.amounts[mask], minlength=len(self.accounts))
+        counts = np.bincount(codes, minlength=len(self.accounts))
+        return {
+            account: (Money(int(round(amounts[code]))), int(counts[code]))
+            for code, account in enumerate(self.accounts)
+        }
+
+    def category(self, category: TransactionCategory) -> np.ndarray:
+        return self.categories == _CATEGORY_CODES[category.value]
+
+    def daily(self, mask: np.ndarray) -> List[Tuple[date, Money, int]]:
+        """
+        Суммы по дням (UTC) среди строк маски
+        """
+        days = self.ts[mask] // US_PER_DAY
+        if not len(days):
+            return []
+
+        unique, inverse = np.unique(days, return_inverse=True)
+        amounts = np.bincount(inverse.reshape(-1), weights=self.amounts[mask])
+        counts = np.bincount(inverse.reshape(-1))
+        return [
+            (date.fromordinal(_EPOCH_ORDINAL + int(day)), Money(int(round(amount))), int(count))
+            for day, amount, count in zip(unique, amounts, counts)
+        ]
+
+    def hourly(self, mask: np.ndarray, tz: ZoneInfo) -> List[Tuple[int, int, Money, int]]:
+        """
+        Гистограмма строк маски по местному времени tz: (день недели, час, сумма, количество).
+        Смещение пояса берётся на полдень каждого дня UTC: различных дней немного,
+        а переход на летнее время сдвигает лишь несколько ночных часов.
+        """
+        ts = self.ts[mask]
+        if not len(ts):
+            return []
+
+        days, inverse = np.unique(ts // US_PER_DAY, return_inverse=True)
+        offsets = np.array([
+            tz.utcoffset(datetime.fromordinal(_EPOCH_ORDINAL + int(day)) + timedelta(hours=12)) // timedelta(microseconds=1)
+            for day in days
+        ], dtype=np.int64)
+        local = ts + offsets[inverse.reshape(-1)]
+
+        # 1970-01-01 - четверг (weekday 3)
+        slots = (local // US_PER_DAY + 3) % 7 * 24 + local % US_PER_DAY // US_PER_HOUR
+        amounts = np.bincount(slots, weights=self.amounts[mask], minlength=7 * 24)
+        counts = np.bincount(slots, minlength=7 * 24)
+        return [
+            (int(slot) // 24, int(slot) % 24, Money(int(round(amounts[slot]))), int(counts[slot]))
+            for slot in np.flatnonzero(counts)
+        ]
+
+    def top_ids(self, mask: np.ndarray, limit: int) -> List[int]:
+        """
+        id крупнейших (по сумме, затем по id) строк маски в каждой категории
+        """
+        rows = np.flatnonzero(mask)
+        categories = self.categories[rows]
+
+        result = []
+        for code in np.unique(categories):
+            candidates = rows[categories == code]
+            amounts = self.amounts[candidates]
+
+            # Полная сортировка не нужна: отсекаем всё меньше limit-й по величине суммы
+            if len(candidates) > limit:
+                threshold = np.partition(amounts, len(amounts) - limit)[len(amounts) - limit]
+                candidates = candidates[amounts >= threshold]
+                amounts = self.amounts[candidates]
+
+            order = np.lexsort((-self.ids[candidates], -amounts))[:limit]
+            result.extend(int(row_id) for row_id in self.ids[candidates[order]])
+        return result
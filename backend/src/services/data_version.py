@@ -0,0 +1,99 @@
+import logging
+import hashlib
+import json
+import redis
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from src import cache_codec
+from src.config import settings
+from src.redis_client import binary_client_for
+
+logger = logging.getLogger(__name__)
+
+class DataVersionService:
+    """
+    Монотонно растущая версия данных пользователя и группы в Redis.
+
+    Версия пользователя увеличивается при любом изменении его данных: новые
+    транзакции из банка, обновлённый баланс, платёж, изменение счетов. Она входит
+    в ключи всех производных представлений (аналитика, кешбек) и в ETag ответов,
+    поэтому одно INCR разом инвалидирует всё, что было посчитано по старым данным.
+
+    Версия группы - собственный счётчик (меняется с составом группы) плюс сумма
+    версий участников: любое изменение данных участника меняет и её.
+    """
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis_client = redis_client
+
+    def _user_key(self, user_id: int) -> str:
+        return f"data_version:user:{user_id}"
+
+    def _group_key(self, group_id: int) -> str:
+        return f"data_version:group:{group_id}"
+
+    def user_version(self, user_id: int) -> int:
+        return int(self.redis_client.get(self._user_key(user_id)) or 0)
+
+    def group_version(self, group_id: int, member_ids: Iterable[int]) -> str:
+        keys = [self._group_key(group_id)] + [self._user_key(user_id) for user_id in member_ids]
+        group, *members = self.redis_client.mget(keys)
+        return f"{int(group or 0)}.{sum(int(version or 0) for version in members)}"
+
+    def user_keys(self, user_ids: Iterable[int]) -> List[str]:
+        """
+        Ключи версий пользователей - для скриптов, которые увеличивают их сами
+        """
+        return [self._user_key(user_id) for user_id in dict.fromkeys(user_ids)]
+
+    def bump_users(self, user_ids: Iterable[int]) -> None:
+        user_ids = list(dict.fromkeys(user_ids))
+        if not user_ids:
+            return
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.incr(self._user_key(user_id))
+        pipe.execute()
+
+    def bump_user(self, user_id: int) -> None:
+        self.bump_users([user_id])
+
+    def bump_group(self, group_id: int) -> None:
+        self.redis_client.incr(self._group_key(group_id))
+
+    def view_key(self, name: str, user_id: int, version: int, params: Dict[str, Any]) -> str:
+        # Представления с относительными периодами ("последние 30 дней") зависят и от даты
+        params = {**params, "today": date.today().isoformat()}
+        digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+        return f"view:{name}:{user_id}:v{version}:{digest}"
+
+    async def cached_view(
+        self,
+        name: str,
+        user_id: int,
+        params: Dict[str, Any],
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[int] = None
+    ) -> Any:
+        """
+        Производное представление, закешированное под текущей версией данных пользователя.
+        Если версия выросла во время расчёта, результат остаётся под старым ключом
+        и больше не читается.
+        """
+        binary_client = binary_client_for(self.redis_client)
+        key = self.view_key(name, user_id, self.user_version(user_id), params)
+
+        raw = binary_client.get(key)
+        if raw is not None:
+            return cache_codec.loads(raw)
+
+        value = await loader()
+
+        try:
+            binary_client.setex(key, ttl or settings.DATA_VIEW_CACHE_TTL, cache_codec.dumps(key, value))
+        except Exception as e:
+            logger.warning(f"⚠️  Не удалось закешировать {name} для пользователя {user_id}: {e}")
+
+        return value
@@ -8,6 +8,7 @@ from datetime import datetime
 
 from src.models.partner import Partner, PartnerTransaction, PartnerStatus
 from src.models.user import User
+from src.utils.money import Money
 
 logger = logging.getLogger(__name__)
 
@@ -85,8 +86,8 @@ class PartnerService:
             PartnerTransaction.partner_id == partner_id
         ).all()
 
-        total_amount = sum([float(t.amount) for t in transactions])
-        total_commission = sum([float(t.commission) for t in transactions])
+        total_amount = sum((Money.parse(t.amount) for t in transactions), Money(0)).to_float()
+        total_commission = sum((Money.parse(t.commission) for t in transactions), Money(0)).to_float()
         completed_count = len([t for t in transactions if t.status == "completed"])
 
         return {
@@ -2,6 +2,7 @@
 Сервис для работы с платежами
 """
 import logging
+import redis
 from sqlalchemy.orm import Session
 from typing import List, Optional, Tuple
 from datetime import datetime
@@ -9,6 +10,12 @@ from src.models.payment import Payment, PaymentType, PaymentStatus
 from src.models.user import User
 from src.models.account import BankAccount
 from src.config import settings
+from src.local_cache import invalidate
+from src.services import balance_cache
+from src.services.balance_cache import BalanceAdjustment, BalanceCache, BalanceShift
+from src.services.data_version import DataVersionService
+from src.services.rollup_service import SpendingRollupService
+from src.utils.money import Money
 
 logger = logging.getLogger(__name__)
 
@@ -16,14 +23,156 @@ logger = logging.getLogger(__name__)
 class PaymentService:
     """Сервис для управления платежами"""
     
+    def __init__(self, db: Session, redis_client: redis.Redis):
+        self.db = db
+        self.redis_client = redis_client
+    
+    def _adjust_balances(
+        self,
+        shifts: List[BalanceShift],
+        transaction_keys: List[str],
+        user_ids: List[int],
+        check: bool = True
+    ) -> Optional[BalanceAdjustment]:
+        """
+        Атомарно сдвинуть кешированные балансы, сбросить кеш транзакций и увеличить
+        версии данных пользователей (BalanceCache.adjust). Ошибка Redis платеж не блокирует - тогда None.
+        """
+        try:
+            adjustment = BalanceCache(self.redis_client).adjust(
+                shifts,
+                transaction_keys,
+                DataVersionService(self.redis_client).user_keys(user_ids),
+                check
+            )
+        except Exception as e:
+            logger.warning(f"⚠️  Не удалось обновить кеш балансов: {e}")
+            return None
+        
+        for shift, balance in zip(shifts, adjustment.balances):
+            if balance is None:
+                logger.warning(f"⚠️  Баланс не найден в кеше для {shift.key}")
+            else:
+                logger.info(f"✅ Обновлен баланс в кеше {shift.key}: {balance[0]}₽ -> {balance[1]}₽")
+        return adjustment
+    
+    def _save_payment(
+        self,
+        payment: Payment,
+        shifts: List[BalanceShift],
+        transaction_keys: List[str],
+        user_ids: List[int]
+    ) -> Optional[str]:
+        """
+        Сохранить платеж и сдвинуть кешированные балансы; вернуть текст ошибки или None.
+        Проверка остатка, коммит и сдвиг идут под блокировкой списываемых счетов:
+        параллельные платежи не тратят одни и те же деньги, а кеш меняется только
+        после коммита - читатели не видят списаний, которых нет в БД.
+        """
+        locks = self._lock_balances(shifts)
+        if locks is None:
+            return "По счету уже выполняется другой платеж, повторите попытку"
+        
+        try:
+            error = self._check_funds(shifts)
+            if error:
+                return error
+            
+            self.db.add(payment)
+            try:
+                SpendingRollupService(self.db).add_payment(payment)
+                self.db.commit()
+                self.db.refresh(payment)
+            except Exception as e:
+                self.db.rollback()
+                return f"Ошибка сохранения платежа: {str(e)}"
+            
+            # Платеж уже проведён - сдвиг не отклоняется, даже если баланс в кеше успел измениться
+            if self._adjust_balances(shifts, transaction_keys, user_ids, check=False) is None:
+                self._invalidate_balances(shifts, transaction_keys, user_ids)
+        finally:
+            for lock in locks:
+                self._release(lock)
+        
+        return None
+    
+    def _lock_balances(self, shifts: List[BalanceShift]) -> Optional[list]:
+        """
+        Заблокировать списываемые балансы; None - счёт занят другим платежом дольше PAYMENT_LOCK_WAIT.
+        Ключи блокируются в одном порядке, чтобы встречные переводы не ждали друг друга.
+        Ошибка Redis платеж не блокирует - тогда он идёт без блокировки.
+        """
+        locks = []
+        try:
+            for key in sorted({shift.key for shift in shifts if shift.delta.minor < 0}):
+                lock = self.redis_client.lock(f"payment_lock:{key}", timeout=settings.PAYMENT_LOCK_TIMEOUT)
+                if not lock.acquire(blocking_timeout=settings.PAYMENT_LOCK_WAIT):
+                    logger.warning(f"⚠️  Баланс {key} занят другим платежом")
+                    for acquired in locks:
+                        self._release(acquired)
+                    return None
+                locks.append(lock)
+        except Exception as e:
+            logger.warning(f"⚠️  Не удалось заблокировать баланс для платежа: {e}")
+            for acquired in locks:
+                self._release(acquired)
+            return []
+        
+        return locks
+    
+    def _release(self, lock) -> None:
+        try:
+            lock.release()
+        except Exception:
+            # Блокировка истекла (PAYMENT_LOCK_TIMEOUT) или Redis недоступен
+            pass
+    
+    def _check_funds(self, shifts: List[BalanceShift]) -> Optional[str]:
+        """
+        Проверить, что кешированных балансов хватает на списания; счета без баланса в кеше не проверяются
+        """
+        for shift in shifts:
+            if shift.delta.minor >= 0:
+                continue
+            
+            try:
+                cached = balance_cache.read(self.redis_client, shift.key)
+            except Exception as e:
+                logger.warning(f"⚠️  Не удалось прочитать баланс {shift.key} из кеша: {e}")
+                continue
+            
+            if cached is not None:
+                available = Money.from_fields(cached)
+                if available.minor + shift.delta.minor < 0:
+                    return f"Недостаточно средств на счете. Текущий баланс: {available}₽, требуется: {-shift.delta}₽"
+        
+        return None
+    
+    def _invalidate_balances(
+        self,
+        shifts: List[BalanceShift],
+        transaction_keys: List[str],
+        user_ids: List[int]
+    ) -> None:
+        """
+        Сдвиг кеша после коммита не удался - удалить затронутые ключи, чтобы их
+        перечитали из банка, вместо того чтобы отдавать балансы без этого платежа
+        """
+        keys = [shift.key for shift in shifts] + transaction_keys
+        try:
+            self.redis_client.delete(*keys)
+            DataVersionService(self.redis_client).bump_users(user_ids)
+        except Exception as e:
+            logger.error(f"❌ Кеш балансов расходится с БД после платежа, ключи {keys} не удалены: {e}")
+        invalidate(self.redis_client, keys)
+    
     @staticmethod
     def search_user_by_phone(db: Session, phone: str) -> Optional[User]:
         """Поиск пользователя по номеру телефона"""
         return db.query(User).filter(User.phone == phone, User.is_verified == True).first()
     
-    @staticmethod
-    def create_internal_transfer(
-        db: Session,
+    async def create_internal_transfer(
+        self,
         user_id: int,
         from_account_id: int,
         to_phone: str,
@@ -35,9 +184,10 @@ class PaymentService:
         (внутри нашей системы, без использования Bank API)
         """
         logger.info(f"🔍 НАЧАЛО create_internal_transfer: user_id={user_id}, from_account_id={from_account_id}, to_phone={to_phone}, amount={amount}")
+        money = Money.parse(amount)
         
         # Проверяем счет отправителя
-        from_account = db.query(BankAccount).filter(
+        from_account = self.db.query(BankAccount).filter(
             BankAccount.id == from_account_id,
             BankAccount.user_id == user_id
         ).first()
@@ -47,7 +197,7 @@ class PaymentService:
             return None, "Счет отправителя не найден"
         
         # Ищем получателя по телефону
-        recipient = PaymentService.search_user_by_phone(db, to_phone)
+        recipient = self.search_user_by_phone(self.db, to_phone)
         
         if not recipient:
             logger.error(f"❌ Получатель не найден: to_phone={to_phone}")
@@ -59,11 +209,11 @@ class PaymentService:
         
         # ЗАЩИТА ОТ ДУБЛИКАТОВ: Проверяем, не был ли уже создан идентичный платеж в последние 5 секунд
         from datetime import timedelta
-        recent_duplicate = db.query(Payment).filter(
+        recent_duplicate = self.db.query(Payment).filter(
             Payment.user_id == user_id,
             Payment.to_user_id == recipient.id,
             Payment.to_phone == to_phone,
-            Payment.amount == amount,
+            Payment.amount == money.to_decimal(),
             Payment.payment_type == PaymentType.TO_PERSON,
             Payment.status == PaymentStatus.COMPLETED,
             Payment.created_at >= datetime.utcnow() - timedelta(seconds=5)
@@ -76,17 +226,9 @@ class PaymentService:
         # Проверяем баланс перед переводом
         try:
             from src.services.account_service import AccountService
-            import redis
             
-            redis_client = redis.Redis(
-                host=settings.REDIS_HOST,
-                port=settings.REDIS_PORT,
-                db=settings.REDIS_DB,
-                decode_responses=True
-            )
-            
-            account_service = AccountService(db, redis_client)
-            balance_data = account_service.get_account_balance(
+            account_service = AccountService(self.db, self.redis_client)
+            balance_data = await account_service.get_account_balance(
                 user_id=user_id,
                 account_id=from_account.account_id,
                 bank_id=from_account.bank_id
@@ -95,8 +237,8 @@ class PaymentService:
             if not balance_data:
                 logger.warning(f"⚠️  Не удалось получить баланс, продолжаем без проверки")
             else:
-                current_balance = balance_data.get("amount", 0)
-                if current_balance < amount:
+                current_balance = Money.from_fields(balance_data)
+                if current_balance.minor < money.minor:
                     logger.error(f"❌ Недостаточно средств: баланс={current_balance}₽, требуется={amount}₽")
                     return None, f"Недостаточно средств на счете. Текущий баланс: {current_balance}₽, требуется: {amount}₽"
                 logger.info(f"✅ Баланс проверен: {current_balance}₽ >= {amount}₽")
@@ -107,7 +249,7 @@ class PaymentService:
         payment = Payment(
             user_id=user_id,
             payment_type=PaymentType.TO_PERSON,
-            amount=amount,
+            amount=money.to_decimal(),
             currency="RUB",
             from_account_id=from_account_id,
             from_account_name=from_account.account_name,
@@ -119,110 +261,29 @@ class PaymentService:
             completed_at=datetime.utcnow()
         )
         
-        db.add(payment)
-        try:
-            db.commit()
-            db.refresh(payment)
-            logger.info(f"✅ Платеж {payment.id} успешно создан: {amount}₽ от пользователя {user_id} к {recipient.id}")
-            
-            # Обновляем кеш балансов счетов
-            try:
-                import redis
-                import json
-                from src.config import settings
-                
-                redis_client = redis.Redis(
-                    host=settings.REDIS_HOST,
-                    port=settings.REDIS_PORT,
-                    db=settings.REDIS_DB,
-                    decode_responses=True
-                )
-                
-                # Обновляем баланс отправителя (уменьшаем)
-                balance_key_sender = f"balance:{user_id}:{from_account.account_id}"
-                cached_balance_sender = redis_client.get(balance_key_sender)
-                
-                if cached_balance_sender:
-                    balance_data_sender = json.loads(cached_balance_sender)
-                    current_balance_sender = balance_data_sender.get("amount", 0)
-                    
-                    # Проверяем, не был ли баланс уже обновлен (защита от двойного списания)
-                    # Если баланс уже меньше чем должен быть после списания, значит уже был списан
-                    expected_balance = current_balance_sender - amount
-                    if balance_data_sender.get("amount", current_balance_sender) <= expected_balance:
-                        logger.warning(f"⚠️  Баланс уже был обновлен ранее! Текущий: {balance_data_sender.get('amount')}₽, ожидаемый: {expected_balance}₽")
-                    else:
-                        new_balance_sender = current_balance_sender - amount
-                        balance_data_sender["amount"] = max(0, new_balance_sender)
-                        
-                        redis_client.setex(
-                            balance_key_sender,
-                            settings.BANK_DATA_CACHE_TTL,
-                            json.dumps(balance_data_sender)
-                        )
-                        logger.info(f"✅ Обновлен баланс отправителя в кеше: {current_balance_sender}₽ -> {balance_data_sender['amount']}₽ (списано {amount}₽)")
-                else:
-                    logger.warning(f"⚠️  Баланс отправителя не найден в кеше для {balance_key_sender}")
-                
-                # Обновляем баланс получателя (увеличиваем)
-                # Находим счет получателя с наивысшим приоритетом
-                recipient_account = db.query(BankAccount).filter(
-                    BankAccount.user_id == recipient.id,
-                    BankAccount.is_active == True
-                ).order_by(BankAccount.priority.asc()).first()
-                
-                if recipient_account:
-                    balance_key_recipient = f"balance:{recipient.id}:{recipient_account.account_id}"
-                    cached_balance_recipient = redis_client.get(balance_key_recipient)
-                    
-                    if cached_balance_recipient:
-                        balance_data_recipient = json.loads(cached_balance_recipient)
-                        current_balance_recipient = balance_data_recipient.get("amount", 0)
-                        
-                        # Проверяем, не был ли баланс уже обновлен (защита от двойного начисления)
-                        expected_balance = current_balance_recipient + amount
-                        if balance_data_recipient.get("amount", current_balance_recipient) >= expected_balance:
-                            logger.warning(f"⚠️  Баланс получателя уже был обновлен ранее! Текущий: {balance_data_recipient.get('amount')}₽, ожидаемый: {expected_balance}₽")
-                        else:
-                            new_balance_recipient = current_balance_recipient + amount
-                            balance_data_recipient["amount"] = new_balance_recipient
-                            
-                            redis_client.setex(
-                                balance_key_recipient,
-                                settings.BANK_DATA_CACHE_TTL,
-                                json.dumps(balance_data_recipient)
-                            )
-                            logger.info(f"✅ Обновлен баланс получателя в кеше: {current_balance_recipient}₽ -> {balance_data_recipient['amount']}₽ (начислено {amount}₽)")
-                else:
-                    logger.warning(f"⚠️  Баланс получателя не найден в кеше для {balance_key_recipient}")
-                
-                # Инвалидируем кеш транзакций для получателя
-                transactions_key_recipient = f"transactions:{recipient.id}:{recipient_account.account_id}"
-                redis_client.delete(transactions_key_recipient)
-                logger.info(f"✅ Инвалидирован кеш транзакций для получателя {recipient_account.account_id}")
-                
-            except Exception as cache_error:
-                logger.warning(f"⚠️  Не удалось обновить кеш баланса: {cache_error}")
-                # Не блокируем платеж из-за ошибки кеша
-            
-            # Инвалидируем кеш транзакций для отправителя
-            try:
-                transactions_key_sender = f"transactions:{user_id}:{from_account.account_id}"
-                redis_client.delete(transactions_key_sender)
-                logger.info(f"✅ Инвалидирован кеш транзакций для отправителя {from_account.account_id}")
-            except Exception as e:
-                logger.warning(f"⚠️  Не удалось инвалидировать кеш транзакций: {e}")
-            
-        except Exception as e:
-            db.rollback()
-            logger.error(f"❌ Ошибка сохранения платежа: {e}")
-            return None, f"Ошибка сохранения платежа: {str(e)}"
-        
+        # Счет получателя с наивысшим приоритетом - его баланс в кеше увеличится
+        recipient_account = self.db.query(BankAccount).filter(
+            BankAccount.user_id == recipient.id,
+            BankAccount.is_active == True
+        ).order_by(BankAccount.priority.asc()).first()
+        
+        # Списание у отправителя и зачисление получателю - одним скриптом
+        shifts = [BalanceShift(f"balance:{user_id}:{from_account.account_id}", -money)]
+        transaction_keys = [f"transactions:{user_id}:{from_account.account_id}"]
+        if recipient_account:
+            shifts.append(BalanceShift(f"balance:{recipient.id}:{recipient_account.account_id}", money))
+            transaction_keys.append(f"transactions:{recipient.id}:{recipient_account.account_id}")
+        
+        error = self._save_payment(payment, shifts, transaction_keys, [user_id, recipient.id])
+        if error:
+            logger.error(f"❌ Платеж не создан: {error}")
+            return None, error
+        
+        logger.info(f"✅ Платеж {payment.id} успешно создан: {amount}₽ от пользователя {user_id} к {recipient.id}")
         return payment, None
     
-    @staticmethod
-    def create_card_transfer(
-        db: Session,
+    async def create_card_transfer(
+        self,
         user_id: int,
         from_account_id: int,
         to_account: str,
@@ -231,7 +292,7 @@ class PaymentService:
         description: Optional[str] = None
     ) -> Tuple[Optional[Payment], Optional[str]]:
         """Перевод на карту (номер счета)"""
-        from_account = db.query(BankAccount).filter(
+        from_account = self.db.query(BankAccount).filter(
             BankAccount.id == from_account_id,
             BankAccount.user_id == user_id
         ).first()
@@ -239,20 +300,14 @@ class PaymentService:
         if not from_account:
             return None, "Счет отправителя не найден"
         
+        money = Money.parse(amount)
+        
         # Проверяем баланс перед переводом
         try:
             from src.services.account_service import AccountService
-            import redis
             
-            redis_client = redis.Redis(
-                host=settings.REDIS_HOST,
-                port=settings.REDIS_PORT,
-                db=settings.REDIS_DB,
-                decode_responses=True
-            )
-            
-            account_service = AccountService(db, redis_client)
-            balance_data = account_service.get_account_balance(
+            account_service = AccountService(self.db, self.redis_client)
+            balance_data = await account_service.get_account_balance(
                 user_id=user_id,
                 account_id=from_account.account_id,
                 bank_id=from_account.bank_id
@@ -261,9 +316,9 @@ class PaymentService:
             if not balance_data:
                 return None, "Не удалось получить баланс счета"
             
-            current_balance = balance_data.get("amount", 0)
+            current_balance = Money.from_fields(balance_data)
             
-            if current_balance < amount:
+            if current_balance.minor < money.minor:
                 return None, f"Недостаточно средств на счете. Текущий баланс: {current_balance}₽, требуется: {amount}₽"
             
             logger.info(f"✅ Баланс проверен для перевода на карту: {current_balance}₽ >= {amount}₽")
@@ -277,7 +332,7 @@ class PaymentService:
         payment = Payment(
             user_id=user_id,
             payment_type=PaymentType.CARD_TO_CARD,
-            amount=amount,
+            amount=money.to_decimal(),
             currency="RUB",
             from_account_id=from_account_id,
             from_account_name=from_account.account_name,
@@ -288,59 +343,22 @@ class PaymentService:
             completed_at=datetime.utcnow()
         )
         
-        db.add(payment)
-        try:
-            db.commit()
-            db.refresh(payment)
-            logger.info(f"✅ Платеж карта-карта {payment.id} успешно создан: {amount}₽ от пользователя {user_id}")
-            
-            # Обновляем кеш баланса счета (уменьшаем баланс на сумму платежа)
-            try:
-                import redis
-                import json
-                from src.config import settings
-                
-                redis_client = redis.Redis(
-                    host=settings.REDIS_HOST,
-                    port=settings.REDIS_PORT,
-                    db=settings.REDIS_DB,
-                    decode_responses=True
-                )
-                
-                balance_key = f"balance:{user_id}:{from_account.account_id}"
-                cached_balance = redis_client.get(balance_key)
-                
-                if cached_balance:
-                    balance_data = json.loads(cached_balance)
-                    current_balance = balance_data.get("amount", 0)
-                    new_balance = current_balance - amount
-                    balance_data["amount"] = max(0, new_balance)
-                    
-                    redis_client.setex(
-                        balance_key,
-                        settings.BANK_DATA_CACHE_TTL,
-                        json.dumps(balance_data)
-                    )
-                    logger.info(f"✅ Обновлен баланс в кеше для перевода на карту: {current_balance}₽ -> {balance_data['amount']}₽ (списано {amount}₽)")
-                
-                # Инвалидируем кеш транзакций
-                transactions_key = f"transactions:{user_id}:{from_account.account_id}"
-                redis_client.delete(transactions_key)
-                logger.info(f"✅ Инвалидирован кеш транзакций для {from_account.account_id}")
-                
-            except Exception as cache_error:
-                logger.warning(f"⚠️  Не удалось обновить кеш баланса: {cache_error}")
-            
-        except Exception as e:
-            db.rollback()
-            logger.error(f"❌ Ошибка сохранения платежа карта-карта: {e}")
-            return None, f"Ошибка сохранения платежа: {str(e)}"
+        # Уменьшаем баланс счета в кеше на сумму платежа
+        error = self._save_payment(
+            payment,
+            [BalanceShift(f"balance:{user_id}:{from_account.account_id}", -money)],
+            [f"transactions:{user_id}:{from_account.account_id}"],
+            [user_id]
+        )
+        if error:
+            logger.error(f"❌ Платеж карта-карта не создан: {error}")
+            return None, error
         
+        logger.info(f"✅ Платеж карта-карта {payment.id} успешно создан: {amount}₽ от пользователя {user_id}")
         return payment, None
     
-    @staticmethod
-    def create_utility_payment(
-        db: Session,
+    async def create_utility_payment(
+        self,
         user_id: int,
         from_account_id: int,
         payment_type: str,
@@ -349,7 +367,7 @@ class PaymentService:
         amount: float
     ) -> Tuple[Optional[Payment], Optional[str]]:
         """Оплата услуг (ЖКХ, связь, интернет и т.д.)"""
-        from_account = db.query(BankAccount).filter(
+        from_account = self.db.query(BankAccount).filter(
             BankAccount.id == from_account_id,
             BankAccount.user_id == user_id
         ).first()
@@ -357,20 +375,14 @@ class PaymentService:
         if not from_account:
             return None, "Счет отправителя не найден"
         
+        money = Money.parse(amount)
+        
         # Проверяем баланс перед оплатой
         try:
             from src.services.account_service import AccountService
-            import redis
             
-            redis_client = redis.Redis(
-                host=settings.REDIS_HOST,
-                port=settings.REDIS_PORT,
-                db=settings.REDIS_DB,
-                decode_responses=True
-            )
-            
-            account_service = AccountService(db, redis_client)
-            balance_data = account_service.get_account_balance(
+            account_service = AccountService(self.db, self.redis_client)
+            balance_data = await account_service.get_account_balance(
                 user_id=user_id,
                 account_id=from_account.account_id,
                 bank_id=from_account.bank_id
@@ -379,9 +391,9 @@ class PaymentService:
             if not balance_data:
                 return None, "Не удалось получить баланс счета"
             
-            current_balance = balance_data.get("amount", 0)
+            current_balance = Money.from_fields(balance_data)
             
-            if current_balance < amount:
+            if current_balance.minor < money.minor:
                 return None, f"Недостаточно средств на счете. Текущий баланс: {current_balance}₽, требуется: {amount}₽"
             
             logger.info(f"✅ Баланс проверен для оплаты услуг: {current_balance}₽ >= {amount}₽")
@@ -407,7 +419,7 @@ class PaymentService:
         payment = Payment(
             user_id=user_id,
             payment_type=ptype,
-            amount=amount,
+            amount=money.to_decimal(),
             currency="RUB",
             from_account_id=from_account_id,
             from_account_name=from_account.account_name,
@@ -418,54 +430,18 @@ class PaymentService:
             completed_at=datetime.utcnow()
         )
         
-        db.add(payment)
-        try:
-            db.commit()
-            db.refresh(payment)
-            logger.info(f"✅ Платеж услуг {payment.id} успешно создан: {amount}₽ от пользователя {user_id}")
-            
-            # Обновляем кеш баланса счета (уменьшаем баланс на сумму платежа)
-            try:
-                import redis
-                import json
-                from src.config import settings
-                
-                redis_client = redis.Redis(
-                    host=settings.REDIS_HOST,
-                    port=settings.REDIS_PORT,
-                    db=settings.REDIS_DB,
-                    decode_responses=True
-                )
-                
-                balance_key = f"balance:{user_id}:{from_account.account_id}"
-                cached_balance = redis_client.get(balance_key)
-                
-                if cached_balance:
-                    balance_data = json.loads(cached_balance)
-                    current_balance = balance_data.get("amount", 0)
-                    new_balance = current_balance - amount
-                    balance_data["amount"] = max(0, new_balance)
-                    
-                    redis_client.setex(
-                        balance_key,
-                        settings.BANK_DATA_CACHE_TTL,
-                        json.dumps(balance_data)
-                    )
-                    logger.info(f"✅ Обновлен баланс в кеше для оплаты услуг: {current_balance}₽ -> {balance_data['amount']}₽ (списано {amount}₽)")
-                
-                # Инвалидируем кеш транзакций
-                transactions_key = f"transactions:{user_id}:{from_account.account_id}"
-                redis_client.delete(transactions_key)
-                logger.info(f"✅ Инвалидирован кеш транзакций для {from_account.account_id}")
-                
-            except Exception as cache_error:
-                logger.warning(f"⚠️  Не удалось обновить кеш баланса: {cache_error}")
-            
-        except Exception as e:
-            db.rollback()
-            logger.error(f"❌ Ошибка сохранения платежа услуг: {e}")
-            return None, f"Ошибка сохранения платежа: {str(e)}"
+        # Уменьшаем баланс счета в кеше на сумму платежа
+        error = self._save_payment(
+            payment,
+            [BalanceShift(f"balance:{user_id}:{from_account.account_id}", -money)],
+            [f"transactions:{user_id}:{from_account.account_id}"],
+            [user_id]
+        )
+        if error:
+            logger.error(f"❌ Платеж услуг не создан: {error}")
+            return None, error
         
+        logger.info(f"✅ Платеж услуг {payment.id} успешно создан: {amount}₽ от пользователя {user_id}")
         return payment, None
     
     @staticmethod
@@ -485,9 +461,8 @@ class PaymentService:
             )
         ).order_by(Payment.created_at.desc()).offset(offset).limit(limit).all()
     
-    @staticmethod
-    def create_premium_payment(
-        db: Session,
+    async def create_premium_payment(
+        self,
         user_id: int,
         from_account_id: int,
         amount: float = 299.0
@@ -511,7 +486,7 @@ class PaymentService:
         
         # Пытаемся найти счет пользователя
         logger.info(f"🔍 Поиск счета: from_account_id={from_account_id}, user_id={user_id}")
-        from_account = db.query(BankAccount).filter(
+        from_account = self.db.query(BankAccount).filter(
             BankAccount.id == from_account_id,
             BankAccount.user_id == user_id
         ).first()
@@ -519,7 +494,7 @@ class PaymentService:
         if not from_account:
             logger.warning(f"⚠️  Счет {from_account_id} не найден, ищем счет с наивысшим приоритетом")
             # Если не нашли - берем счет с наивысшим приоритетом (priority = 1)
-            from_account = db.query(BankAccount).filter(
+            from_account = self.db.query(BankAccount).filter(
                 BankAccount.user_id == user_id,
                 BankAccount.is_active == True
             ).order_by(BankAccount.priority.asc()).first()
@@ -535,19 +510,12 @@ class PaymentService:
         logger.info(f"✅ Счет найден: id={from_account.id}, account_id={from_account.account_id}, bank_id={from_account.bank_id}")
         
         # ШАГ 2: Проверяем баланс счета
+        money = Money.parse(amount)
         try:
             from src.services.account_service import AccountService
-            import redis
             
-            redis_client = redis.Redis(
-                host=settings.REDIS_HOST,
-                port=settings.REDIS_PORT,
-                db=settings.REDIS_DB,
-                decode_responses=True
-            )
-            
-            account_service = AccountService(db, redis_client)
-            balance_data = account_service.get_account_balance(
+            account_service = AccountService(self.db, self.redis_client)
+            balance_data = await account_service.get_account_balance(
                 user_id=user_id,
                 account_id=from_account.account_id,
                 bank_id=from_account.bank_id
@@ -556,9 +524,9 @@ class PaymentService:
             if not balance_data:
                 return None, "Не удалось получить баланс счета"
             
-            current_balance = balance_data.get("amount", 0)
+            current_balance = Money.from_fields(balance_data)
             
-            if current_balance < amount:
+            if current_balance.minor < money.minor:
                 return None, f"Недостаточно средств на счете. Текущий баланс: {current_balance}₽, требуется: {amount}₽"
             
             logger.info(f"✅ Баланс проверен: {current_balance}₽ >= {amount}₽")
@@ -591,7 +559,7 @@ class PaymentService:
         payment = Payment(
             user_id=user_id,
             payment_type=PaymentType.PREMIUM,
-            amount=amount,
+            amount=money.to_decimal(),
             currency="RUB",
             from_account_id=from_account_id,
             from_account_name=from_account.account_name,
@@ -601,66 +569,17 @@ class PaymentService:
             completed_at=datetime.utcnow()
         )
         
-        db.add(payment)
-        try:
-            db.commit()
-            db.refresh(payment)
-            logger.info(f"✅ Платеж Premium {payment.id} успешно создан: {amount}₽ от пользователя {user_id}")
-            
-            # Обновляем кеш баланса счета (уменьшаем баланс на сумму платежа)
-            try:
-                import redis
-                import json
-                from src.config import settings
-                
-                redis_client = redis.Redis(
-                    host=settings.REDIS_HOST,
-                    port=settings.REDIS_PORT,
-                    db=settings.REDIS_DB,
-                    decode_responses=True
-                )
-                
-                balance_key = f"balance:{user_id}:{from_account.account_id}"
-                cached_balance = redis_client.get(balance_key)
-                
-                if cached_balance:
-                    balance_data = json.loads(cached_balance)
-                    current_balance = balance_data.get("amount", 0)
-                    new_balance = current_balance - amount
-                    balance_data["amount"] = max(0, new_balance)  # Не даем балансу уйти в минус
-                    
-                    redis_client.setex(
-                        balance_key,
-                        settings.BANK_DATA_CACHE_TTL,
-                        json.dumps(balance_data)
-                    )
-                    logger.info(f"✅ Обновлен баланс в кеше для Premium: {current_balance}₽ -> {balance_data['amount']}₽ (списано {amount}₽)")
-                else:
-                    logger.warning(f"⚠️  Баланс не найден в кеше для {balance_key}, создаем новый")
-                    # Создаем новый баланс в кеше
-                    balance_data = {
-                        "amount": max(0, -amount),  # Если баланс был 0, то после списания будет отрицательным, но мы ограничиваем до 0
-                        "currency": "RUB"
-                    }
-                    redis_client.setex(
-                        balance_key,
-                        settings.BANK_DATA_CACHE_TTL,
-                        json.dumps(balance_data)
-                    )
-                
-                # Инвалидируем кеш транзакций
-                transactions_key = f"transactions:{user_id}:{from_account.account_id}"
-                redis_client.delete(transactions_key)
-                logger.info(f"✅ Инвалидирован кеш транзакций для {from_account.account_id}")
-                
-            except Exception as cache_error:
-                logger.warning(f"⚠️  Не удалось обновить кеш баланса: {cache_error}")
-                # Не блокируем платеж из-за ошибки кеша
-            
-        except Exception as e:
-            db.rollback()
-            logger.error(f"❌ Ошибка сохранения платежа Premium: {e}")
-            return None, f"Ошибка сохранения платежа: {str(e)}"
+        # Уменьшаем баланс счета в кеше на сумму платежа
+        error = self._save_payment(
+            payment,
+            [BalanceShift(f"balance:{user_id}:{from_account.account_id}", -money)],
+            [f"transactions:{user_id}:{from_account.account_id}"],
+            [user_id]
+        )
+        if error:
+            logger.error(f"❌ Платеж Premium не создан: {error}")
+            return None, error
         
+        logger.info(f"✅ Платеж Premium {payment.id} успешно создан: {amount}₽ от пользователя {user_id}")
         return payment, None
 
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import random
+import redis
+from typing import List, Optional, Tuple
+
+from src.config import settings
+from src.constants.bank_config import BANK_RATE_LIMITS
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BACKGROUND = "background"
+
+# Атомарно проверяет и списывает по одному токену из всех переданных корзин.
+# KEYS - корзины, ARGV - тройки (rate в секунду, burst, минимум токенов для списания).
+# Возвращает 0, если токены списаны, иначе сколько миллисекунд подождать.
+TOKEN_BUCKET_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local wait = 0
+local tokens = {}
+
+for i, key in ipairs(KEYS) do
+    local base = (i - 1) * 3
+    local rate = tonumber(ARGV[base + 1])
+    local burst = tonumber(ARGV[base + 2])
+    local min_tokens = tonumber(ARGV[base + 3])
+
+    local data = redis.call('HMGET', key, 'tokens', 'ts')
+    local current = tonumber(data[1]) or burst
+    local ts = tonumber(data[2]) or now
+
+    current = math.min(burst, current + math.max(0, now - ts) * rate / 1000)
+    tokens[i] = current
+
+    if current < min_tokens then
+        wait = math.max(wait, math.ceil((min_tokens - current) * 1000 / rate))
+    end
+end
+
+for i, key in ipairs(KEYS) do
+    local base = (i - 1) * 3
+    local rate = tonumber(ARGV[base + 1])
+    local burst = tonumber(ARGV[base + 2])
+    local current = tokens[i]
+
+    if wait == 0 then
+        current = current - 1
+    end
+
+    redis.call('HSET', key, 'tokens', tostring(current), 'ts', now)
+    redis.call('PEXPIRE', key, math.ceil(burst * 1000 / rate) + 1000)
+end
+
+return wait
+"""
+
+class RateLimitExceeded(Exception):
+    """Не удалось получить слот для запроса к банку до дедлайна"""
+
+    def __init__(self, bank_id: int, endpoint_class: str):
+        self.bank_id = bank_id
+        self.endpoint_class = endpoint_class
+        super().__init__(f"Превышен лимит запросов к банку {bank_id} ({endpoint_class})")
+
+class BankRateLimiter:
+    """
+    Распределённый (Redis) token bucket для исходящих запросов к Bank API.
+
+    Каждый запрос берёт токен сразу из двух корзин:
+    - банк + класс эндпоинта (лимиты из BANK_RATE_LIMITS) - квоты банка;
+    - банк + пользователь - чтобы пользователь с множеством счетов не выбирал всю квоту.
+
+    Фоновая синхронизация берёт токен из корзины банка, только если там остаётся
+    запас BANK_RATE_LIMIT_BACKGROUND_RESERVE * burst, поэтому интерактивные запросы
+    всегда проходят первыми. При нехватке токенов запрос ждёт своей очереди до дедлайна.
+    """
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis_client = redis_client
+        self._script = redis_client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def acquire(
+        self,
+        bank_id: int,
+        endpoint_class: str,
+        user_id: Optional[int] = None,
+        priority: str = PRIORITY_INTERACTIVE
+    ) -> None:
+        if not settings.BANK_RATE_LIMIT_ENABLED:
+            return
+
+        keys, args = self._buckets(bank_id, endpoint_class, user_id, priority)
+
+        max_wait = (
+            settings.BANK_RATE_LIMIT_BACKGROUND_WAIT
+            if priority == PRIORITY_BACKGROUND
+            else settings.BANK_RATE_LIMIT_INTERACTIVE_WAIT
+        )
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max_wait
+
+        while True:
+            wait_ms = int(self._script(keys=keys, args=args))
+            if wait_ms <= 0:
+                return
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                logger.warning(f"⚠️  Лимит запросов к банку {bank_id} ({endpoint_class}): дедлайн ожидания истёк")
+                raise RateLimitExceeded(bank_id, endpoint_class)
+
+            # Небольшой джиттер, чтобы ожидающие воркеры не просыпались одновременно
+            delay = wait_ms / 1000 * (1 + random.random() * 0.2)
+            await asyncio.sleep(min(delay, remaining))
+
+    def _buckets(
+        self,
+        bank_id: int,
+        endpoint_class: str,
+        user_id: Optional[int],
+        priority: str
+    ) -> Tuple[List[str], List[float]]:
+        rate, burst = BANK_RATE_LIMITS.get(endpoint_class, BANK_RATE_LIMITS["accounts"])
+
+        min_tokens = 1
+        if priority == PRIORITY_BACKGROUND:
+            min_tokens = min(burst, min_tokens + burst * settings.BANK_RATE_LIMIT_BACKGROUND_RESERVE)
+
+        keys: List[str] = [f"ratelimit:{bank_id}:{endpoint_class}"]
+        args: List[float] = [rate, burst, min_tokens]
+
+        if user_id is not None:
+            keys.append(f"ratelimit:{bank_id}:user:{user_id}")
+            args.extend([
+                settings.BANK_RATE_LIMIT_USER_RATE,
+                settings.BANK_RATE_LIMIT_USER_BURST,
+                1
+            ])
+
+        return keys, args
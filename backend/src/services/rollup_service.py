@@ -0,0 +1,480 @@
+import logging
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from sqlalchemy import Date, and_, bindparam, case, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+
+from src.config import settings
+from src.models.bank_transaction import BankTransaction
+from src.models.daily_rollup import DailySpendingRollup, HourlySpendingRollup
+from src.models.payment import Payment, PaymentType, PaymentStatus
+from src.models.user import User
+from src.constants.constants import TransactionCategory
+from src.utils.money import Money, to_minor
+
+logger = logging.getLogger(__name__)
+
+DIRECTION_DEBIT = "debit"
+DIRECTION_CREDIT = "credit"
+
+# Категория расхода для внутренних платежей (связь входит в "ЖКХ и связь")
+PAYMENT_TYPE_CATEGORIES = {
+    PaymentType.UTILITIES: TransactionCategory.UTILITIES,
+    PaymentType.ELECTRICITY: TransactionCategory.UTILITIES,
+    PaymentType.MOBILE: TransactionCategory.UTILITIES,
+    PaymentType.PHONE: TransactionCategory.UTILITIES,
+    PaymentType.INTERNET: TransactionCategory.UTILITIES,
+    PaymentType.TV: TransactionCategory.ENTERTAINMENT,
+    PaymentType.TO_PERSON: TransactionCategory.TRANSFERS,
+    PaymentType.CARD_TO_CARD: TransactionCategory.TRANSFERS,
+}
+
+# То же сопоставление в SQL, для агрегации платежей на стороне БД
+PAYMENT_CATEGORY_SQL = case(
+    *[
+        (Payment.payment_type == payment_type, category.value)
+        for payment_type, category in PAYMENT_TYPE_CATEGORIES.items()
+    ],
+    else_=TransactionCategory.OTHER.value
+)
+
+# Часовой пояс гистограмм по дням недели и часам
+ANALYTICS_TZ = ZoneInfo(settings.ANALYTICS_TIMEZONE)
+
+# (время операции, категория, направление, сумма)
+RollupEntry = Tuple[datetime, str, str, Decimal]
+# (категория, направление) -> (сумма, количество)
+RollupTotals = Dict[Tuple[str, str], Tuple[Money, int]]
+# (месяц, направление, день недели, час) -> [сумма в копейках, количество]
+HourlyDeltas = Dict[Tuple[date, str, int, int], List[int]]
+
+def payment_category(payment_type: PaymentType) -> TransactionCategory:
+    return PAYMENT_TYPE_CATEGORIES.get(payment_type, TransactionCategory.OTHER)
+
+def rollup_day(ts: datetime) -> date:
+    # Дни считаются в UTC; платежи хранят naive UTC (datetime.utcnow)
+    return ts.astimezone(timezone.utc).date() if ts.tzinfo is not None else ts.date()
+
+def day_start(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+
+def local_slot(ts: datetime) -> Tuple[date, int, int]:
+    """
+    (первое число месяца, день недели, час) операции по местному времени ANALYTICS_TZ
+    """
+    local = (ts if ts.tzinfo is not None else ts.replace(tzinfo=timezone.utc)).astimezone(ANALYTICS_TZ)
+    return local.date().replace(day=1), local.weekday(), local.hour
+
+def local_month_start(now: datetime) -> datetime:
+    """
+    Начало текущего месяца по местному времени, в UTC
+    """
+    local = now.astimezone(ANALYTICS_TZ).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    return local.astimezone(timezone.utc)
+
+def _add_hourly(hours: HourlyDeltas, ts: datetime, direction: str, amount: int, count: int = 1) -> None:
+    month, weekday, hour = local_slot(ts)
+    delta = hours.setdefault((month, direction, weekday, hour), [0, 0])
+    delta[0] += amount
+    delta[1] += count
+
+def payment_totals(
+    db: Session,
+    user_id: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    by_day: bool = True
+) -> List[Tuple[str, str, Optional[date], Money, int]]:
+    """
+    Проведённые внутренние платежи пользователя, сгруппированные в SQL по категории
+    (и дню при by_day, иначе день - None): исходящие - debit, входящие - credit.
+    Границы [since, until) в naive UTC, как completed_at; запросы идут по индексам
+    (user_id | to_user_id, status, completed_at).
+    """
+    category = PAYMENT_CATEGORY_SQL.label("category")
+    day = func.date(Payment.completed_at, type_=Date).label("day")
+    columns = (category, day) if by_day else (category,)
+
+    result = []
+    for direction, party in ((DIRECTION_DEBIT, Payment.user_id), (DIRECTION_CREDIT, Payment.to_user_id)):
+        query = db.query(*columns, func.sum(Payment.amount), func.count(Payment.id)).filter(
+            party == user_id,
+            Payment.status == PaymentStatus.COMPLETED,
+            Payment.completed_at.isnot(None)
+        )
+        if since is not None:
+            query = query.filter(Payment.completed_at >= since)
+        if until is not None:
+            query = query.filter(Payment.completed_at < until)
+
+        for row in query.group_by(*columns):
+            amount, count = row[-2], row[-1]
+            result.append((
+                row[0],
+                direction,
+                row[1] if by_day else None,
+                Money.parse(amount),
+                count
+            ))
+
+    return result
+
+def payment_hourly(db: Session, user_id: int, since: Optional[datetime] = None) -> HourlyDeltas:
+    """
+    Проведённые внутренние платежи пользователя по (месяц, направление, день недели, час)
+    местного времени. Час в SQL переносимо не вычислить с учётом часового пояса, поэтому
+    строки раскладываются здесь; платежей у пользователя на порядки меньше транзакций.
+    since - naive UTC, как completed_at.
+    """
+    hours: HourlyDeltas = {}
+    for direction, party in ((DIRECTION_DEBIT, Payment.user_id), (DIRECTION_CREDIT, Payment.to_user_id)):
+        query = db.query(Payment.completed_at, Payment.amount).filter(
+            party == user_id,
+            Payment.status == PaymentStatus.COMPLETED,
+            Payment.completed_at.isnot(None)
+        )
+        if since is not None:
+            query = query.filter(Payment.completed_at >= since)
+
+        for completed_at, amount in query.yield_per(1000):
+            _add_hourly(hours, completed_at, direction, to_minor(amount))
+
+    return hours
+
+class SpendingRollupService:
+    """
+    Дневные агрегаты операций пользователя (DailySpendingRollup) по категории и
+    направлению и месячные гистограммы по дню недели и часу (HourlySpendingRollup).
+    Обновляются инкрементально при сохранении транзакций банка и
+    проведении внутренних платежей; итоги за любой период читаются по накопленным
+    суммам за постоянное число запросов, без прохода по сырым операциям.
+
+    Изменения одного пользователя сериализуются блокировкой его строки в users.
+    Сервис не коммитит: агрегаты попадают в ту же транзакцию, что и сами операции.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def add(self, user_id: int, entries: Iterable[RollupEntry]) -> None:
+        """
+        Учесть новые операции пользователя. Пока агрегаты пользователя не построены,
+        операции пропускаются: их подхватит ensure_built из исходных таблиц.
+        Суммы копятся в целых копейках.
+        """
+        deltas: Dict[Tuple[str, str, date], List[int]] = {}
+        hours: HourlyDeltas = {}
+        for ts, category, direction, amount in entries:
+            amount = abs(to_minor(amount))
+            delta = deltas.setdefault((category, direction, rollup_day(ts)), [0, 0])
+            delta[0] += amount
+            delta[1] += 1
+            _add_hourly(hours, ts, direction, amount)
+
+        if not deltas or user_id not in self._lock_built([user_id]):
+            return
+
+        self._apply(user_id, deltas, hours)
+
+    def add_payment(self, payment: Payment) -> None:
+        """
+        Учесть проведённый внутренний платёж: расход отправителя и доход получателя
+        """
+        ts = payment.completed_at or payment.created_at or datetime.utcnow()
+        category = payment_category(payment.payment_type).value
+        amount = to_minor(payment.amount)
+
+        user_ids = [payment.user_id] + ([payment.to_user_id] if payment.to_user_id else [])
+        built = self._lock_built(user_ids)
+
+        for party, direction in ((payment.user_id, DIRECTION_DEBIT), (payment.to_user_id, DIRECTION_CREDIT)):
+            if party not in built:
+                continue
+            hours: HourlyDeltas = {}
+            _add_hourly(hours, ts, direction, amount)
+            self._apply(party, {(category, direction, rollup_day(ts)): [amount, 1]}, hours)
+
+    def ensure_built(self, user_id: int) -> None:
+        """
+        Построить агрегаты пользователя по bank_transactions и payments, если их ещё нет
+        """
+        if self.db.query(User.spending_rollups_built_at).filter(User.id == user_id).scalar() is not None:
+            return
+
+        try:
+            self.rebuild(user_id)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+    def rebuild(self, user_id: int) -> None:
+        if user_id in self._lock_built([user_id]):
+            # Пока ждали блокировку, агрегаты построил другой запрос
+            return
+
+        deltas: Dict[Tuple[str, str, date], List[int]] = {}
+
+        transactions = self.db.query(
+            BankTransaction.booking_ts, BankTransaction.category, BankTransaction.type, BankTransaction.amount
+        ).filter(BankTransaction.user_id == user_id)
+        hours: HourlyDeltas = {}
+        for booking_ts, category, txn_type, amount in transactions.yield_per(1000):
+            amount = abs(to_minor(amount))
+            delta = deltas.setdefault((category, txn_type, rollup_day(booking_ts)), [0, 0])
+            delta[0] += amount
+            delta[1] += 1
+            _add_hourly(hours, booking_ts, txn_type, amount)
+
+        for category, direction, day, amount, count in payment_totals(self.db, user_id):
+            delta = deltas.setdefault((category, direction, day), [0, 0])
+            delta[0] += amount.minor
+            delta[1] += count
+
+        for key, (amount, count) in payment_hourly(self.db, user_id).items():
+            delta = hours.setdefault(key, [0, 0])
+            delta[0] += amount
+            delta[1] += count
+
+        for model in (DailySpendingRollup, HourlySpendingRollup):
+            self.db.query(model).filter(model.user_id == user_id).delete(synchronize_session=False)
+        self.db.flush()
+        if deltas:
+            self._apply(user_id, deltas, hours)
+
+        self.db.query(User).filter(User.id == user_id).update(
+            {User.spending_rollups_built_at: datetime.now(timezone.utc)},
+            synchronize_session=False
+        )
+        logger.info(f"✅ Построены дневные агрегаты пользователя {user_id}: {len(deltas)} строк")
+
+    def _lock_built(self, user_ids: List[int]) -> set:
+        # Блокируем в порядке id, чтобы платёж между двумя пользователями не ловил взаимоблокировку
+        rows = (
+            self.db.query(User.id, User.spending_rollups_built_at)
+            .filter(User.id.in_(user_ids))
+            .order_by(User.id)
+            .with_for_update()
+            .all()
+        )
+        return {row_id for row_id, built_at in rows if built_at is not None}
+
+    def _apply(self, user_id: int, deltas: Dict[Tuple[str, str, date], List[int]], hours: HourlyDeltas) -> None:
+        rows = [
+            {
+                "user_id": user_id,
+                "category": category,
+                "direction": direction,
+                "day": day,
+                "amount": Money(amount).to_decimal(),
+                "count": count,
+                "cum_amount": 0,
+                "cum_count": 0
+            }
+            for (category, direction, day), (amount, count) in deltas.items()
+        ]
+
+        stmt = pg_insert(DailySpendingRollup).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_daily_rollup",
+            set_={
+                "amount": DailySpendingRollup.amount + stmt.excluded.amount,
+                "count": DailySpendingRollup.count + stmt.excluded.count
+            }
+        )
+        self.db.execute(stmt)
+
+        first_days: Dict[Tuple[str, str], date] = {}
+        for category, direction, day in deltas:
+            series = (category, direction)
+            first_days[series] = min(first_days.get(series, day), day)
+
+        self._refresh_cumulative(user_id, first_days)
+        self._apply_hourly(user_id, hours)
+
+    def _apply_hourly(self, user_id: int, hours: HourlyDeltas) -> None:
+        if not hours:
+            return
+
+        stmt = pg_insert(HourlySpendingRollup).values([
+            {
+                "user_id": user_id,
+                "month": month,
+                "direction": direction,
+                "weekday": weekday,
+                "hour": hour,
+                "amount": Money(amount).to_decimal(),
+                "count": count
+            }
+            for (month, direction, weekday, hour), (amount, count) in hours.items()
+        ])
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_hourly_rollup",
+            set_={
+                "amount": HourlySpendingRollup.amount + stmt.excluded.amount,
+                "count": HourlySpendingRollup.count + stmt.excluded.count
+            }
+        )
+        self.db.execute(stmt)
+
+    def _refresh_cumulative(self, user_id: int, first_days: Dict[Tuple[str, str], date]) -> None:
+        """
+        Пересчитать накопленные итоги рядов начиная с самого раннего изменённого дня.
+        Новые операции почти всегда свежие, так что обновляется хвост из нескольких строк.
+        """
+        rollup = DailySpendingRollup
+        updates = []
+
+        for (category, direction), since in first_days.items():
+            series = (rollup.user_id == user_id, rollup.category == category, rollup.direction == direction)
+
+            base = (
+                self.db.query(rollup.cum_amount, rollup.cum_count)
+                .filter(*series, rollup.day < since)
+                .order_by(rollup.day.desc())
+                .limit(1)
+                .first()
+            )
+            cum_amount, cum_count = (to_minor(base[0]), base[1]) if base else (0, 0)
+
+            for row_id, amount, count in (
+                self.db.query(rollup.id, rollup.amount, rollup.count)
+                .filter(*series, rollup.day >= since)
+                .order_by(rollup.day)
+            ):
+                cum_amount += to_minor(amount)
+                cum_count += count
+                updates.append({
+                    "row_id": row_id,
+                    "new_cum_amount": Money(cum_amount).to_decimal(),
+                    "new_cum_count": cum_count
+                })
+
+        if updates:
+            table = rollup.__table__
+            self.db.execute(
+                update(table)
+                .where(table.c.id == bindparam("row_id"))
+                .values(cum_amount=bindparam("new_cum_amount"), cum_count=bindparam("new_cum_count")),
+                updates
+            )
+
+    def cumulative(self, user_id: int, day: Optional[date] = None) -> RollupTotals:
+        """
+        Накопленные итоги каждого ряда пользователя на конец дня day (None - на сегодня и позже)
+        """
+        rollup = DailySpendingRollup
+
+        last_day = select(
+            rollup.category,
+            rollup.direction,
+            func.max(rollup.day).label("day")
+        ).where(rollup.user_id == user_id)
+        if day is not None:
+            last_day = last_day.where(rollup.day <= day)
+        last_day = last_day.group_by(rollup.category, rollup.direction).subquery()
+
+        rows = self.db.execute(
+            select(rollup.category, rollup.direction, rollup.cum_amount, rollup.cum_count)
+            .join(last_day, and_(
+                rollup.category == last_day.c.category,
+                rollup.direction == last_day.c.direction,
+                rollup.day == last_day.c.day
+            ))
+            .where(rollup.user_id == user_id)
+        )
+        return {(category, direction): (Money.parse(amount), count) for category, direction, amount, count in rows}
+
+    def range_totals(
+        self,
+        user_id: int,
+        start_day: Optional[date] = None,
+        end_day: Optional[date] = None
+    ) -> RollupTotals:
+        """
+        Итоги за дни [start_day, end_day] включительно: разность двух накопленных итогов
+        """
+        end = self.cumulative(user_id, end_day)
+        if start_day is None:
+            return end
+        return subtract_totals(end, self.cumulative(user_id, start_day - timedelta(days=1)))
+
+    def daily(
+        self,
+        user_id: int,
+        start_day: date,
+        end_day: Optional[date] = None,
+        direction: str = DIRECTION_DEBIT,
+        exclude_categories: Sequence[str] = ()
+    ) -> List[Tuple[date, Money, int]]:
+        """
+        Суммы по дням (все категории, кроме exclude_categories, вместе) за [start_day, end_day]
+        """
+        rollup = DailySpendingRollup
+        query = self.db.query(
+            rollup.day, func.sum(rollup.amount), func.sum(rollup.count)
+        ).filter(
+            rollup.user_id == user_id,
+            rollup.direction == direction,
+            rollup.day >= start_day
+        )
+        if end_day is not None:
+            query = query.filter(rollup.day <= end_day)
+        if exclude_categories:
+            query = query.filter(rollup.category.notin_(exclude_categories))
+
+        return [(day, Money.parse(amount), int(count)) for day, amount, count in query.group_by(rollup.day)]
+
+    def monthly(
+        self,
+        user_id: int,
+        start_day: date,
+        end_day: date,
+        direction: str = DIRECTION_DEBIT
+    ) -> Dict[date, RollupTotals]:
+        """
+        Итоги по категориям за каждый месяц дней [start_day, end_day] за один проход
+        по дневным строкам; ключ - первое число месяца
+        """
+        rollup = DailySpendingRollup
+        rows = self.db.query(rollup.day, rollup.category, rollup.amount, rollup.count).filter(
+            rollup.user_id == user_id,
+            rollup.direction == direction,
+            rollup.day >= start_day,
+            rollup.day <= end_day
+        )
+
+        result: Dict[date, RollupTotals] = {}
+        for day, category, amount, count in rows:
+            totals = result.setdefault(day.replace(day=1), {})
+            total_amount, total_count = totals.get((category, direction), (Money(0), 0))
+            totals[(category, direction)] = (total_amount + Money.parse(amount), total_count + count)
+        return result
+
+    def hourly(
+        self,
+        user_id: int,
+        month: date,
+        direction: str = DIRECTION_DEBIT
+    ) -> List[Tuple[int, int, Money, int]]:
+        """
+        Гистограмма месяца (первое число) по местному времени: (день недели, час, сумма, количество)
+        """
+        rollup = HourlySpendingRollup
+        rows = self.db.query(rollup.weekday, rollup.hour, rollup.amount, rollup.count).filter(
+            rollup.user_id == user_id,
+            rollup.month == month,
+            rollup.direction == direction
+        )
+        return [(weekday, hour, Money.parse(amount), count) for weekday, hour, amount, count in rows]
+
+def subtract_totals(end: RollupTotals, start: RollupTotals) -> RollupTotals:
+    result = {}
+    for series, (amount, count) in end.items():
+        before_amount, before_count = start.get(series, (Money(0), 0))
+        if count - before_count > 0:
+            result[series] = (amount - before_amount, count - before_count)
+    return result
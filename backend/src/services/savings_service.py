@@ -7,6 +7,7 @@ from datetime import datetime, timedelta
 from src.models.savings_goal import SavingsGoal, GoalContributionRule, FamilyBudgetLimit, GoalStatus, ContributionRule
 from src.models.account import BankAccount
 from src.models.user import User
+from src.utils.money import Money
 
 
 class SavingsService:
@@ -39,7 +40,7 @@ class SavingsService:
             user_id=user_id,
             name=name,
             description=description,
-            target_amount=target_amount,
+            target_amount=Money.parse(target_amount).to_decimal(),
             target_account_id=target_account_id,
             target_date=target_date,
             image_url=image_url,
@@ -87,7 +88,7 @@ class SavingsService:
             source_account_id=source_account_id,
             source_bank_account=account.account_id,
             rule_type=ContributionRule(rule_type),
-            fixed_amount=fixed_amount,
+            fixed_amount=Money.parse(fixed_amount).to_decimal() if fixed_amount is not None else None,
             percentage=percentage,
             is_active=True
         )
@@ -125,10 +126,11 @@ class SavingsService:
         if goal.status != GoalStatus.ACTIVE:
             return False, "Цель не активна"
         
-        goal.current_amount += amount
+        current = Money.parse(goal.current_amount) + Money.parse(amount)
+        goal.current_amount = current.to_decimal()
         
         # Проверяем достижение цели
-        if goal.current_amount >= goal.target_amount:
+        if current >= Money.parse(goal.target_amount):
             goal.status = GoalStatus.COMPLETED
             goal.completed_at = datetime.utcnow()
         
@@ -139,17 +141,19 @@ class SavingsService:
     @staticmethod
     def calculate_progress(goal: SavingsGoal) -> dict:
         """Рассчитать прогресс цели"""
-        progress_percentage = (goal.current_amount / goal.target_amount * 100) if goal.target_amount > 0 else 0
-        remaining = goal.target_amount - goal.current_amount
+        current = Money.parse(goal.current_amount)
+        target = Money.parse(goal.target_amount)
+        progress_percentage = current.ratio(target) * 100 if target.minor > 0 else 0
+        remaining = (target - current).to_float()
         
         # Простая оценка даты завершения (если есть история)
         estimated_completion = None
         if goal.target_date:
             estimated_completion = goal.target_date
-        elif goal.current_amount > 0 and goal.created_at:
+        elif current.minor > 0 and goal.created_at:
             days_since_creation = (datetime.utcnow() - goal.created_at).days
             if days_since_creation > 0:
-                daily_rate = goal.current_amount / days_since_creation
+                daily_rate = current.to_float() / days_since_creation
                 if daily_rate > 0:
                     days_remaining = remaining / daily_rate
                     estimated_completion = datetime.utcnow() + timedelta(days=days_remaining)
@@ -183,16 +187,16 @@ class FamilyBudgetService:
         
         if limit:
             # Обновляем
-            limit.monthly_limit = monthly_limit
-            limit.daily_limit = daily_limit
+            limit.monthly_limit = Money.parse(monthly_limit).to_decimal()
+            limit.daily_limit = Money.parse(daily_limit).to_decimal()
             limit.notify_at_percentage = notify_at
         else:
             # Создаем новый
             limit = FamilyBudgetLimit(
                 group_id=group_id,
                 user_id=user_id,
-                monthly_limit=monthly_limit,
-                daily_limit=daily_limit,
+                monthly_limit=Money.parse(monthly_limit).to_decimal(),
+                daily_limit=Money.parse(daily_limit).to_decimal(),
                 notify_at_percentage=notify_at
             )
             db.add(limit)
@@ -221,12 +225,16 @@ class FamilyBudgetService:
         if not limit:
             return False, None  # Нет лимита - можно тратить
         
+        spent = Money.parse(amount)
+        
         # Проверяем дневной лимит
-        if limit.daily_limit > 0 and (limit.current_day_spent + amount) > limit.daily_limit:
+        daily_limit = Money.parse(limit.daily_limit)
+        if daily_limit.minor > 0 and Money.parse(limit.current_day_spent) + spent > daily_limit:
             return True, f"Превышен дневной лимит: {limit.daily_limit}₽"
         
         # Проверяем месячный лимит
-        if limit.monthly_limit > 0 and (limit.current_month_spent + amount) > limit.monthly_limit:
+        monthly_limit = Money.parse(limit.monthly_limit)
+        if monthly_limit.minor > 0 and Money.parse(limit.current_month_spent) + spent > monthly_limit:
             return True, f"Превышен месячный лимит: {limit.monthly_limit}₽"
         
         return False, None
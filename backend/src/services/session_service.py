@@ -4,6 +4,7 @@ from typing import Optional
 import redis
 
 from src.config import settings
+from src.local_cache import local_cache, invalidate
 
 logger = logging.getLogger(__name__)
 
@@ -23,9 +24,17 @@ class SessionService:
     @staticmethod
     def get_user_id(redis_client: redis.Redis, session_id: str) -> Optional[int]:
         session_key = f"session:{session_id}"
+
+        if settings.LOCAL_CACHE_ENABLED:
+            cached = local_cache.get(session_key)
+            if cached:
+                return cached[0]
+
         user_id_str = redis_client.get(session_key)
 
         if user_id_str:
+            if settings.LOCAL_CACHE_ENABLED:
+                local_cache.set(session_key, int(user_id_str), len(session_key) + len(user_id_str))
             return int(user_id_str)
         return None
 
@@ -33,6 +42,7 @@ class SessionService:
     def delete_session(redis_client: redis.Redis, session_id: str) -> bool:
         session_key = f"session:{session_id}"
         result = redis_client.delete(session_key)
+        invalidate(redis_client, [session_key])
 
         if result:
             logger.info(f"Сессия удалена: {session_id[:10]}...")
@@ -0,0 +1,307 @@
+import asyncio
+import logging
+import math
+import random
+import time
+import redis
+from datetime import datetime, timedelta
+from redis.exceptions import LockError
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from src import cache_codec
+from src.config import settings
+from src.redis_client import binary_client_for
+from src.local_cache import local_cache, invalidation_message
+from src.services import balance_cache
+
+logger = logging.getLogger(__name__)
+
+Loader = Callable[[], Awaitable[Any]]
+
+# Загрузки и фоновые обновления, уже запущенные в этом процессе
+_inflight: Dict[str, asyncio.Task] = {}
+_refreshing: Set[str] = set()
+_background_tasks: Set[asyncio.Task] = set()
+# Сглаженное время пересчёта по пространству ключей (balance, transactions, ...)
+_recompute_seconds: Dict[str, float] = {}
+_redis_stats = {"hits": 0, "misses": 0}
+
+def cache_stats() -> Dict[str, Any]:
+    lookups = _redis_stats["hits"] + _redis_stats["misses"]
+    return {
+        "local": local_cache.snapshot(),
+        "redis": {
+            **_redis_stats,
+            "hitRate": round(_redis_stats["hits"] / lookups, 3) if lookups else 0.0
+        }
+    }
+
+class SWRCache:
+    """
+    Stale-while-revalidate кеш поверх Redis.
+
+    Перед Redis стоит локальный LRU процесса (src.local_cache), запись рассылает
+    инвалидацию остальным воркерам.
+
+    Значение кодируется кодеком своего пространства ключей (src.cache_codec) и
+    хранится с жёстким TTL hard_ttl; балансы хранятся хешем (src.services.balance_cache),
+    чтобы платежи меняли их атомарно на стороне Redis; возраст записи вычисляется по оставшемуся TTL
+    ключа, поэтому код, который пишет те же ключи через SETEX(BANK_DATA_CACHE_TTL),
+    остаётся совместимым.
+
+    - возраст < soft_ttl: отдаём из кеша; ближе к soft_ttl запись с растущей
+      вероятностью обновляется заранее (XFetch), чтобы горячие ключи не истекали разом;
+    - soft_ttl <= возраст < hard_ttl: отдаём устаревшее значение сразу и запускаем
+      одно фоновое обновление под Redis-локом;
+    - промах: загружает один запрос (в процессе - общий Task, между процессами -
+      Redis-лок), остальные ждут его результат.
+    """
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        soft_ttl: Optional[int] = None,
+        hard_ttl: Optional[int] = None
+    ):
+        self.redis_client = redis_client
+        self.binary_client = binary_client_for(redis_client)
+        self.soft_ttl = soft_ttl or settings.BANK_DATA_SOFT_TTL
+        self.hard_ttl = hard_ttl or settings.BANK_DATA_CACHE_TTL
+
+    def _lock_key(self, key: str) -> str:
+        return f"cache_lock:{key}"
+
+    def _namespace(self, key: str) -> str:
+        return key.split(":", 1)[0]
+
+    async def get(
+        self,
+        key: str,
+        loader: Loader,
+        background_loader: Optional[Loader] = None
+    ) -> Tuple[Any, Dict[str, Any]]:
+        """
+        Вернуть (значение, метаданные свежести). background_loader используется
+        для фоновых обновлений, которые переживают текущий запрос.
+        """
+        entry = self.read_many([key])[0]
+
+        if entry is not None:
+            value, age = entry
+            return value, self.revalidate(key, age, background_loader or loader)
+
+        value = await self.load(key, loader)
+        return value, self.meta(0, False, False)
+
+    def read_many(self, keys: List[str]) -> List[Optional[Tuple[Any, float]]]:
+        """
+        Прочитать записи и их возраст: сначала локальный кеш процесса, остальное -
+        одним пайплайном (MGET, HGETALL для балансов + TTL) из Redis; None - промах
+        """
+        results: List[Optional[Tuple[Any, float]]] = [None] * len(keys)
+        remote: List[int] = []
+
+        for index, key in enumerate(keys):
+            entry = local_cache.get(key) if settings.LOCAL_CACHE_ENABLED else None
+            if entry is None:
+                remote.append(index)
+                continue
+
+            value, cached_at = entry
+            results[index] = (value, max(0.0, time.time() - cached_at))
+
+        if not remote:
+            return results
+
+        hashes = [index for index in remote if balance_cache.is_balance_key(keys[index])]
+        strings = [index for index in remote if not balance_cache.is_balance_key(keys[index])]
+
+        pipe = self.binary_client.pipeline(transaction=False)
+        if strings:
+            pipe.mget([keys[index] for index in strings])
+        for index in hashes:
+            pipe.hgetall(keys[index])
+        for index in strings + hashes:
+            pipe.ttl(keys[index])
+        # Баланс прежнего строкового формата даёт WRONGTYPE - считаем промахом, загрузка перезапишет его хешем
+        replies = pipe.execute(raise_on_error=False)
+
+        entries = [None if raw is None else cache_codec.loads_with_size(raw) for raw in (replies.pop(0) if strings else [])]
+        entries += [None if isinstance(raw, Exception) else balance_cache.from_hash(raw) for raw in replies[:len(hashes)]]
+        ttls = replies[len(hashes):]
+
+        for index, entry, ttl in zip(strings + hashes, entries, ttls):
+            if entry is None:
+                _redis_stats["misses"] += 1
+                continue
+
+            _redis_stats["hits"] += 1
+            value, size = entry
+            age = self._age(ttl)
+            results[index] = (value, age)
+
+            if settings.LOCAL_CACHE_ENABLED:
+                local_cache.set(keys[index], value, size, time.time() - age)
+
+        return results
+
+    def revalidate(self, key: str, age: float, background_loader: Loader) -> Dict[str, Any]:
+        """
+        Для попадания: при необходимости запустить фоновое обновление, вернуть метаданные
+        """
+        stale = self.is_stale(age)
+        refreshing = False
+
+        if stale or self._expires_early(key, age):
+            refreshing = self.schedule_refresh(key, background_loader)
+
+        return self.meta(age, stale, refreshing)
+
+    async def load(self, key: str, loader: Loader, store: bool = True) -> Any:
+        """
+        Загрузить значение при промахе; store=False - вызывающий сохранит его сам (set_many)
+        """
+        return await self._load_single_flight(key, loader, store)
+
+    def set(self, key: str, value: Any) -> None:
+        self.set_many({key: value})
+
+    def set_many(self, values: Dict[str, Any]) -> None:
+        """
+        Записать значения одним пайплайном и разослать инвалидацию локальных копий другим воркерам
+        """
+        if not values:
+            return
+
+        encoded = {
+            key: balance_cache.to_hash(value) if balance_cache.is_balance_key(key) else cache_codec.dumps_with_size(key, value)
+            for key, value in values.items()
+        }
+
+        pipe = self.binary_client.pipeline(transaction=True)
+        for key, (raw, _) in encoded.items():
+            if balance_cache.is_balance_key(key):
+                # DEL - на месте мог остаться баланс прежнего строкового формата
+                pipe.delete(key)
+                pipe.hset(key, mapping=raw)
+                pipe.expire(key, self.hard_ttl)
+            else:
+                pipe.setex(key, self.hard_ttl, raw)
+        pipe.publish(settings.LOCAL_CACHE_CHANNEL, invalidation_message(encoded))
+        pipe.execute()
+
+        if settings.LOCAL_CACHE_ENABLED:
+            for key, (_, size) in encoded.items():
+                local_cache.set(key, values[key], size)
+
+    def ages(self, keys: List[str]) -> List[Optional[float]]:
+        """
+        Возраст записей в секундах одним пайплайном; None - ключа нет
+        """
+        if not keys:
+            return []
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        for key in keys:
+            pipe.ttl(key)
+
+        return [None if ttl == -2 else self._age(ttl) for ttl in pipe.execute()]
+
+    def is_stale(self, age: float) -> bool:
+        return age >= self.soft_ttl
+
+    def meta(self, age: float, stale: bool, refreshing: bool) -> Dict[str, Any]:
+        return {
+            "cachedAt": (datetime.utcnow() - timedelta(seconds=age)).isoformat(),
+            "ageSeconds": int(age),
+            "stale": stale,
+            "refreshing": refreshing
+        }
+
+    def schedule_refresh(self, key: str, loader: Loader) -> bool:
+        if key not in _refreshing:
+            _refreshing.add(key)
+            task = asyncio.ensure_future(self._refresh(key, loader))
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+
+        return True
+
+    def _age(self, ttl: int) -> float:
+        # -1: ключ без срока жизни, считаем свежим
+        if ttl < 0:
+            return 0
+        return max(0, self.hard_ttl - ttl)
+
+    def _expires_early(self, key: str, age: float) -> bool:
+        # XFetch: обновить заранее с вероятностью, растущей к концу soft_ttl
+        delta = max(_recompute_seconds.get(self._namespace(key), 0.0), settings.BANK_CACHE_EARLY_DELTA)
+        return age - delta * settings.BANK_CACHE_EARLY_BETA * math.log(random.random() or 1e-12) >= self.soft_ttl
+
+    async def _refresh(self, key: str, loader: Loader) -> None:
+        try:
+            lock = self.redis_client.lock(self._lock_key(key), timeout=settings.BANK_CACHE_LOCK_TIMEOUT)
+            if not lock.acquire(blocking=False):
+                return
+
+            try:
+                await self._load_and_store(key, loader)
+                logger.info(f"🔄 Кеш {key} обновлён в фоне")
+            finally:
+                self._release(lock)
+
+        except Exception as e:
+            logger.warning(f"⚠️  Не удалось обновить кеш {key} в фоне: {e}")
+        finally:
+            _refreshing.discard(key)
+
+    async def _load_single_flight(self, key: str, loader: Loader, store: bool) -> Any:
+        task = _inflight.get(key)
+
+        if task is None:
+            task = asyncio.ensure_future(self._load_locked(key, loader, store))
+            _inflight[key] = task
+            task.add_done_callback(lambda _: _inflight.pop(key, None))
+
+        # Отмена одного запроса не должна прерывать общую загрузку
+        return await asyncio.shield(task)
+
+    async def _load_locked(self, key: str, loader: Loader, store: bool) -> Any:
+        lock = self.redis_client.lock(self._lock_key(key), timeout=settings.BANK_CACHE_LOCK_TIMEOUT)
+        if lock.acquire(blocking=False):
+            try:
+                return await self._load_and_store(key, loader, store)
+            finally:
+                self._release(lock)
+
+        # Значение уже загружает другой процесс - ждём его результат
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.BANK_CACHE_LOCK_WAIT
+        while loop.time() < deadline:
+            await asyncio.sleep(0.1)
+            entry = self.read_many([key])[0]
+            if entry is not None:
+                return entry[0]
+
+        logger.warning(f"⚠️  Не дождались загрузки {key} другим процессом, загружаем сами")
+        return await self._load_and_store(key, loader, store)
+
+    async def _load_and_store(self, key: str, loader: Loader, store: bool = True) -> Any:
+        started = time.monotonic()
+        value = await loader()
+        elapsed = time.monotonic() - started
+
+        namespace = self._namespace(key)
+        previous = _recompute_seconds.get(namespace)
+        _recompute_seconds[namespace] = elapsed if previous is None else previous * 0.8 + elapsed * 0.2
+
+        if store:
+            self.set(key, value)
+        return value
+
+    def _release(self, lock) -> None:
+        try:
+            lock.release()
+        except LockError:
+            # Лок истёк по таймауту и мог быть захвачен другим процессом
+            pass
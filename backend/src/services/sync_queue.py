@@ -0,0 +1,250 @@
+import json
+import logging
+import time
+import uuid
+import redis
+from typing import Any, Dict, List, Optional
+
+from src.config import settings
+from src.services.rate_limiter import PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUS_QUEUED = "queued"
+JOB_STATUS_RUNNING = "running"
+JOB_STATUS_DONE = "done"
+JOB_STATUS_FAILED = "failed"
+
+ACTIVE_USERS_KEY = "sync_active_users"
+LEASES_KEY = "sync_leases"
+JOB_KEY_PREFIX = "sync_job:"
+
+# Поставить задачу, если по счёту ещё нет активной. Уже стоящая в очереди фоновая
+# задача при интерактивном запросе переносится в интерактивную очередь.
+# KEYS: дедуп-ключ счёта, ключ новой задачи, интерактивная очередь, фоновая очередь
+# ARGV: job_id, priority, user_id, account_id, now, ttl, префикс ключа задачи
+ENQUEUE_SCRIPT = """
+local existing = redis.call('GET', KEYS[1])
+if existing then
+    local job_key = ARGV[7] .. existing
+    local status = redis.call('HGET', job_key, 'status')
+
+    if status == 'queued' or status == 'running' then
+        if status == 'queued' and ARGV[2] == 'interactive'
+            and redis.call('HGET', job_key, 'priority') ~= 'interactive'
+            and redis.call('LREM', KEYS[4], 0, existing) > 0 then
+            redis.call('RPUSH', KEYS[3], existing)
+            redis.call('HSET', job_key, 'priority', 'interactive')
+        end
+        return existing
+    end
+end
+
+redis.call('HSET', KEYS[2],
+    'status', 'queued', 'priority', ARGV[2], 'user_id', ARGV[3],
+    'account_id', ARGV[4], 'created_at', ARGV[5], 'attempts', 0)
+redis.call('EXPIRE', KEYS[2], ARGV[6])
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[6])
+
+if ARGV[2] == 'interactive' then
+    redis.call('RPUSH', KEYS[3], ARGV[1])
+else
+    redis.call('RPUSH', KEYS[4], ARGV[1])
+end
+
+return ARGV[1]
+"""
+
+# Взять задачу (сначала интерактивные) и выдать на неё аренду до now + lease.
+# KEYS: интерактивная очередь, фоновая очередь, аренды; ARGV: now, lease, префикс ключа задачи
+CLAIM_SCRIPT = """
+local job_id, job_key
+repeat
+    job_id = redis.call('LPOP', KEYS[1]) or redis.call('LPOP', KEYS[2])
+    if not job_id then
+        return false
+    end
+    job_key = ARGV[3] .. job_id
+-- задача могла истечь, пока ждала в очереди
+until redis.call('EXISTS', job_key) == 1
+
+redis.call('ZADD', KEYS[3], tonumber(ARGV[1]) + tonumber(ARGV[2]), job_id)
+redis.call('HSET', job_key, 'status', 'running', 'started_at', ARGV[1])
+redis.call('HINCRBY', job_key, 'attempts', 1)
+
+return job_id
+"""
+
+# Вернуть в очередь задачи с истёкшей арендой (воркер упал или завис),
+# после max_attempts попыток задача считается проваленной.
+# KEYS: аренды, интерактивная очередь, фоновая очередь; ARGV: now, max_attempts, префикс ключа задачи
+RECLAIM_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+for _, job_id in ipairs(expired) do
+    redis.call('ZREM', KEYS[1], job_id)
+    local job_key = ARGV[3] .. job_id
+    local data = redis.call('HMGET', job_key, 'attempts', 'priority')
+
+    if tonumber(data[1] or 0) >= tonumber(ARGV[2]) then
+        redis.call('HSET', job_key, 'status', 'failed', 'finished_at', ARGV[1], 'error', 'lease expired')
+    elseif data[2] == 'interactive' then
+        redis.call('HSET', job_key, 'status', 'queued')
+        redis.call('LPUSH', KEYS[2], job_id)
+    else
+        redis.call('HSET', job_key, 'status', 'queued')
+        redis.call('LPUSH', KEYS[3], job_id)
+    end
+end
+return #expired
+"""
+
+# Завершить задачу, только если аренда ещё наша: иначе задачу уже отдали другому воркеру.
+# KEYS: аренды, ключ задачи, дедуп-ключ счёта; ARGV: job_id, status, now, поле, значение, ttl
+FINISH_SCRIPT = """
+if redis.call('ZREM', KEYS[1], ARGV[1]) == 0 then
+    return 0
+end
+
+redis.call('HSET', KEYS[2], 'status', ARGV[2], 'finished_at', ARGV[3], ARGV[4], ARGV[5])
+redis.call('EXPIRE', KEYS[2], ARGV[6])
+
+if redis.call('GET', KEYS[3]) == ARGV[1] then
+    redis.call('DEL', KEYS[3])
+end
+return 1
+"""
+
+def mark_user_active(redis_client: redis.Redis, user_id: int) -> None:
+    """
+    Отметить активность пользователя - планировщик синхронизирует счета недавно активных
+    """
+    redis_client.zadd(ACTIVE_USERS_KEY, {str(user_id): time.time()})
+
+class SyncQueue:
+    """
+    Очередь задач синхронизации счетов в Redis, общая для всех процессов worker.py.
+
+    Две очереди-списка: интерактивная (запрос пользователя) разбирается раньше
+    фоновой (планировщик). Взятая задача получает аренду SYNC_JOB_LEASE секунд,
+    которую воркер продлевает, пока работает; задачи с истёкшей арендой
+    возвращаются в очередь (reclaim_expired). На счёт одновременно существует
+    не больше одной активной задачи.
+    """
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis_client = redis_client
+        self._enqueue = redis_client.register_script(ENQUEUE_SCRIPT)
+        self._claim = redis_client.register_script(CLAIM_SCRIPT)
+        self._reclaim = redis_client.register_script(RECLAIM_SCRIPT)
+        self._finish = redis_client.register_script(FINISH_SCRIPT)
+
+    def _queue_key(self, priority: str) -> str:
+        return f"sync_queue:{priority}"
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{JOB_KEY_PREFIX}{job_id}"
+
+    def _account_key(self, account_id: int) -> str:
+        return f"sync_account_job:{account_id}"
+
+    def _backoff_key(self, account_id: int) -> str:
+        return f"sync_backoff:{account_id}"
+
+    def enqueue(self, user_id: int, account_id: int, priority: str = PRIORITY_BACKGROUND) -> str:
+        """
+        Поставить синхронизацию счёта (BankAccount.id) в очередь.
+        Возвращает id задачи - новой или уже активной по этому счёту.
+        """
+        job_id = uuid.uuid4().hex
+        return self._enqueue(
+            keys=[
+                self._account_key(account_id),
+                self._job_key(job_id),
+                self._queue_key(PRIORITY_INTERACTIVE),
+                self._queue_key(PRIORITY_BACKGROUND)
+            ],
+            args=[job_id, priority, user_id, account_id, time.time(), settings.SYNC_JOB_RESULT_TTL, JOB_KEY_PREFIX]
+        )
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        job_id = self._claim(
+            keys=[self._queue_key(PRIORITY_INTERACTIVE), self._queue_key(PRIORITY_BACKGROUND), LEASES_KEY],
+            args=[time.time(), settings.SYNC_JOB_LEASE, JOB_KEY_PREFIX]
+        )
+        if not job_id:
+            return None
+
+        return self.get_job(job_id)
+
+    def heartbeat(self, job_id: str) -> bool:
+        """
+        Продлить аренду; False - аренда уже потеряна
+        """
+        return bool(self.redis_client.zadd(
+            LEASES_KEY,
+            {job_id: time.time() + settings.SYNC_JOB_LEASE},
+            xx=True,
+            ch=True
+        ))
+
+    def complete(self, job: Dict[str, Any], result: Dict[str, Any]) -> bool:
+        return self._finish_job(job, JOB_STATUS_DONE, "result", json.dumps(result))
+
+    def fail(self, job: Dict[str, Any], error: str) -> bool:
+        # Не повторяем синхронизацию проблемного счёта на каждом проходе планировщика
+        self.redis_client.setex(self._backoff_key(job["accountId"]), settings.SYNC_FAILURE_BACKOFF, error)
+        return self._finish_job(job, JOB_STATUS_FAILED, "error", error)
+
+    def _finish_job(self, job: Dict[str, Any], status: str, field: str, value: str) -> bool:
+        finished = self._finish(
+            keys=[LEASES_KEY, self._job_key(job["jobId"]), self._account_key(job["accountId"])],
+            args=[job["jobId"], status, time.time(), field, value, settings.SYNC_JOB_RESULT_TTL]
+        )
+        if not finished:
+            logger.warning(f"⚠️  Аренда задачи синхронизации {job['jobId']} истекла, результат отброшен")
+        return bool(finished)
+
+    def reclaim_expired(self) -> int:
+        return int(self._reclaim(
+            keys=[LEASES_KEY, self._queue_key(PRIORITY_INTERACTIVE), self._queue_key(PRIORITY_BACKGROUND)],
+            args=[time.time(), settings.SYNC_JOB_MAX_ATTEMPTS, JOB_KEY_PREFIX]
+        ))
+
+    def in_backoff(self, account_ids: List[int]) -> List[bool]:
+        if not account_ids:
+            return []
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        for account_id in account_ids:
+            pipe.exists(self._backoff_key(account_id))
+        return [bool(exists) for exists in pipe.execute()]
+
+    def active_users(self, limit: int) -> List[int]:
+        """
+        Пользователи, активные за SYNC_ACTIVE_WINDOW, начиная с самых недавних
+        """
+        self.redis_client.zremrangebyscore(ACTIVE_USERS_KEY, "-inf", time.time() - settings.SYNC_ACTIVE_WINDOW)
+        return [int(user_id) for user_id in self.redis_client.zrevrange(ACTIVE_USERS_KEY, 0, limit - 1)]
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        data = self.redis_client.hgetall(self._job_key(job_id))
+        if not data:
+            return None
+
+        def timestamp(field: str) -> Optional[str]:
+            value = data.get(field)
+            return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(float(value))) if value else None
+
+        return {
+            "jobId": job_id,
+            "userId": int(data["user_id"]),
+            "accountId": int(data["account_id"]),
+            "status": data.get("status"),
+            "priority": data.get("priority"),
+            "attempts": int(data.get("attempts", 0)),
+            "createdAt": timestamp("created_at"),
+            "startedAt": timestamp("started_at"),
+            "finishedAt": timestamp("finished_at"),
+            "result": json.loads(data["result"]) if data.get("result") else None,
+            "error": data.get("error")
+        }
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import redis
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import or_
+from typing import Any, Dict
+
+from src.config import settings
+from src.database import SessionLocal
+from src.models import BankAccount
+from src.services.account_service import AccountService
+from src.services.rate_limiter import PRIORITY_BACKGROUND
+from src.services.sync_queue import SyncQueue
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_LOCK_KEY = "sync_scheduler_lock"
+
+class SyncWorker:
+    """
+    Фоновая синхронизация счетов с банками (точка входа - worker.py).
+
+    SYNC_WORKER_CONCURRENCY обработчиков разбирают общую очередь SyncQueue.
+    Раз в SYNC_SCHEDULE_INTERVAL один из процессов (Redis-лок) ставит в очередь
+    счета недавно активных пользователей, не синхронизированные дольше
+    SYNC_STALE_AFTER, и возвращает задачи с истёкшей арендой.
+    """
+
+    def __init__(self, redis_client: redis.Redis):
+        self.redis_client = redis_client
+        self.queue = SyncQueue(redis_client)
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        logger.info("👋 Остановка воркера синхронизации...")
+        self._stopping.set()
+
+    async def run(self) -> None:
+        await asyncio.gather(
+            self._schedule_loop(),
+            *(self._consume() for _ in range(settings.SYNC_WORKER_CONCURRENCY))
+        )
+
+    async def _sleep(self, seconds: float) -> None:
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _consume(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                job = self.queue.claim()
+            except Exception as e:
+                logger.error(f"❌ Ошибка чтения очереди синхронизации: {e}")
+                job = None
+
+            if job is None:
+                await self._sleep(settings.SYNC_POLL_INTERVAL)
+                continue
+
+            await self._process(job)
+
+    async def _process(self, job: Dict[str, Any]) -> None:
+        heartbeat = asyncio.ensure_future(self._heartbeat(job["jobId"]))
+        db = SessionLocal()
+
+        try:
+            account = (
+                db.query(BankAccount)
+                .filter(BankAccount.id == job["accountId"], BankAccount.user_id == job["userId"])
+                .first()
+            )
+            if account is None:
+                self.queue.fail(job, "Счёт не найден")
+                return
+
+            service = AccountService(db, self.redis_client, job["priority"])
+            result = await service.sync_account(account)
+            self.queue.complete(job, result)
+
+        except Exception as e:
+            logger.warning(f"⚠️  Задача синхронизации {job['jobId']} (счёт {job['accountId']}) не выполнена: {e}")
+            self.queue.fail(job, str(e))
+
+        finally:
+            heartbeat.cancel()
+            db.close()
+
+    async def _heartbeat(self, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(settings.SYNC_JOB_LEASE / 3)
+            if not self.queue.heartbeat(job_id):
+                return
+
+    async def _schedule_loop(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                # Лок не отпускаем: он истекает сам, так что за интервал планирует один процесс
+                lock = self.redis_client.lock(SCHEDULER_LOCK_KEY, timeout=settings.SYNC_SCHEDULE_INTERVAL)
+                if lock.acquire(blocking=False):
+                    reclaimed = self.queue.reclaim_expired()
+                    if reclaimed:
+                        logger.warning(f"⚠️  Возвращено в очередь задач с истёкшей арендой: {reclaimed}")
+                    self.schedule()
+            except Exception as e:
+                logger.error(f"❌ Ошибка планировщика синхронизации: {e}")
+
+            await self._sleep(settings.SYNC_SCHEDULE_INTERVAL)
+
+    def schedule(self) -> int:
+        """
+        Поставить в очередь устаревшие счета активных пользователей: сначала самые
+        недавно активные пользователи, у каждого - давно не синхронизированные счета
+        """
+        user_ids = self.queue.active_users(settings.SYNC_SCHEDULE_BATCH)
+        if not user_ids:
+            return 0
+
+        stale_before = datetime.now(timezone.utc) - timedelta(seconds=settings.SYNC_STALE_AFTER)
+
+        db = SessionLocal()
+        try:
+            accounts = (
+                db.query(BankAccount)
+                .filter(
+                    BankAccount.user_id.in_(user_ids),
+                    BankAccount.is_active == True,
+                    or_(BankAccount.last_synced_at.is_(None), BankAccount.last_synced_at < stale_before)
+                )
+                .all()
+            )
+        finally:
+            db.close()
+
+        rank = {user_id: index for index, user_id in enumerate(user_ids)}
+        never = datetime.min.replace(tzinfo=timezone.utc)
+        accounts.sort(key=lambda acc: (rank[acc.user_id], acc.last_synced_at or never))
+
+        backoff = self.queue.in_backoff([acc.id for acc in accounts])
+        scheduled = 0
+        for account, in_backoff in zip(accounts, backoff):
+            if in_backoff:
+                continue
+            self.queue.enqueue(account.user_id, account.id, PRIORITY_BACKGROUND)
+            scheduled += 1
+
+        if scheduled:
+            logger.info(f"🔄 Запланирована синхронизация {scheduled} счетов")
+        return scheduled
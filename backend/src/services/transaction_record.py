@@ -0,0 +1,129 @@
+"""
+Транзакция банка в компактном неизменяемом виде (NamedTuple). Запись создаётся один раз - при
+разборе ответа Bank API или строки bank_transactions - с уже разобранным временем
+и суммой в копейках, и дальше передаётся по ссылке. Данные счёта не копируются
+в каждую транзакцию: все записи счёта ссылаются на один AccountRef.
+В словарь запись превращается только при формировании ответа (to_dict).
+"""
+import hashlib
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, NamedTuple, Optional
+
+from src.utils.money import Money
+
+logger = logging.getLogger(__name__)
+
+def parse_booking_ts(value: Optional[str]) -> datetime:
+    if not value:
+        return datetime.now(timezone.utc)
+
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        logger.warning(f"Ошибка парсинга даты транзакции {value}")
+        return datetime.now(timezone.utc)
+
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+def fallback_transaction_id(date: Any, amount: Any, description: Any) -> str:
+    """
+    Идентификатор транзакции, для которой банк не прислал transactionId
+    """
+    raw = f"{date}|{amount}|{description}"
+    return "h:" + hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+class AccountRef(NamedTuple):
+    """Счёт, к которому относятся транзакции: один экземпляр на счёт"""
+    account_id: str
+    account_name: Optional[str]
+    client_id: int
+    client_name: Optional[str]
+
+    @classmethod
+    def from_account(cls, account: Dict[str, Any]) -> "AccountRef":
+        """
+        Из элемента AccountService.get_user_accounts
+        """
+        return cls(account["accountId"], account.get("accountName"), account["clientId"], account.get("clientName"))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "accountId": self.account_id,
+            "accountName": self.account_name,
+            "clientId": self.client_id,
+            "clientName": self.client_name
+        }
+
+class TransactionRecord(NamedTuple):
+    """
+    Транзакция: id из банка, booking_ts - aware datetime, amount - Money (знак как в банке),
+    type - debit / credit, category - код TransactionCategory (None до категоризации)
+    """
+    id: str
+    booking_ts: datetime
+    description: str
+    amount: Money
+    type: str
+    mcc_code: str = ""
+    category: Optional[str] = None
+    account: Optional[AccountRef] = None
+
+    @classmethod
+    def from_bank(cls, txn: Dict[str, Any], account: Optional[AccountRef] = None) -> "TransactionRecord":
+        """
+        Из элемента data.transaction ответа Bank API
+        """
+        merchant = txn.get("merchant") or {}
+        amount_data = txn.get("amount") or {}
+        amount = Money.parse(amount_data.get("amount", "0"), amount_data.get("currency", "RUB"))
+        date = txn.get("bookingDateTime")
+        description = txn.get("transactionInformation", "Транзакция")
+
+        return cls(
+            txn.get("transactionId") or fallback_transaction_id(date, amount.to_float(), description),
+            parse_booking_ts(date),
+            description,
+            amount,
+            txn.get("creditDebitIndicator", "debit").lower(),
+            str(txn.get("mccCode") or merchant.get("mccCode") or ""),
+            None,
+            account
+        )
+
+    @classmethod
+    def from_row(cls, row: Any, account: Optional[AccountRef] = None) -> "TransactionRecord":
+        """
+        Из строки bank_transactions (BankTransaction или строка запроса с теми же полями)
+        """
+        return cls(
+            row.transaction_id,
+            row.booking_ts,
+            row.description or "",
+            Money.parse(row.amount, row.currency or "RUB"),
+            row.type,
+            row.mcc_code or "",
+            row.category,
+            account
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Транзакция в формате ответа API; поля счёта - если запись привязана к счёту
+        """
+        data = {
+            "id": self.id,
+            "date": self.booking_ts.isoformat(),
+            "description": self.description,
+            "amount": self.amount.to_float(),
+            "amountMinor": self.amount.minor,
+            "currency": self.amount.currency,
+            "type": self.type,
+            "mccCode": self.mcc_code,
+            "category": self.category
+        }
+        if self.account is not None:
+            data.update(self.account.to_dict())
+        return data
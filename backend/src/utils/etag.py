@@ -0,0 +1,109 @@
+import hashlib
+import logging
+from datetime import date
+from typing import List
+from fastapi import Request
+from fastapi.responses import Response
+
+from src.database import SessionLocal
+from src.models.account import BankAccount
+from src.redis_client import get_redis
+from src.services.data_version import DataVersionService
+from src.services.session_service import SessionService
+from src.services.swr_cache import SWRCache
+from src.services.sync_queue import mark_user_active
+
+logger = logging.getLogger(__name__)
+
+# GET-эндпоинты, ответы которых целиком определяются версией данных пользователя
+ETAG_PATH_PREFIXES = ("/api/accounts", "/api/analytics", "/api/cashback")
+# Статус задачи синхронизации меняется без изменения данных пользователя
+ETAG_EXCLUDED_PREFIXES = ("/api/accounts/sync-jobs/",)
+
+def make_etag(request: Request, scope: str, version: str) -> str:
+    """
+    Слабый ETag: ответ меняется вместе с версией данных, а метаданные свежести
+    кеша в нём не влияют на смысл ответа
+    """
+    source = f"{scope}|{version}|{date.today().isoformat()}|{request.url.path}?{request.url.query}"
+    return f'W/"{hashlib.sha1(source.encode("utf-8")).hexdigest()[:20]}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+
+    candidates = [value.strip() for value in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+def set_etag(response: Response, etag: str) -> Response:
+    if response.status_code == 200:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+def user_cache_keys(user_id: int) -> List[str]:
+    """
+    Ключи кеша балансов и транзакций всех счетов пользователя
+    """
+    db = SessionLocal()
+    try:
+        account_ids = [row.account_id for row in db.query(BankAccount.account_id).filter(BankAccount.user_id == user_id)]
+    finally:
+        db.close()
+
+    return [f"{prefix}:{user_id}:{account_id}" for account_id in account_ids for prefix in ("balance", "transactions")]
+
+def user_cache_fresh(redis_client, user_id: int) -> bool:
+    """
+    Кеш банковских данных пользователя моложе soft TTL. Устаревший или вытесненный
+    кеш обновляет только обработчик (SWR), поэтому отвечать 304 на него нельзя.
+    """
+    cache = SWRCache(redis_client)
+    return all(age is not None and not cache.is_stale(age) for age in cache.ages(user_cache_keys(user_id)))
+
+async def etag_middleware(request: Request, call_next):
+    """
+    ETag / If-None-Match для GET-запросов из ETAG_PATH_PREFIXES.
+
+    ETag строится по версии данных, прочитанной до обработки запроса: если данные
+    изменились во время неё, следующий запрос получит другую версию и полный ответ.
+    При совпадении отвечаем 304, не выполняя обработчик, - но только пока кеш
+    банковских данных свежий: иначе обработчик запускает его фоновое обновление.
+    """
+    path = request.url.path
+    if request.method != "GET" or not path.startswith(ETAG_PATH_PREFIXES) or path.startswith(ETAG_EXCLUDED_PREFIXES):
+        return await call_next(request)
+
+    session_id = request.cookies.get("session-id")
+    if not session_id:
+        return await call_next(request)
+
+    try:
+        redis_client = get_redis()
+        user_id = SessionService.get_user_id(redis_client, session_id)
+        if user_id:
+            # Ответ 304 минует get_current_user - активность отмечаем здесь
+            mark_user_active(redis_client, user_id)
+        version = DataVersionService(redis_client).user_version(user_id) if user_id else None
+    except Exception as e:
+        logger.warning(f"⚠️  Не удалось получить версию данных для ETag: {e}")
+        return await call_next(request)
+
+    if version is None:
+        return await call_next(request)
+
+    etag = make_etag(request, f"user:{user_id}", str(version))
+    if etag_matches(request, etag):
+        try:
+            fresh = user_cache_fresh(redis_client, user_id)
+        except Exception as e:
+            logger.warning(f"⚠️  Не удалось проверить свежесть кеша для ETag: {e}")
+            fresh = False
+        if fresh:
+            return not_modified_response(etag)
+
+    return set_etag(await call_next(request), etag)
@@ -0,0 +1,163 @@
+"""
+Денежные суммы в целых минорных единицах (копейках) с кодом валюты.
+
+Суммы из банков, платежей и агрегатов приводятся к Money один раз на входе;
+сложение и сравнение дальше идут в целых числах без накопления ошибки float.
+В float сумма превращается только при формировании ответа (to_float).
+"""
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict, Union
+
+DEFAULT_CURRENCY = "RUB"
+MINOR_UNITS = 100
+
+_ONE = Decimal(1)
+_FLOAT_EXACT_LIMIT = 1e13
+
+def to_minor(value: Any) -> int:
+    """
+    Сумма в копейках из строки банковского API, числа или Decimal.
+    Строки и Decimal переводятся точно, float - с округлением до копейки.
+    """
+    # Строки из Bank API - самый частый случай, проверяются первыми
+    if isinstance(value, str):
+        return _str_to_minor(value)
+    if isinstance(value, Money):
+        return value.minor
+    if isinstance(value, bool):
+        raise TypeError("Сумма не может быть bool")
+    if isinstance(value, int):
+        return value * MINOR_UNITS
+    if isinstance(value, float):
+        return int(round(value * MINOR_UNITS))
+    if isinstance(value, Decimal):
+        return int((value * MINOR_UNITS).quantize(_ONE, rounding=ROUND_HALF_UP))
+    if value is None:
+        return 0
+    raise TypeError(f"Неподдерживаемый тип суммы: {type(value).__name__}")
+
+def _str_to_minor(value: str) -> int:
+    # Для сумм до 10^11 рублей float(value) * 100 отличается от точного значения
+    # на миллионные доли копейки, так что округление совпадает с Decimal; через Decimal
+    # идут только спорные половины копейки и то, что float не разбирает
+    try:
+        scaled = float(value) * MINOR_UNITS
+        minor = round(scaled)
+    except (ValueError, OverflowError):
+        minor = scaled = None
+    if scaled is not None and abs(scaled) < _FLOAT_EXACT_LIMIT and abs(abs(scaled - minor) - 0.5) > 1e-3:
+        return minor
+
+    return int((Decimal(value) * MINOR_UNITS).quantize(_ONE, rounding=ROUND_HALF_UP))
+
+class Money:
+    """
+    Неизменяемая сумма: minor - целые копейки, currency - код валюты (ISO 4217).
+    Арифметика и сравнение - только между суммами одной валюты.
+    """
+
+    __slots__ = ("minor", "currency")
+
+    def __init__(self, minor: int = 0, currency: str = DEFAULT_CURRENCY):
+        object.__setattr__(self, "minor", minor)
+        object.__setattr__(self, "currency", currency)
+
+    @classmethod
+    def parse(cls, value: Any, currency: str = DEFAULT_CURRENCY) -> "Money":
+        if isinstance(value, Money):
+            return value
+        return cls(to_minor(value), currency)
+
+    @classmethod
+    def from_fields(cls, data: Dict[str, Any]) -> "Money":
+        """
+        Сумма нормализованной транзакции или баланса: amountMinor, если есть
+        (BankClient), иначе amount
+        """
+        currency = data.get("currency") or DEFAULT_CURRENCY
+        minor = data.get("amountMinor")
+        if minor is not None:
+            return cls(minor, currency)
+        return cls(to_minor(data.get("amount", 0)), currency)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("Money неизменяем")
+
+    def __reduce__(self):
+        return (Money, (self.minor, self.currency))
+
+    def _check(self, other: "Money") -> None:
+        if not isinstance(other, Money):
+            raise TypeError(f"Ожидалась Money, получено {type(other).__name__}")
+        if other.currency != self.currency:
+            raise ValueError(f"Разные валюты: {self.currency} и {other.currency}")
+
+    def __add__(self, other: "Money") -> "Money":
+        self._check(other)
+        return Money(self.minor + other.minor, self.currency)
+
+    def __radd__(self, other: Union[int, "Money"]) -> "Money":
+        # sum() начинает с 0
+        if other == 0:
+            return self
+        return self.__add__(other)
+
+    def __sub__(self, other: "Money") -> "Money":
+        self._check(other)
+        return Money(self.minor - other.minor, self.currency)
+
+    def __neg__(self) -> "Money":
+        return Money(-self.minor, self.currency)
+
+    def __abs__(self) -> "Money":
+        return Money(abs(self.minor), self.currency)
+
+    def __bool__(self) -> bool:
+        return self.minor != 0
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, Money):
+            return self.minor == other.minor and self.currency == other.currency
+        if other == 0:
+            return self.minor == 0
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash((self.minor, self.currency))
+
+    def __lt__(self, other: "Money") -> bool:
+        self._check(other)
+        return self.minor < other.minor
+
+    def __le__(self, other: "Money") -> bool:
+        self._check(other)
+        return self.minor <= other.minor
+
+    def __gt__(self, other: "Money") -> bool:
+        self._check(other)
+        return self.minor > other.minor
+
+    def __ge__(self, other: "Money") -> bool:
+        self._check(other)
+        return self.minor >= other.minor
+
+    def percent(self, rate: Decimal) -> "Money":
+        """rate процентов от суммы, с округлением до копейки"""
+        return Money(int((self.minor * rate / 100).quantize(_ONE, rounding=ROUND_HALF_UP)), self.currency)
+
+    def ratio(self, other: "Money") -> float:
+        """Доля от other (для процентов в ответах); 0 при нулевом other"""
+        self._check(other)
+        return self.minor / other.minor if other.minor else 0.0
+
+    def to_decimal(self) -> Decimal:
+        return Decimal(self.minor).scaleb(-2)
+
+    def to_float(self) -> float:
+        return self.minor / MINOR_UNITS
+
+    def __str__(self) -> str:
+        return str(self.to_decimal())
+
+    def __repr__(self) -> str:
+        return f"Money({self.to_decimal()} {self.currency})"
@@ -1,13 +1,21 @@
 from typing import Any, Optional, Dict
 from fastapi.responses import JSONResponse
 
-def success_response(data: Any = None, status_code: int = 200) -> JSONResponse:
+def success_response(
+    data: Any = None,
+    status_code: int = 200,
+    meta: Optional[Dict[str, Any]] = None
+) -> JSONResponse:
+    content = {
+        "success": True,
+        "data": data
+    }
+    if meta:
+        content["meta"] = meta
+
     return JSONResponse(
         status_code=status_code,
-        content={
-            "success": True,
-            "data": data
-        }
+        content=content
     )
 
 def error_response(
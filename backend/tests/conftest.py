@@ -0,0 +1,33 @@
+import fakeredis
+import pytest
+
+@pytest.fixture
+def redis_client():
+    """
+    Клиент fakeredis с decode_responses, как src.redis_client.redis_client;
+    Lua-скрипты (register_script) выполняются через lupa
+    """
+    client = fakeredis.FakeRedis(server=fakeredis.FakeServer(), decode_responses=True)
+    yield client
+    client.flushall()
+
+@pytest.fixture
+def db():
+    """
+    Сессия SQLite в памяти со схемой моделей. Запросы, которым нужен PostgreSQL
+    (ON CONFLICT по имени ограничения, CONCURRENTLY), так не проверить.
+    """
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    # Регистрируем все модели: не все из них реэкспортирует src.models
+    import src.models  # noqa: F401
+    from src.models import loyalty_card, payment, savings_goal  # noqa: F401
+    from src.database import Base
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
@@ -0,0 +1,150 @@
+import json
+import threading
+
+import pytest
+
+from src.config import settings
+from src.local_cache import local_cache
+from src.services.balance_cache import BalanceCache, BalanceShift, from_hash, read, to_hash
+from src.utils.money import Money
+
+SENDER, RECIPIENT = "balance:1:acc-1", "balance:2:acc-2"
+
+def _seed(client, key, minor, ttl=None):
+    client.hset(key, mapping=to_hash({"amount": minor / 100, "amountMinor": minor, "currency": "RUB"})[0])
+    if ttl:
+        client.expire(key, ttl)
+
+def _minor(client, key):
+    return int(client.hget(key, "amountMinor"))
+
+def test_transfer_moves_both_balances(redis_client):
+    _seed(redis_client, SENDER, 10_000)
+    _seed(redis_client, RECIPIENT, 500)
+
+    result = BalanceCache(redis_client).adjust(
+        [BalanceShift(SENDER, Money(-2_500)), BalanceShift(RECIPIENT, Money(2_500))], [], []
+    )
+
+    assert result.applied
+    assert result.balances == ((Money(10_000), Money(7_500)), (Money(500), Money(3_000)))
+    assert (_minor(redis_client, SENDER), _minor(redis_client, RECIPIENT)) == (7_500, 3_000)
+
+def test_overdraft_rejects_whole_operation(redis_client):
+    _seed(redis_client, SENDER, 1_000)
+    _seed(redis_client, RECIPIENT, 0)
+    redis_client.set("transactions:1:acc-1", "cached")
+
+    result = BalanceCache(redis_client).adjust(
+        [BalanceShift(RECIPIENT, Money(5_000)), BalanceShift(SENDER, Money(-5_000))],
+        ["transactions:1:acc-1"],
+        ["data_version:1"]
+    )
+
+    assert not result.applied
+    assert result.rejected.key == SENDER
+    assert result.available == Money(1_000)
+    assert (_minor(redis_client, SENDER), _minor(redis_client, RECIPIENT)) == (1_000, 0)
+    assert redis_client.exists("transactions:1:acc-1")
+    assert not redis_client.exists("data_version:1")
+
+def test_unchecked_adjust_may_go_negative(redis_client):
+    # Компенсация уже проведённого в БД платежа не отклоняется
+    _seed(redis_client, SENDER, 100)
+    result = BalanceCache(redis_client).adjust([BalanceShift(SENDER, Money(-300))], [], [], check=False)
+    assert result.applied
+    assert _minor(redis_client, SENDER) == -200
+
+def test_missing_balance_is_not_created(redis_client):
+    result = BalanceCache(redis_client).adjust([BalanceShift(SENDER, Money(-100))], [], [])
+    assert result.applied
+    assert result.balances == (None,)
+    assert not redis_client.exists(SENDER)
+
+def test_legacy_string_balance_is_dropped(redis_client):
+    redis_client.set(SENDER, json.dumps({"amount": 10.0, "currency": "RUB"}))
+    assert read(redis_client, SENDER) is None
+
+    result = BalanceCache(redis_client).adjust([BalanceShift(SENDER, Money(-100))], [], [])
+    assert result.balances == (None,)
+    assert not redis_client.exists(SENDER)
+
+def test_rejected_adjust_keeps_legacy_balance(redis_client):
+    # Проверки выполняются до любых изменений: прежний формат удаляется только вместе с применением
+    legacy = json.dumps({"amount": 10.0, "currency": "RUB"})
+    redis_client.set(RECIPIENT, legacy)
+    _seed(redis_client, SENDER, 1_000)
+
+    result = BalanceCache(redis_client).adjust(
+        [BalanceShift(RECIPIENT, Money(5_000)), BalanceShift(SENDER, Money(-5_000))], [], []
+    )
+
+    assert not result.applied
+    assert redis_client.get(RECIPIENT) == legacy
+    assert _minor(redis_client, SENDER) == 1_000
+
+def test_adjust_keeps_existing_ttl(redis_client):
+    # Платёж не продлевает жизнь баланса, прочитанного из банка
+    _seed(redis_client, SENDER, 10_000, ttl=50)
+    _seed(redis_client, RECIPIENT, 0)
+
+    BalanceCache(redis_client).adjust(
+        [BalanceShift(SENDER, Money(-100)), BalanceShift(RECIPIENT, Money(100))], [], []
+    )
+
+    assert 0 < redis_client.ttl(SENDER) <= 50
+    assert redis_client.ttl(RECIPIENT) == settings.BANK_DATA_CACHE_TTL
+
+def test_deletes_keys_bumps_counters_and_invalidates(redis_client):
+    _seed(redis_client, SENDER, 10_000)
+    redis_client.set("transactions:1:acc-1", "cached")
+    local_cache.set(SENDER, {"amount": 100.0}, 10)
+    local_cache.set("transactions:1:acc-1", [], 10)
+
+    pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(settings.LOCAL_CACHE_CHANNEL)
+
+    BalanceCache(redis_client).adjust(
+        [BalanceShift(SENDER, Money(-100))], ["transactions:1:acc-1"], ["data_version:1", "data_version:2"]
+    )
+
+    assert not redis_client.exists("transactions:1:acc-1")
+    assert redis_client.mget("data_version:1", "data_version:2") == ["1", "1"]
+    assert local_cache.get(SENDER) is None
+    assert local_cache.get("transactions:1:acc-1") is None
+
+    # Первым приходит подтверждение подписки (get_message вернёт None)
+    messages = [pubsub.get_message(timeout=1) for _ in range(2)]
+    message = next(message for message in messages if message)
+    assert json.loads(message["data"])["keys"] == [SENDER, "transactions:1:acc-1"]
+    pubsub.close()
+
+def test_concurrent_debits_are_not_lost(redis_client):
+    payments, threads = 50, 8
+    _seed(redis_client, SENDER, payments * threads * 100)
+    cache = BalanceCache(redis_client)
+
+    def worker():
+        for _ in range(payments):
+            assert cache.adjust([BalanceShift(SENDER, Money(-100))], [], []).applied
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    assert _minor(redis_client, SENDER) == 0
+
+@pytest.mark.parametrize("balance", [
+    {"amount": 12.34, "amountMinor": 1234, "currency": "USD"},
+    {"amount": "99.99", "currency": "RUB"},
+])
+def test_hash_round_trip(balance):
+    mapping, size = to_hash(balance)
+    raw = {field.encode(): str(value).encode() for field, value in mapping.items()}
+    value, raw_size = from_hash(raw)
+    assert Money.from_fields(value) == Money.from_fields(balance)
+    assert value["amount"] == Money.from_fields(balance).to_float()
+    assert raw_size == size
+    assert from_hash({}) is None
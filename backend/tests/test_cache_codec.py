@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from src import cache_codec
+from src.config import settings
+
+TRANSACTIONS = [
+    {"id": f"t{i}", "date": f"2025-01-{i + 1:02d}T10:00:00+00:00", "amount": -i * 1.5, "amountMinor": -i * 150,
+     "currency": "RUB", "type": "debit", "category": "food", "description": "Пятёрочка"}
+    for i in range(20)
+]
+
+@pytest.mark.parametrize("codec", list(cache_codec._codecs_by_name.values()), ids=lambda codec: codec.name)
+@pytest.mark.parametrize("value", [TRANSACTIONS, [], {"amount": 12.5, "currency": "RUB"}, [{"a": 1}, {"b": 2}], "строка"])
+def test_codec_round_trip(codec, value):
+    payload, _ = codec.encode(value)
+    decoded, _ = codec.decode(payload)
+    assert decoded == value
+
+def test_dumps_writes_header_of_key_codec(monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_CODECS", {"transactions": "columnar", "view": "json-zlib"})
+
+    raw = cache_codec.dumps("transactions:1:acc", TRANSACTIONS)
+    assert raw[:2] == cache_codec.MAGIC + bytes([cache_codec.ColumnarCodec.codec_id])
+    assert cache_codec.loads(raw) == TRANSACTIONS
+
+    raw = cache_codec.dumps("view:analytics:1", {"x": 1})
+    assert raw[1] == cache_codec.JsonZlibCodec.codec_id
+
+def test_key_without_codec_is_plain_json(monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_CODECS", {})
+    raw = cache_codec.dumps("balance:1:acc", {"amount": 1})
+    assert json.loads(raw) == {"amount": 1}
+
+def test_unavailable_codec_falls_back_to_json_zlib(monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_CODECS", {"transactions": "missing"})
+    assert cache_codec.codec_for_key("transactions:1:acc").name == "json-zlib"
+
+def test_legacy_headerless_json_is_readable():
+    legacy = json.dumps(TRANSACTIONS)
+    assert cache_codec.loads(legacy) == TRANSACTIONS
+    assert cache_codec.loads(legacy.encode("utf-8")) == TRANSACTIONS
+
+    _, size = cache_codec.loads_with_size(legacy.encode("utf-8"))
+    assert size == len(legacy.encode("utf-8"))
+
+def test_columnar_is_smaller_than_json():
+    columnar = cache_codec.dumps_with_size("transactions:1:acc", TRANSACTIONS)[0]
+    assert len(columnar) < len(json.dumps(TRANSACTIONS))
+
+def test_unknown_codec_id_raises():
+    with pytest.raises(ValueError):
+        cache_codec.loads(cache_codec.MAGIC + bytes([250]) + b"payload")
@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+from src.constants.constants import TransactionCategory
+from src.constants.mcc_mapping import (
+    KEYWORD_CATEGORIES, MCC_TO_CATEGORY, categorize_transaction, categorize_transactions
+)
+
+def reference_categorize(mcc_code, description=""):
+    # Прежняя реализация: первая категория списка, ключевое слово которой входит в описание
+    if mcc_code and mcc_code in MCC_TO_CATEGORY:
+        return MCC_TO_CATEGORY[mcc_code]
+
+    description_lower = description.lower()
+    for category, keywords in KEYWORD_CATEGORIES:
+        if any(keyword in description_lower for keyword in keywords):
+            return category
+    return TransactionCategory.OTHER
+
+KEYWORDS = [keyword for _, keywords in KEYWORD_CATEGORIES for keyword in keywords]
+NOISE = ["", " ", "оплата", "ООО", "№123", "msk", "ул.", "ма", "га", "з"]
+
+def _descriptions(count, seed=1):
+    rng = random.Random(seed)
+    result = []
+    for _ in range(count):
+        parts = rng.choices(KEYWORDS + NOISE * 3, k=rng.randrange(1, 5))
+        text = rng.choice(["", " "]).join(parts)
+        result.append(text.upper() if rng.random() < 0.2 else text)
+    return result
+
+@pytest.mark.parametrize("description, expected", [
+    ("МАГАЗИН у дома", TransactionCategory.GROCERIES),
+    # "газ" внутри "магазин" не должен перебить продукты
+    ("магазин газ", TransactionCategory.GROCERIES),
+    ("газпром", TransactionCategory.UTILITIES),
+    ("Яндекс.Такси поездка", TransactionCategory.TRANSPORT),
+    ("перевод в кафе", TransactionCategory.RESTAURANTS),
+    ("P2P перевод", TransactionCategory.TRANSFERS),
+    ("что-то непонятное", TransactionCategory.OTHER),
+    ("", TransactionCategory.OTHER),
+])
+def test_keywords(description, expected):
+    assert categorize_transaction("", description) == expected
+
+def test_known_mcc_wins_over_description():
+    mcc, category = next(iter(MCC_TO_CATEGORY.items()))
+    assert categorize_transaction(mcc, "перевод") == category
+    assert categorize_transaction("0000", "перевод") == TransactionCategory.TRANSFERS
+
+def test_matches_reference_implementation():
+    mccs = ["", "0000", *list(MCC_TO_CATEGORY)[:5]]
+    rng = random.Random(2)
+    items = [(rng.choice(mccs), description) for description in _descriptions(5000)]
+
+    expected = [reference_categorize(mcc, description) for mcc, description in items]
+    assert [categorize_transaction(mcc, description) for mcc, description in items] == expected
+    assert categorize_transactions(items) == expected
@@ -0,0 +1,125 @@
+import random
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from src.services.analytics_engine import AnalyticsReport, parse_period
+from src.services.columnar import CATEGORIES, TransactionColumns, epoch_us
+from src.services.rollup_service import ANALYTICS_TZ, local_slot
+from src.utils.money import Money
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+@pytest.fixture(scope="module")
+def rows():
+    rng = random.Random(7)
+    return [
+        (
+            row_id,
+            epoch_us(START + timedelta(seconds=rng.randrange(90 * 86400))),
+            rng.choice([1, -1]) * rng.randrange(1, 500_000),
+            rng.randrange(len(CATEGORIES)),
+            rng.randrange(2),
+            rng.choice([-1, 10, 11])
+        )
+        for row_id in range(1, 2001)
+    ]
+
+@pytest.fixture(scope="module")
+def columns(rows):
+    return TransactionColumns.from_rows(rows)
+
+def _ts(row):
+    return START + timedelta(microseconds=row[1] - epoch_us(START))
+
+def _totals(rows):
+    result = {}
+    for row in rows:
+        key = (CATEGORIES[row[3]].value, "debit" if row[4] else "credit")
+        amount, count = result.get(key, (Money(0), 0))
+        result[key] = (amount + Money(abs(row[2])), count + 1)
+    return result
+
+def test_between_is_half_open(columns, rows):
+    start, end = START + timedelta(days=10), START + timedelta(days=20)
+    expected = [start <= _ts(row) < end for row in rows]
+    assert columns.between(start, end).tolist() == expected
+    assert columns.between().all()
+
+def test_totals_match_row_loop(columns, rows):
+    mask = columns.between(START + timedelta(days=30))
+    assert columns.totals(mask) == _totals([row for row, keep in zip(rows, mask) if keep])
+    assert columns.sum(mask) == sum((Money(abs(row[2])) for row, keep in zip(rows, mask) if keep), Money(0))
+
+def test_daily_matches_row_loop(columns, rows):
+    expected = {}
+    for row in rows:
+        if row[4]:
+            day = _ts(row).date()
+            amount, count = expected.get(day, (Money(0), 0))
+            expected[day] = (amount + Money(abs(row[2])), count + 1)
+
+    result = columns.daily(columns.debit)
+    assert [day for day, _, _ in result] == sorted(expected)
+    assert {day: (amount, count) for day, amount, count in result} == expected
+
+def test_hourly_matches_local_slots(columns, rows):
+    tz = ZoneInfo("Europe/Moscow")
+    expected = {}
+    for row in rows:
+        local = _ts(row).astimezone(tz)
+        slot = (local.weekday(), local.hour)
+        amount, count = expected.get(slot, (Money(0), 0))
+        expected[slot] = (amount + Money(abs(row[2])), count + 1)
+
+    result = columns.hourly(columns.between(), tz)
+    assert {(weekday, hour): (amount, count) for weekday, hour, amount, count in result} == expected
+
+def test_hourly_agrees_with_rollup_slots():
+    ts = datetime(2025, 3, 30, 23, 30, tzinfo=timezone.utc)
+    columns = TransactionColumns.from_rows([(1, epoch_us(ts), 100, 0, 1, -1)])
+    _, weekday, hour = local_slot(ts)
+    assert columns.hourly(columns.debit, ANALYTICS_TZ) == [(weekday, hour, Money(100), 1)]
+
+def test_account_totals(columns, rows):
+    totals = columns.account_totals(columns.between())
+    assert set(totals) == {-1, 10, 11}
+    for account, (amount, count) in totals.items():
+        own = [row for row in rows if row[5] == account]
+        assert count == len(own)
+        assert amount == sum((Money(abs(row[2])) for row in own), Money(0))
+
+def test_top_ids_per_category(columns, rows):
+    limit = 3
+    expected = []
+    for code in sorted({row[3] for row in rows if row[4]}):
+        ranked = sorted((row for row in rows if row[4] and row[3] == code), key=lambda row: (-abs(row[2]), -row[0]))
+        expected.extend(row[0] for row in ranked[:limit])
+    assert columns.top_ids(columns.debit, limit) == expected
+
+def test_top_ids_breaks_ties_by_id():
+    columns = TransactionColumns.from_rows([(row_id, 0, 500, 0, 1, -1) for row_id in range(1, 6)])
+    assert columns.top_ids(columns.debit, 2) == [5, 4]
+
+def test_empty_columns():
+    columns = TransactionColumns.from_rows([])
+    mask = columns.between()
+    assert len(columns) == 0
+    assert columns.totals(mask) == {}
+    assert columns.daily(mask) == []
+    assert columns.hourly(mask, ZoneInfo("UTC")) == []
+    assert columns.top_ids(mask, 5) == []
+
+def test_report_period_covers_whole_end_day(columns, rows):
+    report = AnalyticsReport(START, *parse_period("2025-01-10T18:00:00+03:00", "2025-01-20"))
+    assert (report.start_day, report.end_day) == (date(2025, 1, 10), date(2025, 1, 20))
+
+    mask = columns.between(report.start, report.end)
+    expected = [date(2025, 1, 10) <= _ts(row).date() <= date(2025, 1, 20) for row in rows]
+    assert mask.tolist() == expected
+
+def test_parse_period_rejects_malformed_dates():
+    assert parse_period(None, None) == (None, None)
+    with pytest.raises(ValueError):
+        parse_period("2025-13-45", None)
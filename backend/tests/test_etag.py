@@ -0,0 +1,91 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.config import settings
+from src.models.account import BankAccount
+from src.services.swr_cache import SWRCache
+from src.services.sync_queue import ACTIVE_USERS_KEY
+from src.utils import etag
+
+USER_ID = 1
+KEYS = [f"balance:{USER_ID}:acc", f"transactions:{USER_ID}:acc"]
+
+@pytest.fixture
+def client(redis_client, monkeypatch):
+    """
+    Приложение с etag_middleware и эндпоинтом, который, как AccountService,
+    перепроверяет кеш через SWRCache.revalidate
+    """
+    monkeypatch.setattr(etag, "get_redis", lambda: redis_client)
+    monkeypatch.setattr(etag, "user_cache_keys", lambda user_id: KEYS)
+    monkeypatch.setattr(etag.SessionService, "get_user_id", staticmethod(lambda _, session_id: USER_ID))
+
+    app = FastAPI()
+    app.middleware("http")(etag.etag_middleware)
+    app.state.calls = []
+
+    async def loader():
+        return {"amountMinor": 100, "currency": "RUB"}
+
+    @app.get("/api/accounts")
+    async def accounts():
+        cache = SWRCache(redis_client)
+        age = cache.ages([KEYS[0]])[0]
+        meta = cache.revalidate(KEYS[0], age, loader)
+        app.state.calls.append(meta)
+        return meta
+
+    test_client = TestClient(app)
+    test_client.cookies.set("session-id", "session")
+    return test_client
+
+def cache_with_age(redis_client, age: int) -> None:
+    for key in KEYS:
+        redis_client.set(key, "cached", ex=settings.BANK_DATA_CACHE_TTL - age)
+
+def test_fresh_cache_returns_not_modified(client, redis_client):
+    cache_with_age(redis_client, 0)
+    first = client.get("/api/accounts")
+    assert first.status_code == 200
+
+    redis_client.delete(ACTIVE_USERS_KEY)
+    second = client.get("/api/accounts", headers={"If-None-Match": first.headers["ETag"]})
+
+    assert second.status_code == 304
+    assert len(client.app.state.calls) == 1
+    # 304 минует get_current_user, но пользователь остаётся активным для планировщика
+    assert redis_client.zscore(ACTIVE_USERS_KEY, str(USER_ID)) is not None
+
+def test_stale_cache_runs_handler_despite_matching_etag(client, redis_client):
+    cache_with_age(redis_client, 0)
+    first = client.get("/api/accounts")
+
+    cache_with_age(redis_client, settings.BANK_DATA_SOFT_TTL + 60)
+    second = client.get("/api/accounts", headers={"If-None-Match": first.headers["ETag"]})
+
+    assert second.status_code == 200
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert second.json()["stale"] is True
+    assert second.json()["refreshing"] is True
+
+def test_missing_cache_key_runs_handler(client, redis_client):
+    cache_with_age(redis_client, 0)
+    first = client.get("/api/accounts")
+
+    redis_client.delete(KEYS[1])
+    second = client.get("/api/accounts", headers={"If-None-Match": first.headers["ETag"]})
+
+    assert second.status_code == 200
+
+def test_user_cache_keys_cover_every_account(db, monkeypatch):
+    db.add_all([
+        BankAccount(user_id=USER_ID, bank_id=1, account_id="acc"),
+        BankAccount(user_id=USER_ID, bank_id=2, account_id="card"),
+        BankAccount(user_id=USER_ID + 1, bank_id=1, account_id="other"),
+    ])
+    db.commit()
+    monkeypatch.setattr(etag, "SessionLocal", lambda: db)
+    monkeypatch.setattr(db, "close", lambda: None)
+
+    assert sorted(etag.user_cache_keys(USER_ID)) == sorted(KEYS + [f"balance:{USER_ID}:card", f"transactions:{USER_ID}:card"])
@@ -0,0 +1,72 @@
+from decimal import Decimal
+
+import pytest
+
+from src.utils.money import Money, to_minor
+
+@pytest.mark.parametrize("value, expected", [
+    ("1234.56", 123456),
+    ("-0.01", -1),
+    ("0.005", 1),
+    ("-0.005", -1),
+    ("2.675", 268),
+    ("1e2", 10000),
+    (12, 1200),
+    (0.1 + 0.2, 30),
+    (19.99, 1999),
+    (Decimal("10.125"), 1013),
+    (Decimal("-10.125"), -1013),
+    (None, 0),
+])
+def test_to_minor(value, expected):
+    assert to_minor(value) == expected
+
+def test_to_minor_rejects_bool_and_unknown_types():
+    with pytest.raises(TypeError):
+        to_minor(True)
+    with pytest.raises(TypeError):
+        to_minor([1])
+
+def test_string_sum_is_exact():
+    # Сумма float копит ошибку, копейки - нет
+    values = ["0.10"] * 1000
+    assert sum((Money.parse(v) for v in values), Money(0)) == Money(10000)
+    assert sum(float(v) for v in values) != 100.0
+
+def test_arithmetic_and_comparison():
+    a, b = Money(1050), Money(250)
+    assert a + b == Money(1300)
+    assert a - b == Money(800)
+    assert -a == Money(-1050)
+    assert abs(Money(-5)) == Money(5)
+    assert sum([a, b]) == Money(1300)
+    assert b < a and a >= b and not a <= b
+    assert Money(0) == 0 and not Money(0)
+
+def test_currency_mismatch():
+    with pytest.raises(ValueError):
+        Money(100, "RUB") + Money(100, "USD")
+    with pytest.raises(TypeError):
+        Money(100) + 1
+
+def test_immutable():
+    with pytest.raises(AttributeError):
+        Money(1).minor = 2
+
+def test_from_fields_prefers_minor():
+    assert Money.from_fields({"amount": 1.0, "amountMinor": 123, "currency": "USD"}) == Money(123, "USD")
+    assert Money.from_fields({"amount": "7.77"}) == Money(777)
+    assert Money.from_fields({"amount": 1, "currency": None}).currency == "RUB"
+
+def test_percent_rounds_half_up():
+    assert Money(1001).percent(Decimal("5")) == Money(50)
+    assert Money(1010).percent(Decimal("5")) == Money(51)
+    assert Money(-1010).percent(Decimal("5")) == Money(-51)
+
+def test_conversions():
+    money = Money(-123456)
+    assert money.to_decimal() == Decimal("-1234.56")
+    assert money.to_float() == -1234.56
+    assert str(money) == "-1234.56"
+    assert Money(50).ratio(Money(200)) == 0.25
+    assert Money(50).ratio(Money(0)) == 0.0
@@ -0,0 +1,44 @@
+from datetime import date
+
+import pytest
+
+from src.services.analytics_engine import days_until_payday, detect_paydays
+
+def _months(count):
+    return [(2024 + (month - 1) // 12, (month - 1) % 12 + 1) for month in range(1, count + 1)]
+
+def test_salary_and_advance():
+    income = {}
+    for year, month in _months(6):
+        income[date(year, month, 5)] = 60_000_00
+        income[date(year, month, 20)] = 40_000_00
+        income[date(year, month, 12)] = 1_500_00  # мелкие поступления не считаются зарплатой
+    assert detect_paydays(income) == [5, 20]
+
+def test_payday_shifted_by_weekends():
+    days = [15, 14, 17, 15, 16, 15]
+    income = {date(year, month, day): 100_000_00 for (year, month), day in zip(_months(6), days)}
+    assert detect_paydays(income) == [15]
+
+def test_needs_two_months_and_half_of_history():
+    assert detect_paydays({date(2024, 1, 10): 100_000_00}) == []
+
+    # Около 10-го и около 22-го - только по два месяца из шести
+    days = [10, 10, 28, 2, 20, 24]
+    income = {date(year, month, day): 50_000_00 for (year, month), day in zip(_months(6), days)}
+    assert detect_paydays(income) == []
+
+def test_ignores_refunds_and_empty_history():
+    assert detect_paydays({}) == []
+    assert detect_paydays({date(2024, 1, 10): -5_000_00, date(2024, 2, 10): 0}) == []
+
+@pytest.mark.parametrize("paydays, today, expected", [
+    ([], date(2025, 2, 10), None),
+    ([10], date(2025, 2, 10), 0),
+    ([10], date(2025, 2, 11), 27),
+    ([31], date(2025, 2, 10), 18),
+    ([5, 20], date(2025, 2, 10), 10),
+    ([5, 20], date(2025, 12, 25), 11),
+])
+def test_days_until_payday(paydays, today, expected):
+    assert days_until_payday(paydays, today) == expected
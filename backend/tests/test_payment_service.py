@@ -0,0 +1,77 @@
+from datetime import date, datetime
+
+import pytest
+
+from src.models import User
+from src.models.payment import Payment, PaymentStatus, PaymentType
+from src.services.balance_cache import BalanceShift, to_hash
+from src.services.payment_service import PaymentService
+from src.utils.money import Money
+
+SENDER, RECIPIENT = "balance:1:acc-1", "balance:2:acc-2"
+TRANSACTIONS = ["transactions:1:acc-1", "transactions:2:acc-2"]
+
+@pytest.fixture
+def service(db, redis_client):
+    for user_id in (1, 2):
+        db.add(User(id=user_id, email=f"user{user_id}@example.com", password_hash="x", name="Пользователь", birth_date=date(2000, 1, 1)))
+    db.commit()
+
+    for key, minor in ((SENDER, 10_000), (RECIPIENT, 0)):
+        redis_client.hset(key, mapping=to_hash({"amountMinor": minor, "currency": "RUB"})[0])
+    for key in TRANSACTIONS:
+        redis_client.set(key, "cached")
+    return PaymentService(db, redis_client)
+
+def save(service, minor):
+    payment = Payment(
+        user_id=1, to_user_id=2, payment_type=PaymentType.TO_PERSON, amount=Money(minor).to_decimal(),
+        status=PaymentStatus.COMPLETED, completed_at=datetime(2025, 1, 1)
+    )
+    shifts = [BalanceShift(SENDER, Money(-minor)), BalanceShift(RECIPIENT, Money(minor))]
+    return service._save_payment(payment, shifts, TRANSACTIONS, [1, 2])
+
+def balances(redis_client):
+    return int(redis_client.hget(SENDER, "amountMinor")), int(redis_client.hget(RECIPIENT, "amountMinor"))
+
+def test_saved_payment_moves_cached_balances(service, db, redis_client):
+    assert save(service, 2_500) is None
+
+    assert db.query(Payment).count() == 1
+    assert balances(redis_client) == (7_500, 2_500)
+    assert not redis_client.exists(*TRANSACTIONS)
+    assert not redis_client.keys("payment_lock:*")
+
+def test_insufficient_funds_changes_nothing(service, db, redis_client):
+    error = save(service, 20_000)
+
+    assert error.startswith("Недостаточно средств")
+    assert db.query(Payment).count() == 0
+    assert balances(redis_client) == (10_000, 0)
+    assert redis_client.exists(*TRANSACTIONS) == 2
+
+def test_failed_commit_leaves_cache_untouched(service, db, redis_client, monkeypatch):
+    def fail():
+        raise RuntimeError("db is down")
+    monkeypatch.setattr(db, "commit", fail)
+
+    error = save(service, 2_500)
+
+    assert error == "Ошибка сохранения платежа: db is down"
+    assert balances(redis_client) == (10_000, 0)
+    assert redis_client.exists(*TRANSACTIONS) == 2
+
+def test_failed_cache_adjust_invalidates_balances(service, redis_client, monkeypatch):
+    monkeypatch.setattr(service, "_adjust_balances", lambda *args, **kwargs: None)
+
+    assert save(service, 2_500) is None
+
+    assert not redis_client.exists(SENDER, RECIPIENT, *TRANSACTIONS)
+    assert redis_client.mget("data_version:user:1", "data_version:user:2") == ["1", "1"]
+
+def test_busy_balance_rejects_payment(service, redis_client, monkeypatch):
+    monkeypatch.setattr("src.services.payment_service.settings.PAYMENT_LOCK_WAIT", 0.1)
+    redis_client.set(f"payment_lock:{SENDER}", "other")
+
+    assert save(service, 2_500) == "По счету уже выполняется другой платеж, повторите попытку"
+    assert balances(redis_client) == (10_000, 0)
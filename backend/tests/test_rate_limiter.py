@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from src.config import settings
+from src.services.rate_limiter import (
+    PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, BankRateLimiter, RateLimitExceeded
+)
+
+# Пополнение 0.01 токена в секунду: за время теста корзина не наполняется
+SLOW = 0.01
+
+@pytest.fixture
+def limiter(redis_client):
+    return BankRateLimiter(redis_client)
+
+def _take(limiter, buckets):
+    keys = [key for key, _, _ in buckets]
+    args = [value for _, burst, min_tokens in buckets for value in (SLOW, burst, min_tokens)]
+    return int(limiter._script(keys=keys, args=args))
+
+def _tokens(limiter, key):
+    return float(limiter.redis_client.hget(key, "tokens"))
+
+def test_burst_then_wait(limiter):
+    for _ in range(3):
+        assert _take(limiter, [("bucket", 3, 1)]) == 0
+
+    wait = _take(limiter, [("bucket", 3, 1)])
+    assert wait > 0
+    assert wait <= 1000 / SLOW
+    assert _tokens(limiter, "bucket") < 1
+    assert 0 < limiter.redis_client.pttl("bucket") <= 3 * 1000 / SLOW + 1000
+
+def test_tokens_taken_from_all_buckets_or_none(limiter):
+    assert _take(limiter, [("bank", 5, 1), ("user", 1, 1)]) == 0
+    assert _take(limiter, [("bank", 5, 1), ("user", 1, 1)]) > 0
+
+    # Пустая корзина пользователя не тратит токен банка
+    assert _tokens(limiter, "bank") == pytest.approx(4, abs=0.01)
+    assert _take(limiter, [("bank", 5, 1), ("other-user", 1, 1)]) == 0
+    assert _tokens(limiter, "bank") == pytest.approx(3, abs=0.01)
+
+def test_background_keeps_reserve_for_interactive(limiter):
+    # Фону нужно min_tokens = 1 + половина burst
+    for _ in range(2):
+        assert _take(limiter, [("bank", 4, 3)]) == 0
+    assert _take(limiter, [("bank", 4, 3)]) > 0
+    assert _take(limiter, [("bank", 4, 1)]) == 0
+
+def test_buckets_for_priorities(limiter, monkeypatch):
+    monkeypatch.setattr(settings, "BANK_RATE_LIMIT_BACKGROUND_RESERVE", 0.5)
+    keys, args = limiter._buckets(1, "transactions", 7, PRIORITY_BACKGROUND)
+    assert keys == ["ratelimit:1:transactions", "ratelimit:1:user:7"]
+    _, burst, min_tokens = args[:3]
+    assert min_tokens == 1 + burst * 0.5
+    assert args[5] == 1
+
+    keys, args = limiter._buckets(1, "unknown", None, PRIORITY_INTERACTIVE)
+    assert keys == ["ratelimit:1:unknown"]
+    assert args[2] == 1
+
+def test_acquire_raises_after_deadline(limiter, monkeypatch):
+    monkeypatch.setattr(settings, "BANK_RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "BANK_RATE_LIMIT_INTERACTIVE_WAIT", 0)
+    # Пустая корзина с отметкой времени в будущем не пополняется
+    limiter.redis_client.hset("ratelimit:1:transactions", mapping={"tokens": "0", "ts": "99999999999999"})
+
+    with pytest.raises(RateLimitExceeded) as error:
+        asyncio.run(limiter.acquire(1, "transactions"))
+    assert (error.value.bank_id, error.value.endpoint_class) == (1, "transactions")
+
+def test_acquire_disabled_does_not_touch_redis(limiter, monkeypatch):
+    monkeypatch.setattr(settings, "BANK_RATE_LIMIT_ENABLED", False)
+    asyncio.run(limiter.acquire(1, "transactions", 7))
+    assert limiter.redis_client.keys("ratelimit:*") == []
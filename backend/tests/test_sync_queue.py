@@ -0,0 +1,105 @@
+import pytest
+
+from src.config import settings
+from src.services.rate_limiter import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE
+from src.services.sync_queue import (
+    JOB_STATUS_DONE, JOB_STATUS_FAILED, JOB_STATUS_QUEUED, JOB_STATUS_RUNNING, LEASES_KEY, SyncQueue
+)
+
+@pytest.fixture
+def queue(redis_client):
+    return SyncQueue(redis_client)
+
+def _expire_leases(queue):
+    # Аренды в прошлом - как у упавшего воркера
+    queue.redis_client.zadd(LEASES_KEY, {job_id: 0 for job_id in queue.redis_client.zrange(LEASES_KEY, 0, -1)})
+
+def test_one_active_job_per_account(queue):
+    first = queue.enqueue(1, 10)
+    assert queue.enqueue(1, 10) == first
+    assert queue.enqueue(1, 11) != first
+
+    job = queue.claim()
+    assert job["jobId"] == first
+    # Выполняющаяся задача тоже не дублируется
+    assert queue.enqueue(1, 10) == first
+
+def test_interactive_jobs_are_claimed_first(queue):
+    background = queue.enqueue(1, 10, PRIORITY_BACKGROUND)
+    interactive = queue.enqueue(1, 11, PRIORITY_INTERACTIVE)
+
+    assert queue.claim()["jobId"] == interactive
+    assert queue.claim()["jobId"] == background
+    assert queue.claim() is None
+
+def test_interactive_request_promotes_queued_background_job(queue):
+    queue.enqueue(1, 10, PRIORITY_BACKGROUND)
+    job_id = queue.enqueue(1, 11, PRIORITY_BACKGROUND)
+
+    assert queue.enqueue(1, 11, PRIORITY_INTERACTIVE) == job_id
+    job = queue.claim()
+    assert job["jobId"] == job_id
+    assert job["priority"] == PRIORITY_INTERACTIVE
+
+def test_claim_leases_and_marks_running(queue):
+    job_id = queue.enqueue(1, 10)
+    job = queue.claim()
+
+    assert job["status"] == JOB_STATUS_RUNNING
+    assert job["attempts"] == 1
+    assert job["startedAt"] is not None
+    assert queue.redis_client.zscore(LEASES_KEY, job_id) is not None
+    assert queue.heartbeat(job_id)
+
+def test_complete_releases_account(queue):
+    job_id = queue.enqueue(1, 10)
+    job = queue.claim()
+
+    assert queue.complete(job, {"transactionsCount": 3})
+    finished = queue.get_job(job_id)
+    assert finished["status"] == JOB_STATUS_DONE
+    assert finished["result"] == {"transactionsCount": 3}
+    assert not queue.heartbeat(job_id)
+    assert queue.enqueue(1, 10) != job_id
+
+def test_fail_sets_backoff(queue):
+    queue.enqueue(1, 10)
+    job = queue.claim()
+
+    assert queue.fail(job, "Банк недоступен")
+    assert queue.get_job(job["jobId"])["status"] == JOB_STATUS_FAILED
+    assert queue.in_backoff([10, 11]) == [True, False]
+
+def test_expired_lease_is_requeued_then_failed(queue, monkeypatch):
+    monkeypatch.setattr(settings, "SYNC_JOB_MAX_ATTEMPTS", 2)
+    job_id = queue.enqueue(1, 10, PRIORITY_INTERACTIVE)
+
+    queue.claim()
+    _expire_leases(queue)
+    assert queue.reclaim_expired() == 1
+    assert queue.get_job(job_id)["status"] == JOB_STATUS_QUEUED
+
+    job = queue.claim()
+    assert job["jobId"] == job_id and job["attempts"] == 2
+    _expire_leases(queue)
+    assert queue.reclaim_expired() == 1
+    assert queue.get_job(job_id)["status"] == JOB_STATUS_FAILED
+    assert queue.claim() is None
+
+def test_result_after_lost_lease_is_discarded(queue):
+    job_id = queue.enqueue(1, 10)
+    stale = queue.claim()
+    _expire_leases(queue)
+    queue.reclaim_expired()
+
+    # Задача уже снова в очереди - результат зависшего воркера не должен её завершить
+    assert not queue.complete(stale, {"transactionsCount": 1})
+    assert queue.get_job(job_id)["status"] == JOB_STATUS_QUEUED
+    assert queue.claim()["jobId"] == job_id
+
+def test_claim_skips_expired_job_hashes(queue):
+    expired = queue.enqueue(1, 10)
+    live = queue.enqueue(1, 11)
+    queue.redis_client.delete(f"sync_job:{expired}")
+
+    assert queue.claim()["jobId"] == live
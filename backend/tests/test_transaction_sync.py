@@ -0,0 +1,166 @@
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from src.config import settings
+from src.models import BankAccount, BankTransaction, User
+from src.services.account_service import AccountService
+from src.services.bank_client import BankClient, TransactionBatch, TransactionsInterrupted
+from src.services.rate_limiter import RateLimitExceeded
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+HISTORY = [
+    {
+        "transactionId": f"t{i}",
+        "bookingDateTime": (START + timedelta(hours=i)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "amount": {"amount": "10.00", "currency": "RUB"},
+        "creditDebitIndicator": "Debit"
+    }
+    for i in range(25)
+]
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return self.data
+
+@pytest.fixture
+def bank(monkeypatch, redis_client):
+    """
+    Банк, отдающий history страницами по BANK_TXN_PAGE_SIZE (новые первыми);
+    fail_pages - страницы, запрос которых падает один раз
+    """
+    monkeypatch.setattr(settings, "DEBUG", False)
+    monkeypatch.setattr(settings, "BANK_TXN_PAGE_SIZE", 5)
+    monkeypatch.setattr(settings, "BANK_TXN_MAX_PAGES", 2)
+    redis_client.set("consent:1:1", "consent")
+    state = {"pages": [], "fail_pages": set(), "history": list(HISTORY)}
+
+    async def request(self, bank_id, endpoint_class, method, url, user_id=None, headers=None, params=None):
+        page, limit = params["page"], params["limit"]
+        state["pages"].append(page)
+        if page in state["fail_pages"]:
+            state["fail_pages"].discard(page)
+            raise RateLimitExceeded(bank_id, endpoint_class)
+
+        items = sorted(state["history"], key=lambda txn: txn["bookingDateTime"], reverse=True)
+        since = params.get("from_booking_date_time")
+        if since:
+            items = [txn for txn in items if txn["bookingDateTime"] >= since]
+        return FakeResponse({
+            "data": {"transaction": items[(page - 1) * limit:page * limit]},
+            "meta": {"totalPages": (len(items) + limit - 1) // limit}
+        })
+
+    async def token(self, bank_id):
+        return "token"
+
+    monkeypatch.setattr(BankClient, "_request", request)
+    monkeypatch.setattr(BankClient, "get_bank_token", token)
+    return state
+
+@pytest.fixture
+def service(db, redis_client, monkeypatch):
+    db.add(User(id=1, email="user@example.com", password_hash="x", name="Пользователь", birth_date=date(2000, 1, 1)))
+    db.add(BankAccount(id=1, user_id=1, bank_id=1, account_id="acc"))
+    db.commit()
+
+    service = AccountService(db, redis_client)
+
+    # store_transactions пишет через INSERT ... ON CONFLICT ON CONSTRAINT (только PostgreSQL)
+    def store(user_id, bank_id, account_id, transactions):
+        stored = {row.transaction_id for row in db.query(BankTransaction.transaction_id)}
+        new = [txn for txn in transactions if txn.id not in stored]
+        db.add_all(
+            BankTransaction(
+                user_id=user_id, bank_id=bank_id, account_id=account_id, transaction_id=txn.id,
+                booking_ts=txn.booking_ts, amount=txn.amount.to_decimal(), currency="RUB",
+                type=txn.type, category="other"
+            )
+            for txn in new
+        )
+        db.commit()
+        return len(new)
+
+    monkeypatch.setattr(service, "store_transactions", store)
+    return service
+
+def _account(db):
+    account = db.query(BankAccount).one()
+    db.refresh(account)
+    return account
+
+def test_page_cap_returns_resume_page(bank, redis_client):
+    client = BankClient(redis_client)
+    batch = asyncio.run(client.get_account_transactions(1, 1, "acc", "client"))
+    assert [txn.id for txn in batch.records] == [f"t{i}" for i in range(24, 14, -1)]
+    assert batch.next_page == 3
+
+    batch = asyncio.run(client.get_account_transactions(1, 1, "acc", "client", start_page=5))
+    assert batch == TransactionBatch(batch.records, None)
+    assert [txn.id for txn in batch.records] == [f"t{i}" for i in range(4, -1, -1)]
+
+def test_error_after_first_page_keeps_fetched_pages(bank, redis_client):
+    bank["fail_pages"].add(2)
+    with pytest.raises(TransactionsInterrupted) as error:
+        asyncio.run(BankClient(redis_client).get_account_transactions(1, 1, "acc", "client"))
+
+    assert isinstance(error.value.error, RateLimitExceeded)
+    assert error.value.batch.next_page == 2
+    assert len(error.value.batch.records) == 5
+
+def test_error_on_first_page_is_raised_as_is(bank, redis_client):
+    bank["fail_pages"].add(1)
+    with pytest.raises(RateLimitExceeded):
+        asyncio.run(BankClient(redis_client).get_account_transactions(1, 1, "acc", "client"))
+
+def test_truncated_sync_resumes_and_only_then_advances(bank, service, db):
+    bank["fail_pages"].add(2)
+    with pytest.raises(RateLimitExceeded):
+        asyncio.run(service.sync_account_transactions(1, "acc", 1))
+
+    account = _account(db)
+    assert db.query(BankTransaction).count() == 5
+    assert (account.sync_next_page, account.sync_since, account.last_synced_at) == (2, None, None)
+
+    bank["pages"].clear()
+    assert asyncio.run(service.sync_account_transactions(1, "acc", 1)) == 10
+    assert bank["pages"] == [2, 3]
+    assert _account(db).sync_next_page == 4
+    assert _account(db).last_synced_at is None
+
+    bank["pages"].clear()
+    assert asyncio.run(service.sync_account_transactions(1, "acc", 1)) == 10
+    assert bank["pages"] == [4, 5]
+
+    account = _account(db)
+    assert db.query(BankTransaction).count() == len(HISTORY)
+    assert (account.sync_next_page, account.sync_since) == (None, None)
+    assert account.last_synced_at is not None
+
+def test_incremental_sync_keeps_watermark_while_incomplete(bank, service, db, monkeypatch):
+    monkeypatch.setattr(settings, "BANK_TXN_MAX_PAGES", 10)
+    asyncio.run(service.sync_account_transactions(1, "acc", 1))
+    watermark = START + timedelta(hours=len(HISTORY) - 1)
+
+    bank["history"].extend(
+        {**HISTORY[0], "transactionId": f"n{i}", "bookingDateTime": (watermark + timedelta(minutes=i + 1)).strftime("%Y-%m-%dT%H:%M:%SZ")}
+        for i in range(12)
+    )
+    monkeypatch.setattr(settings, "BANK_TXN_MAX_PAGES", 1)
+
+    asyncio.run(service.sync_account_transactions(1, "acc", 1))
+    account = _account(db)
+    assert account.sync_next_page == 2
+    assert account.sync_since.replace(tzinfo=timezone.utc) == watermark
+
+    # Продолжение идёт от того же водяного знака, а не от последней сохранённой транзакции
+    bank["pages"].clear()
+    asyncio.run(service.sync_account_transactions(1, "acc", 1))
+    asyncio.run(service.sync_account_transactions(1, "acc", 1))
+    assert bank["pages"] == [2, 3]
+    assert _account(db).sync_next_page is None
+    assert db.query(BankTransaction).count() == len(bank["history"])
@@ -0,0 +1,76 @@
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from src.models import BankTransaction, User
+from src.services.account_service import AccountService, decode_transactions_cursor, encode_transactions_cursor
+
+ACCOUNTS = [
+    {"clientId": 1, "accountId": "acc", "bankName": "Банк 1"},
+    {"clientId": 2, "accountId": "acc", "bankName": "Банк 2"},
+]
+
+def test_cursor_round_trip():
+    ts = datetime(2025, 1, 31, 23, 59, 59, 123456, tzinfo=timezone.utc)
+    cursor = encode_transactions_cursor(ts, 42)
+    assert "=" not in cursor
+    assert decode_transactions_cursor(cursor) == (ts, 42)
+
+@pytest.mark.parametrize("cursor", ["", "not-base64!", "eyJkIjoxfQ", encode_transactions_cursor(datetime.now(), 1)[:-3]])
+def test_malformed_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_transactions_cursor(cursor)
+
+@pytest.fixture
+def service(db, redis_client, monkeypatch):
+    db.add(User(id=1, email="user@example.com", password_hash="x", name="Пользователь", birth_date=date(2000, 1, 1)))
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    for bank_id in (1, 2):
+        for i in range(5):
+            db.add(BankTransaction(
+                user_id=1, bank_id=bank_id, account_id="acc", transaction_id=f"{bank_id}-{i}",
+                booking_ts=start + timedelta(days=i, hours=bank_id), amount=-100, currency="RUB",
+                type="debit", category="other"
+            ))
+    db.commit()
+
+    service = AccountService(db, redis_client)
+    monkeypatch.setattr(service, "get_user_accounts", lambda user_id, bank_id: ACCOUNTS)
+
+    async def synced(user_id, accounts):
+        pass
+    monkeypatch.setattr(service, "sync_user_transactions", synced)
+    return service
+
+def test_keyset_pages_cover_feed_once_in_order(service):
+    ids, cursor = [], None
+    while True:
+        page = asyncio.run(service.get_all_user_transactions(1, limit=3, cursor=cursor))
+        ids.extend(txn["id"] for txn in page["transactions"])
+        cursor = page["pagination"]["nextCursor"]
+        if not cursor:
+            break
+
+    assert ids == [f"{bank_id}-{i}" for i in reversed(range(5)) for bank_id in (2, 1)]
+
+@pytest.mark.parametrize("kwargs", [{}, {"offset": 2}])
+def test_bank_filter_applies_to_keyset_and_offset(service, kwargs):
+    page = asyncio.run(service.get_all_user_transactions(1, bank_ids=[1], limit=20, **kwargs))
+    assert {txn["id"].split("-")[0] for txn in page["transactions"]} == {"1"}
+    if kwargs:
+        assert page["pagination"]["total"] == 5
+        assert len(page["transactions"]) == 3
+
+def test_query_transactions_filters_by_bank_account_pairs(service, db):
+    # Счёт "acc" банка 2 не выбран, хотя выбраны и банк 2, и accountId "acc"
+    db.add(BankTransaction(
+        user_id=1, bank_id=2, account_id="card", transaction_id="card-0",
+        booking_ts=datetime(2025, 1, 10, tzinfo=timezone.utc), amount=-50, currency="RUB",
+        type="debit", category="other"
+    ))
+    db.commit()
+
+    rows = service.query_transactions(1, accounts=[(1, "acc"), (2, "card")])
+
+    assert sorted(txn["id"] for txn in rows) == ["1-0", "1-1", "1-2", "1-3", "1-4", "card-0"]
@@ -0,0 +1,43 @@
+import asyncio
+import logging
+import signal
+
+from src.config import settings
+from src.database import create_tables
+from src.redis_client import redis_client
+from src.http_client import init_bank_http_clients, close_bank_http_clients
+from src.local_cache import start_local_cache_listener, stop_local_cache_listener
+from src.services.sync_worker import SyncWorker
+
+async def run():
+    print("🚀 Starting bank sync worker...")
+    print(f"💾 Redis: {settings.REDIS_HOST}:{settings.REDIS_PORT}")
+
+    # Воркер может стартовать раньше API - схема нужна ему до первого запроса к счетам
+    create_tables()
+
+    await init_bank_http_clients()
+
+    try:
+        start_local_cache_listener(redis_client)
+    except Exception as e:
+        print(f"❌ Local cache invalidation listener failed: {e}")
+
+    worker = SyncWorker(redis_client)
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+
+    print(f"✨ Sync worker started (concurrency={settings.SYNC_WORKER_CONCURRENCY})")
+
+    try:
+        await worker.run()
+    finally:
+        stop_local_cache_listener()
+        await close_bank_http_clients()
+        print("👋 Sync worker stopped")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run())